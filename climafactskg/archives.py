@@ -0,0 +1,224 @@
+import gzip
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import BinaryIO, Optional
+
+logging.basicConfig(level=logging.INFO)
+
+_recorder: Optional["WARCWriter"] = None
+_replay: Optional["WARCArchive"] = None
+_archives_lock = threading.Lock()
+_archives_configured = False
+
+
+def _open_archive(path: str, mode: str) -> BinaryIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)  # type: ignore
+    return open(path, mode)  # type: ignore
+
+
+class WARCWriter:
+    """Appends HTTP responses to a WARC/1.0 archive.
+
+    Archives whose name ends with `.gz` are written as one gzip member per record (the usual `.warc.gz` layout), so
+    they can be read by standard WARC tools. Each URL is recorded once per writer. The writer is thread-safe.
+
+    Args:
+        path (str): The path to the archive. Records are appended if the archive already exists.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._recorded: set[str] = set()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if not os.path.exists(path):
+            self._write_record(
+                "warcinfo", None, "application/warc-fields", b"software: climafactskg\r\nformat: WARC/1.0\r\n"
+            )
+
+    def _write_record(self, warc_type: str, url: Optional[str], content_type: str, block: bytes) -> None:
+        headers = [
+            "WARC/1.0",
+            f"WARC-Type: {warc_type}",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        ]
+        if url is not None:
+            headers.append(f"WARC-Target-URI: {url}")
+        headers += [f"Content-Type: {content_type}", f"Content-Length: {len(block)}"]
+
+        record = ("\r\n".join(headers) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+        with _open_archive(self.path, "ab") as f:
+            f.write(record)
+
+    def record(self, url: str, content: str, status: int = 200, headers: Optional[dict] = None) -> None:
+        """Record a response in the archive (no-op if the URL was already recorded by this writer).
+
+        Args:
+            url (str): The URL of the response.
+            content (str): The decoded body of the response.
+            status (int, optional): The HTTP status code. Defaults to 200.
+            headers (dict, optional): Additional HTTP headers to store (e.g. `ETag`). Defaults to None.
+        """
+        with self._lock:
+            if url in self._recorded:
+                return
+            self._recorded.add(url)
+
+            body = content.encode("utf-8")
+            http_headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+            http_headers["Content-Length"] = str(len(body))
+            head = f"HTTP/1.1 {status} OK\r\n" + "".join(f"{k}: {v}\r\n" for k, v in http_headers.items())
+            self._write_record(
+                "response",
+                url,
+                "application/http; msgtype=response",
+                head.encode("utf-8") + b"\r\n" + body,
+            )
+
+
+class WARCArchive:
+    """Read-only index of the responses stored in a WARC archive (plain or gzip-compressed).
+
+    Only `response` records are indexed. When a URL appears several times, the last record wins.
+
+    Args:
+        path (str): The path to the archive.
+
+    Raises:
+        FileNotFoundError: If the archive does not exist.
+        ValueError: If the archive is not a valid WARC file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._responses: dict[str, tuple[int, dict, bytes]] = {}
+
+        with _open_archive(path, "rb") as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if not line.startswith(b"WARC/"):
+                    raise ValueError(f"Invalid WARC record in '{path}': {line[:50]!r}")
+
+                warc_headers = {}
+                while (line := f.readline()).strip():
+                    name, _, value = line.decode("utf-8").partition(":")
+                    warc_headers[name.strip().lower()] = value.strip()
+
+                block = f.read(int(warc_headers.get("content-length", 0)))
+                if warc_headers.get("warc-type") == "response" and "warc-target-uri" in warc_headers:
+                    self._responses[warc_headers["warc-target-uri"]] = self._parse_http_response(block)
+
+        logging.info(f"Loaded {len(self._responses)} responses from WARC archive: {path}")
+
+    @staticmethod
+    def _parse_http_response(block: bytes) -> tuple[int, dict, bytes]:
+        head, _, body = block.partition(b"\r\n\r\n")
+        lines = head.decode("iso-8859-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers, body
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._responses
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def urls(self) -> list[str]:
+        """Return the URLs of all the responses in the archive."""
+        return list(self._responses)
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the decoded body of the response recorded for a URL, or None if the URL is not in the archive."""
+        if url not in self._responses:
+            return None
+
+        _, headers, body = self._responses[url]
+        charset = "utf-8"
+        for param in headers.get("content-type", "").split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "charset" and value.strip():
+                charset = value.strip().strip('"')
+        return body.decode(charset, errors="replace")
+
+
+def _configure_from_env() -> None:
+    global _archives_configured, _recorder, _replay
+
+    if not _archives_configured:
+        if (path := os.getenv("CLIMAFACTSKG_WARC_RECORD")) and _recorder is None:
+            _recorder = WARCWriter(path)
+        if (path := os.getenv("CLIMAFACTSKG_WARC_REPLAY")) and _replay is None:
+            _replay = WARCArchive(path)
+        _archives_configured = True
+
+
+def start_recording(path: str) -> WARCWriter:
+    """Record every response returned by `fetch_url_content` and `query_sparqlendpoint` into a WARC archive.
+
+    Args:
+        path (str): The path to the archive (use a `.warc.gz` extension for a compressed archive).
+
+    Returns:
+        WARCWriter: The archive writer.
+    """
+    global _recorder
+
+    with _archives_lock:
+        _configure_from_env()
+        _recorder = WARCWriter(path)
+        return _recorder
+
+
+def start_replay(path: str) -> WARCArchive:
+    """Serve every request of `fetch_url_content` and `query_sparqlendpoint` from a WARC archive, without network.
+
+    Args:
+        path (str): The path to the archive.
+
+    Returns:
+        WARCArchive: The archive.
+    """
+    global _replay
+
+    with _archives_lock:
+        _configure_from_env()
+        _replay = WARCArchive(path)
+        return _replay
+
+
+def stop_archives() -> None:
+    """Stop recording and replaying archives."""
+    global _recorder, _replay
+
+    with _archives_lock:
+        _configure_from_env()
+        _recorder = None
+        _replay = None
+
+
+def get_recorder() -> Optional[WARCWriter]:
+    """Return the active archive writer, if any (configured from `CLIMAFACTSKG_WARC_RECORD` by default)."""
+    with _archives_lock:
+        _configure_from_env()
+        return _recorder
+
+
+def get_replay_archive() -> Optional[WARCArchive]:
+    """Return the active replay archive, if any (configured from `CLIMAFACTSKG_WARC_REPLAY` by default)."""
+    with _archives_lock:
+        _configure_from_env()
+        return _replay
@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from typing import Optional
+
+from bs4.builder import builder_registry
+
+from climafactskg.parsers.skepticalscience import parse_main_article, parse_taxonomy, parse_translated_article
+from climafactskg.utils import fetch_url_content
+
+logging.basicConfig(level=logging.INFO)
+
+SKEPTICALSCIENCE_BASE_URL = "https://skepticalscience.com/"
+
+# Corpus of representative SkepticalScience pages. `manifest.json` lists each page with its URL and the parser to
+# use ("main", "translated" or "taxonomy"), and `golden/` holds the expected output of each page.
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "benchmarks", "skepticalscience")
+
+# Parser backends compared by default. lxml is an optional dependency (`pip install climafactskg[lxml]`), skipped
+# when it is not installed:
+DEFAULT_PARSERS = ("html.parser", "lxml")
+
+# Number of allocation sites reported by `benchmark_parser`:
+TOP_ALLOCATIONS = 5
+
+
+def load_corpus(corpus_dir: str = CORPUS_DIR) -> list[dict]:
+    """Load the pages of a benchmark corpus.
+
+    Args:
+        corpus_dir (str, optional): The corpus directory. Defaults to the corpus shipped with the package.
+
+    Returns:
+        list[dict]: The pages, with their `file` name, `url`, `parser` ("main", "translated" or "taxonomy"),
+            optional `language_code` and `html`.
+    """
+    with open(os.path.join(corpus_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        pages = json.load(f)
+
+    for page in pages:
+        with open(os.path.join(corpus_dir, page["file"]), "r", encoding="utf-8") as f:
+            page["html"] = f.read()
+    return pages
+
+
+def load_pages(sources: list[str]) -> list[dict]:
+    """Load pages to benchmark from local HTML files or URLs, to be parsed as main articles.
+
+    URLs are fetched with `fetch_url_content`, so they are served from the page cache when it is warm. Local files
+    are given the SkepticalScience URL of their file name (e.g. `global-warming-stopped.htm`), which is used to
+    resolve the relative links of the page.
+
+    Args:
+        sources (list[str]): Paths to HTML files or directories of HTML files, or URLs.
+
+    Returns:
+        list[dict]: The pages, in the format of `load_corpus`.
+    """
+    pages = []
+    for source in sources:
+        if source.startswith(("http://", "https://")):
+            pages.append({"file": source, "url": source, "parser": "main", "html": fetch_url_content(source)})
+        elif os.path.isdir(source):
+            files = sorted(name for name in os.listdir(source) if name.endswith((".htm", ".html")))
+            pages += load_pages([os.path.join(source, name) for name in files])
+        else:
+            with open(source, "r", encoding="utf-8") as f:
+                url = SKEPTICALSCIENCE_BASE_URL + os.path.basename(source)
+                pages.append({"file": source, "url": url, "parser": "main", "html": f.read()})
+    return pages
+
+
+def parse_page(page: dict, parser: Optional[str] = None, scoped: Optional[bool] = None):
+    """Parse a corpus page with the parser given in its manifest entry and the given tree builder."""
+    if page["parser"] == "taxonomy":
+        return parse_taxonomy(page["url"], page["html"], parser=parser, scoped=scoped)
+    elif page["parser"] == "translated":
+        return parse_translated_article(
+            page["url"], page["html"], page.get("language_code"), parser=parser, scoped=scoped
+        )
+    return parse_main_article(page["url"], page["html"], parser=parser, scoped=scoped)
+
+
+def _to_json(result) -> str:
+    return json.dumps(result, default=str, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+
+
+def benchmark_parser(pages: list[dict], parser: str, repeat: int = 3, scoped: Optional[bool] = None) -> dict:
+    """Measure the time and memory taken by a parser backend to parse a set of pages.
+
+    The time is measured over `repeat` runs without tracing, the memory over a separate run traced with
+    `tracemalloc`. The allocations are taken from the difference between the snapshots taken before and after
+    parsing all the pages, with the results kept alive.
+
+    Args:
+        pages (list[dict]): The pages, in the format of `load_corpus`.
+        parser (str): The BeautifulSoup tree builder (e.g. "html.parser" or "lxml").
+        repeat (int, optional): The number of runs over all the pages. The fastest run is reported. Defaults to 3.
+        scoped (bool, optional): Only build the tree of the content regions of the pages. Defaults to
+            `SCOPED_PARSING`.
+
+    Returns:
+        dict: The `parser`, the number of `pages`, the `seconds` taken by the fastest run, the `pages_per_second`,
+            the `ms_per_page`, the mean and maximum peak memory allocated while parsing a page (`mean_peak_kib` and
+            `max_peak_kib`), the memory still allocated after parsing all the pages (`retained_kib`), the number of
+            memory blocks still allocated (`retained_blocks`) and the `TOP_ALLOCATIONS` source lines retaining the
+            most memory (`top_allocations`, with their `line`, `kib` and `blocks`).
+    """
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        for page in pages:
+            parse_page(page, parser, scoped)
+        best = min(best, time.perf_counter() - start)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        before_snapshot = tracemalloc.take_snapshot()
+        # Keep the results alive, to measure the memory they retain:
+        results = []
+        for page in pages:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            results.append(parse_page(page, parser, scoped))
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        after_snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    # Ignore the memory allocated by tracemalloc itself:
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after_snapshot.filter_traces(filters).compare_to(before_snapshot.filter_traces(filters), "lineno")
+    top = sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:TOP_ALLOCATIONS]
+
+    return {
+        "parser": parser,
+        "pages": len(pages),
+        "seconds": round(best, 4),
+        "pages_per_second": round(len(pages) / best, 2) if best > 0 else None,
+        "ms_per_page": round(1000 * best / len(pages), 3) if pages else None,
+        "mean_peak_kib": round(sum(peaks) / len(peaks) / 1024, 1) if peaks else None,
+        "max_peak_kib": round(max(peaks) / 1024, 1) if peaks else None,
+        "retained_kib": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+        "retained_blocks": sum(stat.count_diff for stat in stats),
+        "top_allocations": [
+            {
+                "line": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "kib": round(stat.size_diff / 1024, 1),
+                "blocks": stat.count_diff,
+            }
+            for stat in top
+        ],
+    }
+
+
+def compare_parsers(
+    pages: list[dict], parser: str, reference: str = "html.parser", scoped: Optional[bool] = None
+) -> list[str]:
+    """Return the pages for which a parser backend does not produce the same output as the reference backend.
+
+    Args:
+        pages (list[dict]): The pages, in the format of `load_corpus`.
+        parser (str): The BeautifulSoup tree builder to check.
+        reference (str, optional): The reference tree builder. Defaults to "html.parser".
+        scoped (bool, optional): Only build the tree of the content regions of the pages. Defaults to
+            `SCOPED_PARSING`.
+
+    Returns:
+        list[str]: The files (or URLs) of the pages with a different output.
+    """
+    return [page["file"] for page in pages if parse_page(page, parser, scoped) != parse_page(page, reference, scoped)]
+
+
+def check_golden(
+    corpus_dir: str = CORPUS_DIR, parser: Optional[str] = None, update: bool = False, scoped: Optional[bool] = None
+) -> list[str]:
+    """Compare the output of the parsers on a corpus with the expected (golden) output stored in `golden/`.
+
+    Args:
+        corpus_dir (str, optional): The corpus directory. Defaults to the corpus shipped with the package.
+        parser (str, optional): The BeautifulSoup tree builder. Defaults to `HTML_PARSER`.
+        update (bool, optional): Write the current output as the new golden output. Defaults to False.
+        scoped (bool, optional): Only build the tree of the content regions of the pages. Defaults to
+            `SCOPED_PARSING`.
+
+    Returns:
+        list[str]: The files of the pages whose output differs from the golden output (or has no golden output).
+            Always empty when `update` is True.
+    """
+    golden_dir = os.path.join(corpus_dir, "golden")
+    os.makedirs(golden_dir, exist_ok=True)
+
+    mismatches = []
+    for page in load_corpus(corpus_dir):
+        output = _to_json(parse_page(page, parser, scoped))
+        golden_path = os.path.join(golden_dir, os.path.splitext(page["file"])[0] + ".json")
+
+        if update:
+            with open(golden_path, "w", encoding="utf-8") as f:
+                f.write(output)
+            continue
+
+        if not os.path.exists(golden_path):
+            mismatches.append(page["file"])
+            continue
+        with open(golden_path, "r", encoding="utf-8") as f:
+            if f.read() != output:
+                mismatches.append(page["file"])
+
+    return mismatches
+
+
+def run_benchmarks(
+    sources: Optional[list[str]] = None,
+    parsers: Optional[list[str]] = None,
+    repeat: int = 3,
+    scoped: Optional[bool] = None,
+) -> list[dict]:
+    """Benchmark the SkepticalScience parsers with each parser backend and check that they produce the same output.
+
+    Args:
+        sources (list[str], optional): Paths to HTML files or directories of HTML files, or URLs, parsed as main
+            articles. Defaults to the pages of the benchmark corpus.
+        parsers (list[str], optional): The tree builders to compare. Defaults to the `DEFAULT_PARSERS` that are
+            installed.
+        repeat (int, optional): The number of runs over all the pages. Defaults to 3.
+        scoped (bool, optional): Only build the tree of the content regions of the pages. Defaults to
+            `SCOPED_PARSING`.
+
+    Returns:
+        list[dict]: The results of `benchmark_parser` for each backend, with the `speedup` relative to the first
+            backend and the pages whose output differs from the first backend (`mismatches`).
+    """
+    if not parsers:
+        parsers = []
+        for parser in DEFAULT_PARSERS:
+            if builder_registry.lookup(parser) is None:
+                logging.warning(f"Skipping the '{parser}' parser backend, which is not installed.")
+            else:
+                parsers.append(parser)
+    pages = load_pages(sources) if sources else load_corpus()
+    logging.info(f"Benchmarking {len(parsers)} parser(s) on {len(pages)} pages.")
+
+    results = []
+    for parser in parsers:
+        result = benchmark_parser(pages, parser, repeat=repeat, scoped=scoped)
+        result["speedup"] = round(results[0]["seconds"] / result["seconds"], 2) if results else 1.0
+        result["mismatches"] = compare_parsers(pages, parser, reference=parsers[0], scoped=scoped) if results else []
+        results.append(result)
+    return results
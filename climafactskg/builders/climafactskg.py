@@ -2,25 +2,30 @@ import logging
 from typing import Optional
 
 import iso639
+import requests
 from dotenv import load_dotenv
-from rdflib import OWL, RDF, RDFS, SDO, BNode, Graph, Literal, Namespace
+from rdflib import OWL, RDF, RDFS, SDO, SKOS, BNode, Graph, Literal, Namespace
 from rdflib.namespace import NamespaceManager
-from tinydb import JSONStorage, TinyDB
-from tinydb_serialization import SerializationMiddleware
-from tinydb_serialization.serializers import DateTimeSerializer
+from tinydb import TinyDB
 
 from climafactskg.builders.cimplekg import generate_cimplekg_mappings
+from climafactskg.parsers.skepticalscience import TAXONOMY_URL, TaxonomyIndex, load_taxonomy
+from climafactskg.storage import open_database
 from climafactskg.utils import hash_string
 
 logging.basicConfig(level=logging.INFO)
 
 
-def generate_climafactskg_base(db: TinyDB, ignore_urls: Optional[list] = None) -> Graph:
+def generate_climafactskg_base(
+    db: TinyDB, ignore_urls: Optional[list] = None, taxonomy: Optional[TaxonomyIndex] = None
+) -> Graph:
     """Generates a knowledge graph (KG) in RDF format from the articles stored in a TinyDB database.
 
     Args:
         db (TinyDB): The TinyDB database instance containing the articles and their metadata.
         ignore_urls (list, optional): A list of URLs to ignore while generating the KG. Defaults to None.
+        taxonomy (TaxonomyIndex, optional): The SkepticalScience taxonomy. Its categories are added as SKOS concepts
+            and each article is linked to the category of its main URL. Defaults to None.
 
     Returns:
         Graph: An RDFLib Graph object representing the generated knowledge graph.
@@ -30,6 +35,7 @@ def generate_climafactskg_base(db: TinyDB, ignore_urls: Optional[list] = None) -
         2. For each article:
             - Adds RDF triples for metadata such as URL, language, author, publisher, license, and content.
             - Handles nested data like related arguments, languages, and claims.
+            - Links the article to its taxonomy category, if a taxonomy is given.
         3. Logs progress and any issues encountered during the process.
 
     Notes:
@@ -49,6 +55,15 @@ def generate_climafactskg_base(db: TinyDB, ignore_urls: Optional[list] = None) -
     g.namespace_manager = NamespaceManager(Graph())
     g.namespace_manager.bind("", ns)
 
+    # Add the taxonomy categories once, the articles are then linked to their category by an index lookup:
+    if taxonomy is not None:
+        for category_url in taxonomy.categories():
+            category_id = f"category_{hash_string(category_url)}"
+            g.add((ns[category_id], RDF.type, SKOS.Concept))
+            g.add((ns[category_id], SDO.url, Literal(category_url, datatype=SDO.URL)))
+            if parent_url := taxonomy.parent(category_url):
+                g.add((ns[category_id], SKOS.broader, ns[f"category_{hash_string(parent_url)}"]))
+
     # Iterate over all the articles in the database and create RDF triples:
     for arg in db.all():
         url = arg["url"]
@@ -178,6 +193,10 @@ def generate_climafactskg_base(db: TinyDB, ignore_urls: Optional[list] = None) -
                 )
                 g.add((ns[cards_category_id], SDO.subjectOf, ns[claimreview_id]))
 
+            # Add the taxonomy category if present:
+            if taxonomy is not None and (category_url := taxonomy.parent(arg["main_url"])):
+                g.add((ns[claimreview_id], SDO.about, ns[f"category_{hash_string(category_url)}"]))
+
             # Add content of the review:
             g.add((ns[claimreview_id], SDO.name, Literal(arg["title"], lang=lang)))
             g.add(
@@ -260,6 +279,7 @@ def build_climafactskg(
     cards_ttl: str = "data/cards.ttl",
     cimplekg_db: str = "data/cimplekg_claims_db.json",
     ignore_urls: Optional[list] = None,
+    taxonomy_url: Optional[str] = TAXONOMY_URL,
 ) -> Graph:
     """Builds the ClimaFacts Knowledge Graph by integrating data from multiple sources.
 
@@ -268,18 +288,20 @@ def build_climafactskg(
     ignoring specified URLs.
 
     Args:
-        climafactskg_db (str): Path to the Skeptical Science arguments JSON database.
+        climafactskg_db (str): Path to the Skeptical Science arguments database (JSON or SQLite).
             Defaults to "data/skepticalscience_arguments_db.json".
         cards_ttl (str): Path to the Turtle (.ttl) file containing CARDS data. Defaults to "data/cards.ttl".
-        cimplekg_db (str): Path to the CimpleKG claims JSON database. Defaults to "data/cimplekg_claims_db.json".
+        cimplekg_db (str): Path to the CimpleKG claims database (JSON or SQLite).
+            Defaults to "data/cimplekg_claims_db.json".
         ignore_urls (Optional[list]): List of URLs to ignore when building the graph. Defaults to None.
+        taxonomy_url (Optional[str]): The URL of the SkepticalScience taxonomy page, whose categories are added to the
+            graph (see `load_taxonomy`). Defaults to `TAXONOMY_URL`. The taxonomy is left out if None, or (with an
+            error logged) if the page cannot be fetched or has no taxonomy.
 
     Returns:
         Graph: An RDFLib Graph object containing the integrated knowledge graph.
     """
     load_dotenv()
-    serialization = SerializationMiddleware(JSONStorage)
-    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
 
     logging.info("Starting ClimaFactsKG build process.")
 
@@ -288,12 +310,21 @@ def build_climafactskg(
     if ignore_urls is None:
         ignore_urls = ["https://skepticalscience.com/wigley-santer-2012-attribution.html"]
 
+    taxonomy = None
+    if taxonomy_url:
+        logging.info(f"Loading the taxonomy from: {taxonomy_url}")
+        try:
+            taxonomy = load_taxonomy(taxonomy_url)
+        except (requests.RequestException, ValueError) as e:
+            # The page could not be fetched or the taxonomy was not found in it:
+            logging.error(f"Error loading the taxonomy, it is left out of the graph: {e}")
+
     logging.info(f"Loading ClimaFactsKG DB from: {climafactskg_db}")
-    with TinyDB(climafactskg_db, storage=serialization) as db:
-        db.default_table_name = "arguments"
+    with open_database(climafactskg_db, table="arguments") as db:
         g = generate_climafactskg_base(
             db,
             ignore_urls=ignore_urls,
+            taxonomy=taxonomy,
         )
     logging.info(f"Parsing CARDS Turtle file: {cards_ttl}")
     cards_g = Graph()
@@ -302,8 +333,7 @@ def build_climafactskg(
 
     logging.info(f"Loading CimpleKG DB from: {cimplekg_db}")
     # add existing CimpleKG to g:
-    with TinyDB(cimplekg_db, storage=serialization) as db:
-        db.default_table_name = "mappings"
+    with open_database(cimplekg_db, table="mappings") as db:
         cimplekg_g = generate_cimplekg_mappings(db)
         g += cimplekg_g
 
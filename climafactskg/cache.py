@@ -0,0 +1,678 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from climafactskg.utils import hash_string
+
+logging.basicConfig(level=logging.INFO)
+
+SQLITE_CACHE_FILENAME = "climafactskg_pages.sqlite"
+SPARQL_CACHE_DIRNAME = "sparql"
+PARSE_STORE_FILENAME = "climafactskg_parses.sqlite"
+
+# When the cache exceeds its maximum size, entries are evicted until it is back under this fraction of the maximum,
+# so that a full cache does not trigger an eviction on every write:
+EVICTION_TARGET_RATIO = 0.9
+
+# Number of cache hits whose access time is kept in memory before being written, so that reads are not writes:
+ACCESS_FLUSH_SIZE = 100
+
+# String literals of SPARQL queries, or runs of whitespace:
+_QUERY_TOKEN_PATTERN = re.compile(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')|\s+")
+
+
+class PageCache(ABC):
+    """Base class for the page cache backends used by `fetch_url_content`.
+
+    Entries are keyed by the MD5 hash of their URL (see `hash_string`). A cache entry is a dictionary with the
+    following keys:
+        - content (str): The body of the page.
+        - timestamp (datetime): When the page was last fetched or revalidated.
+        - etag (str or None): The `ETag` header returned by the server.
+        - last_modified (str or None): The `Last-Modified` header returned by the server.
+
+    Args:
+        max_bytes (int, optional): The maximum size of the cache in bytes. When a write makes the cache larger than
+            this size, the least recently used entries are evicted. Defaults to None (unbounded).
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+
+    def get(self, url: str) -> Optional[dict]:
+        """Return the cache entry for a URL, or None if the URL is not cached."""
+        return self.get_by_key(hash_string(url))
+
+    @abstractmethod
+    def get_by_key(self, key: str) -> Optional[dict]:
+        """Return the cache entry stored under a key, or None if there is none."""
+
+    def set(self, url: str, entry: dict) -> None:
+        """Store the cache entry for a URL."""
+        self.set_by_key(hash_string(url), entry, url=url)
+
+    @abstractmethod
+    def set_by_key(self, key: str, entry: dict, url: Optional[str] = None) -> None:
+        """Store a cache entry under a key, with the URL it was fetched from when known."""
+
+    def delete(self, url: str) -> None:
+        """Remove a URL from the cache (no-op if the URL is not cached)."""
+        self.delete_by_key(hash_string(url))
+
+    @abstractmethod
+    def delete_by_key(self, key: str) -> None:
+        """Remove the entry stored under a key (no-op if there is none)."""
+
+    @abstractmethod
+    def keys(self) -> Iterator[str]:
+        """Iterate over the keys of all the cached entries."""
+
+    @abstractmethod
+    def usage(self) -> list[tuple[str, int, datetime, float]]:
+        """Return the `(key, size in bytes, timestamp, last access time)` of all the entries.
+
+        The last access time is a POSIX timestamp.
+        """
+
+    def stats(self) -> dict:
+        """Return summary statistics about the cache.
+
+        Returns:
+            dict: A dictionary with the number of entries, their total size in bytes, the maximum size of the cache and
+                the timestamps of the oldest and newest entries.
+        """
+        usage = self.usage()
+        timestamps = [timestamp for _, _, timestamp, _ in usage]
+        return {
+            "entries": len(usage),
+            "size_bytes": sum(size for _, size, _, _ in usage),
+            "max_bytes": self.max_bytes,
+            "oldest": min(timestamps).isoformat() if timestamps else None,
+            "newest": max(timestamps).isoformat() if timestamps else None,
+        }
+
+    def prune(self, max_bytes: Optional[int] = None, max_age: Optional[timedelta] = None) -> int:
+        """Evict entries older than `max_age`, then the least recently used entries until the cache fits `max_bytes`.
+
+        Args:
+            max_bytes (int, optional): The size the cache must fit in. Defaults to the maximum size of the cache.
+            max_age (timedelta, optional): Entries fetched before this age are evicted. Defaults to None (no limit).
+
+        Returns:
+            int: The number of evicted entries.
+        """
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        usage = sorted(self.usage(), key=lambda item: item[3])  # Least recently used first
+        total = sum(size for _, size, _, _ in usage)
+        evicted = 0
+
+        oldest_allowed = datetime.now() - max_age if max_age is not None else None
+        for key, size, timestamp, _ in usage:
+            too_old = oldest_allowed is not None and timestamp < oldest_allowed
+            too_big = max_bytes is not None and total > max_bytes
+            if too_old or too_big:
+                self.delete_by_key(key)
+                total -= size
+                evicted += 1
+
+        if evicted:
+            logging.info(f"Evicted {evicted} cache entries ({total} bytes remaining).")
+        return evicted
+
+    def verify(self, remove: bool = False) -> list[str]:
+        """Check that every entry of the cache can be read.
+
+        Args:
+            remove (bool, optional): Remove the corrupted entries. Defaults to False.
+
+        Returns:
+            list[str]: The keys of the corrupted entries.
+        """
+        corrupted = []
+        for key in list(self.keys()):
+            try:
+                entry = self.get_by_key(key)
+                if entry is None or not isinstance(entry["content"], str):
+                    raise ValueError("Missing content.")
+            except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+                logging.warning(f"Corrupted cache entry {key}: {e}")
+                corrupted.append(key)
+                if remove:
+                    self.delete_by_key(key)
+        return corrupted
+
+    def close(self) -> None:  # noqa: B027 (backends without resources do not override it)
+        """Release the resources held by the backend."""
+
+
+class DirectoryPageCache(PageCache):
+    """Page cache storing each page as an uncompressed `<md5>.json` file in a directory (original layout).
+
+    The last access time of an entry is tracked with the access time of its file. When the cache has a maximum size,
+    the directory is scanned once on the first write, and the total size is then kept up to date in memory.
+
+    Args:
+        cache_dir (str): The directory containing the cache files.
+        max_bytes (int, optional): The maximum size of the cache in bytes. Defaults to None (unbounded).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        super().__init__(max_bytes=max_bytes)
+        self.cache_dir = cache_dir
+        self._total_size: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _size(self, path: str) -> int:
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get_by_key(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r", encoding="utf-8") as cache_file:
+            data = json.load(cache_file)
+
+        # Record the access explicitly, file systems are often mounted with `noatime`:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+
+        return {
+            "content": data["content"],
+            "timestamp": datetime.fromisoformat(data["timestamp"]),
+            "etag": data.get("etag"),
+            "last_modified": data.get("last_modified"),
+        }
+
+    def set_by_key(self, key: str, entry: dict, url: Optional[str] = None) -> None:
+        path = self._path(key)
+        if self.max_bytes is not None and self._total_size is None:
+            total_size = sum(size for _, size, _, _ in self.usage())
+            with self._lock:
+                if self._total_size is None:
+                    self._total_size = total_size
+
+        # Write to a temporary file first so concurrent readers never see partial data:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(
+                {
+                    "content": entry["content"],
+                    "timestamp": entry["timestamp"].isoformat(),
+                    "etag": entry.get("etag"),
+                    "last_modified": entry.get("last_modified"),
+                },
+                cache_file,
+            )
+        with self._lock:
+            previous = self._size(path)
+            os.replace(tmp_path, path)
+            if self._total_size is not None:
+                self._total_size += self._size(path) - previous
+
+        if self._total_size is not None and self._total_size > self.max_bytes:
+            self.prune(max_bytes=int(self.max_bytes * EVICTION_TARGET_RATIO))
+
+    def delete_by_key(self, key: str) -> None:
+        path = self._path(key)
+        with self._lock:
+            size = self._size(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            if self._total_size is not None:
+                self._total_size -= size
+
+    def prune(self, max_bytes: Optional[int] = None, max_age: Optional[timedelta] = None) -> int:
+        evicted = super().prune(max_bytes=max_bytes, max_age=max_age)
+        # Other processes may share the directory, so the total size is scanned again on the next write:
+        with self._lock:
+            self._total_size = None
+        return evicted
+
+    def keys(self) -> Iterator[str]:
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                name, ext = os.path.splitext(entry.name)
+                # Only consider files named after an MD5 hash (the cache directory may be shared, e.g. /tmp):
+                if ext == ".json" and len(name) == 32 and all(c in "0123456789abcdef" for c in name):
+                    yield name
+
+    def usage(self) -> list[tuple[str, int, datetime, float]]:
+        usage = []
+        for key in self.keys():
+            try:
+                stat = os.stat(self._path(key))
+            except FileNotFoundError:
+                continue
+            usage.append((key, stat.st_size, datetime.fromtimestamp(stat.st_mtime), stat.st_atime))
+        return usage
+
+
+class SQLitePageCache(PageCache):
+    """Page cache storing all the pages in a single SQLite file, with zlib-compressed bodies.
+
+    Entries are indexed by their key (primary key lookup), so a read only touches the requested page. The database
+    uses WAL mode and a single connection guarded by a lock, so it can be shared by several threads. The total size
+    of the cache is kept in memory, so enforcing the maximum size does not require a scan on every write. The access
+    times of the cache hits are written in batches of `ACCESS_FLUSH_SIZE` (and before the entries are listed or the
+    cache is closed), so reads do not start a write transaction.
+
+    Args:
+        path (str): The path to the SQLite database file.
+        compression_level (int, optional): The zlib compression level. Defaults to 6.
+        max_bytes (int, optional): The maximum size of the (compressed) pages in bytes. Defaults to None (unbounded).
+    """
+
+    def __init__(self, path: str, compression_level: int = 6, max_bytes: Optional[int] = None):
+        super().__init__(max_bytes=max_bytes)
+        self.path = path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Only effective when the file is created
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                timestamp TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                last_access REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pages)")]
+        if "last_access" not in columns:
+            self._conn.execute("ALTER TABLE pages ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._conn.commit()
+
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        # Access times of the cache hits not written yet, by key:
+        self._pending_access: dict[str, float] = {}
+
+    def _flush_access(self) -> None:
+        # Must be called with the lock held:
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE pages SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self._pending_access.items()],
+            )
+            self._conn.commit()
+            self._pending_access.clear()
+
+    def get_by_key(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, timestamp, etag, last_modified FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._pending_access[key] = time.time()
+                if len(self._pending_access) >= ACCESS_FLUSH_SIZE:
+                    self._flush_access()
+
+        if row is None:
+            return None
+
+        content, timestamp, etag, last_modified = row
+        return {
+            "content": zlib.decompress(content).decode("utf-8"),
+            "timestamp": datetime.fromisoformat(timestamp),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def set_by_key(self, key: str, entry: dict, url: Optional[str] = None) -> None:
+        content = zlib.compress(entry["content"].encode("utf-8"), self.compression_level)
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                """
+                INSERT INTO pages (key, url, timestamp, etag, last_modified, size, content, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    url = COALESCE(excluded.url, pages.url),
+                    timestamp = excluded.timestamp,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    size = excluded.size,
+                    content = excluded.content,
+                    last_access = excluded.last_access
+                """,
+                (
+                    key,
+                    url,
+                    entry["timestamp"].isoformat(),
+                    entry.get("etag"),
+                    entry.get("last_modified"),
+                    len(content),
+                    content,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+            self._pending_access.pop(key, None)
+            self._total_size += len(content) - (previous[0] if previous else 0)
+
+        if self.max_bytes is not None and self._total_size > self.max_bytes:
+            self.prune(max_bytes=int(self.max_bytes * EVICTION_TARGET_RATIO))
+
+    def delete_by_key(self, key: str) -> None:
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            self._conn.commit()
+            self._pending_access.pop(key, None)
+            if previous:
+                self._total_size -= previous[0]
+
+    def keys(self) -> Iterator[str]:
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute("SELECT key FROM pages")]
+        yield from keys
+
+    def usage(self) -> list[tuple[str, int, datetime, float]]:
+        with self._lock:
+            self._flush_access()
+            rows = self._conn.execute("SELECT key, size, timestamp, last_access FROM pages").fetchall()
+        return [
+            (key, size, datetime.fromisoformat(timestamp), last_access) for key, size, timestamp, last_access in rows
+        ]
+
+    def prune(self, max_bytes: Optional[int] = None, max_age: Optional[timedelta] = None) -> int:
+        evicted = super().prune(max_bytes=max_bytes, max_age=max_age)
+        if evicted:
+            with self._lock:
+                # Give the space of the evicted pages back to the file system:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.execute("PRAGMA incremental_vacuum")
+        return evicted
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["file_size_bytes"] = sum(
+            os.path.getsize(path) for path in (self.path, f"{self.path}-wal") if os.path.exists(path)
+        )
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_page_cache(cache_dir: str, backend: Optional[str] = None) -> PageCache:
+    """Return the page cache stored in the given directory.
+
+    Instances are shared, so all the calls for the same directory and backend use the same connection. The maximum
+    size of the cache in bytes is read from the `CLIMAFACTSKG_CACHE_MAX_BYTES` environment variable (unbounded if
+    not set).
+
+    Args:
+        cache_dir (str): The cache directory.
+        backend (str, optional): The cache backend, either "sqlite" (single compressed file) or "directory"
+            (one JSON file per URL). Defaults to the `CLIMAFACTSKG_CACHE_BACKEND` environment variable or "sqlite".
+            When the default SQLite cache is created in a directory holding pages in the directory layout, these
+            pages are migrated to it.
+
+    Returns:
+        PageCache: The page cache.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    default_backend = backend is None
+    backend = backend or os.getenv("CLIMAFACTSKG_CACHE_BACKEND", "sqlite")
+    max_bytes = int(os.getenv("CLIMAFACTSKG_CACHE_MAX_BYTES", 0)) or None
+    if backend == "sqlite":
+        path = os.path.join(cache_dir, SQLITE_CACHE_FILENAME)
+        created = not os.path.exists(path)
+        cache = SQLitePageCache(path, max_bytes=max_bytes)
+
+        # The directory layout was the default backend, so its pages are migrated rather than fetched again:
+        if created and default_backend:
+            legacy = DirectoryPageCache(cache_dir)
+            if any(True for _ in legacy.keys()):
+                logging.warning(
+                    f"Migrating the pages cached in '{cache_dir}' to the SQLite cache '{path}'. The JSON files are "
+                    "kept and can be removed with `climafactskg cache migrate --remove`."
+                )
+                migrate_page_cache(legacy, cache)
+        return cache
+    elif backend == "directory":
+        return DirectoryPageCache(cache_dir, max_bytes=max_bytes)
+    else:
+        raise ValueError(f"Unknown page cache backend: '{backend}'. Expected 'sqlite' or 'directory'.")
+
+
+def migrate_page_cache(source: PageCache, target: PageCache, remove: bool = False) -> int:
+    """Copy all the entries of a page cache into another one (e.g. from the directory layout to SQLite).
+
+    Entries that cannot be read (e.g. truncated JSON files) are skipped and logged.
+
+    Args:
+        source (PageCache): The cache to read the entries from.
+        target (PageCache): The cache to write the entries to.
+        remove (bool, optional): Remove the entries from the source cache once copied. Defaults to False.
+
+    Returns:
+        int: The number of migrated entries.
+    """
+    migrated = 0
+    for key in list(source.keys()):
+        try:
+            entry = source.get_by_key(key)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Skipping unreadable cache entry {key}: {e}")
+            continue
+
+        if entry is None:
+            continue
+
+        target.set_by_key(key, entry)
+        if remove:
+            source.delete_by_key(key)
+        migrated += 1
+
+    logging.info(f"Migrated {migrated} cache entries.")
+    return migrated
+
+
+def normalize_query(query: str) -> str:
+    """Return a canonical form of a SPARQL query, so that queries differing only by their layout share a cache entry.
+
+    Runs of whitespace outside of string literals are collapsed into a single space.
+
+    Args:
+        query (str): The SPARQL query.
+
+    Returns:
+        str: The normalized query.
+    """
+    return _QUERY_TOKEN_PATTERN.sub(lambda m: m.group(1) or " ", query).strip()
+
+
+class QueryResultCache:
+    """Disk cache of SPARQL query results used by `query_sparqlendpoint`.
+
+    Results are stored as one Parquet file per query, keyed by the MD5 hash of the endpoint URL, the normalized
+    query and the decoding options, so cache hits are loaded column by column without decoding a SPARQL response
+    again.
+
+    Args:
+        cache_dir (str): The directory containing the cached results.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, endpoint_url: str, query: str, **options) -> str:
+        key = f"{endpoint_url}\n{normalize_query(query)}"
+        # Options changing the decoded results (e.g. the column types) are part of the key:
+        options = {name: value for name, value in options.items() if value}
+        if options:
+            key += f"\n{json.dumps(options, sort_keys=True)}"
+        return os.path.join(self.cache_dir, f"{hash_string(key)}.parquet")
+
+    def get(self, endpoint_url: str, query: str, max_age: timedelta, **options) -> Optional[pd.DataFrame]:
+        """Return the cached results of a query, or None if they are missing or older than `max_age`."""
+        path = self._path(endpoint_url, query, **options)
+        try:
+            if datetime.fromtimestamp(os.stat(path).st_mtime) <= datetime.now() - max_age:
+                return None
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable SPARQL cache entry {path}: {e}")
+            return None
+
+    def set(self, endpoint_url: str, query: str, results: pd.DataFrame, **options) -> None:
+        """Store the results of a query."""
+        path = self._path(endpoint_url, query, **options)
+
+        # Write to a temporary file first so concurrent readers never see partial data:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        results.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def prune(self, max_age: timedelta) -> int:
+        """Remove the results cached more than `max_age` ago and return the number of removed entries."""
+        removed = 0
+        limit = (datetime.now() - max_age).timestamp()
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".parquet") and entry.stat().st_mtime <= limit:
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
+
+
+@lru_cache(maxsize=None)
+def get_query_cache(cache_dir: str) -> QueryResultCache:
+    """Return the SPARQL query result cache stored in the `sparql` subdirectory of the given cache directory."""
+    return QueryResultCache(os.path.join(cache_dir, SPARQL_CACHE_DIRNAME))
+
+
+def _encode_json_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_json_object(obj: dict):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class ParseResultStore:
+    """Store of the articles extracted from pages, so pages whose HTML did not change are not parsed again.
+
+    Articles are keyed by the URL of the page, the hash of its HTML, the language code passed to the parser and the
+    fingerprint of the parser (see `parser_fingerprint`), so any change to the parser code makes the stored articles
+    unreachable. They are stored as zlib-compressed JSON in a single SQLite file, which can be shared by several
+    threads.
+
+    Args:
+        path (str): The path to the SQLite database file.
+        compression_level (int, optional): The zlib compression level. Defaults to 6.
+    """
+
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                article BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS articles_fingerprint ON articles (fingerprint)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(url: str, content_hash: str, fingerprint: str, language_code: Optional[str]) -> str:
+        return hash_string(f"{url}\n{content_hash}\n{fingerprint}\n{language_code or ''}")
+
+    def get(self, url: str, content_hash: str, fingerprint: str, language_code: Optional[str] = None) -> Optional[dict]:
+        """Return the article extracted from a page, or None if the page was not parsed with this parser."""
+        key = self._key(url, content_hash, fingerprint, language_code)
+        with self._lock:
+            row = self._conn.execute("SELECT article FROM articles WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"), object_hook=_decode_json_object)
+
+    def set(
+        self, url: str, content_hash: str, fingerprint: str, article: dict, language_code: Optional[str] = None
+    ) -> None:
+        """Store the article extracted from a page."""
+        key = self._key(url, content_hash, fingerprint, language_code)
+        data = zlib.compress(json.dumps(article, default=_encode_json_value).encode("utf-8"), self.compression_level)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (key, fingerprint, timestamp, article) VALUES (?, ?, ?, ?)",
+                (key, fingerprint, datetime.now().isoformat(), data),
+            )
+            self._conn.commit()
+
+    def prune(self, fingerprint: str) -> int:
+        """Remove the articles extracted by other versions of the parser and return the number of removed entries."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM articles WHERE fingerprint != ?", (fingerprint,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_parse_store(cache_dir: str) -> ParseResultStore:
+    """Return the store of parsed articles kept in the given cache directory."""
+    return ParseResultStore(os.path.join(cache_dir, PARSE_STORE_FILENAME))
@@ -678,16 +678,12 @@ def cards_classification(text: str) -> str:
 if __name__ == "__main__":
     from dotenv import load_dotenv
     from rich.progress import track
-    from tinydb import JSONStorage, TinyDB
-    from tinydb_serialization import SerializationMiddleware
-    from tinydb_serialization.serializers import DateTimeSerializer
+
+    from climafactskg.storage import open_database
 
     load_dotenv()
-    serialization = SerializationMiddleware(JSONStorage)
-    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
 
-    with TinyDB("data/skepticalscience_arguments_db.json", storage=serialization) as db:
-        db.default_table_name = "arguments"
+    with open_database("data/skepticalscience_arguments_db.json", table="arguments") as db:
         classifier = CARDSClassifier()
 
         for argument in track(db.all(), description="Classifying arguments..."):
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from typing import Optional
 
 import typer
@@ -35,14 +37,33 @@ def callback(
         raise typer.Exit()
 
 
+def _start_archives(record_warc: Optional[str], replay_warc: Optional[str]) -> None:
+    from climafactskg.archives import start_recording, start_replay
+
+    if record_warc:
+        start_recording(record_warc)
+    if replay_warc:
+        start_replay(replay_warc)
+
+
 @app.command()
-def collect():
+def collect(
+    urls_file: str = typer.Option(
+        "data/skepticalscience_urls.json",
+        help="Path to the file listing the SkepticalScience argument URLs (with the changes since the last run).",
+    ),
+    record_warc: Optional[str] = typer.Option(None, help="Record every fetched response into this WARC archive."),
+    replay_warc: Optional[str] = typer.Option(None, help="Replay responses from this WARC archive (no network)."),
+):
     """Collect data for the ClimaFactsKG knowledge graph."""
     from climafactskg.collectors.cimplekg import fetch_claims
     from climafactskg.collectors.skepticalscience import fetch_arguments_urls
 
+    _start_archives(record_warc, replay_warc)
+
     fetch_arguments_urls(
         ignore_urls=["https://skepticalscience.com/wigley-santer-2012-attribution.html"],
+        urls_file=urls_file,
     )
     fetch_claims()
 
@@ -54,33 +75,89 @@ def process(
         help="Path to the SkepticalScience arguments database.",
     ),
     cimplekg_db: str = typer.Option("data/cimplekg_mappings_db.json", help="Path to the CimpleKG claims database."),
+    cimplekg_page_size: int = typer.Option(1000, help="Number of CimpleKG claims requested per SPARQL query."),
+    cimplekg_checkpoint: str = typer.Option(
+        "data/cimplekg_checkpoint.json", help="Path to the checkpoint used to resume an interrupted CimpleKG harvest."
+    ),
+    cimplekg_watermark: str = typer.Option(
+        "data/cimplekg_watermark.json", help="Path to the watermark used to only request new CimpleKG claims."
+    ),
+    cimplekg_overlap_days: int = typer.Option(
+        int(os.getenv("CLIMAFACTSKG_CIMPLEKG_SYNC_OVERLAP_DAYS", 7)),
+        help="Number of days before the watermark that are requested again, to catch late CimpleKG claims.",
+    ),
+    cimplekg_full_sync: bool = typer.Option(
+        False, help="Harvest all the CimpleKG claims, whatever the watermark (which is then updated)."
+    ),
+    urls_file: str = typer.Option(
+        "data/skepticalscience_urls.json", help="Path to the SkepticalScience argument URLs saved by `collect`."
+    ),
+    new_only: bool = typer.Option(
+        False, help="Only process the argument URLs added by the last `collect` run (read from --urls-file)."
+    ),
+    workers: int = typer.Option(1, help="Number of SkepticalScience arguments crawled concurrently."),
+    parse_workers: int = typer.Option(
+        0, help="Number of processes parsing the SkepticalScience pages (0 parses them in the crawl threads)."
+    ),
+    parse_cache: bool = typer.Option(
+        True, help="Reuse the articles already extracted from identical pages by the same parser code."
+    ),
+    max_per_host: int = typer.Option(4, help="Maximum number of concurrent requests per host."),
+    requests_per_second: Optional[float] = typer.Option(
+        None, help="Maximum number of requests per second per host (unlimited by default)."
+    ),
+    record_warc: Optional[str] = typer.Option(None, help="Record every fetched response into this WARC archive."),
+    replay_warc: Optional[str] = typer.Option(None, help="Replay responses from this WARC archive (no network)."),
+    db_batch_size: int = typer.Option(
+        int(os.getenv("CLIMAFACTSKG_DB_BATCH_SIZE", 100)),
+        help="Number of database changes kept in memory before they are written to disk (1 writes every change).",
+    ),
 ):
     """Process collected data and store it in the knowledge graph."""
-    from tinydb import JSONStorage, TinyDB
-    from tinydb_serialization import SerializationMiddleware
-    from tinydb_serialization.serializers import DateTimeSerializer
+    from datetime import timedelta
 
     import climafactskg.collectors.cimplekg as cimplekg_collectors
     import climafactskg.collectors.skepticalscience as skepticalscience_collectors
+    from climafactskg.storage import open_database
 
     load_dotenv()
-    serialization = SerializationMiddleware(JSONStorage)
-    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
+    _start_archives(record_warc, replay_warc)
 
     ignore_urls = ["https://skepticalscience.com/wigley-santer-2012-attribution.html"]
 
-    with TinyDB(cimplekg_db, storage=serialization) as db:
-        db.default_table_name = "mappings"
-        cimplekg_collectors.process_all(db, cimplekg_collectors.fetch_claims())
+    with open_database(cimplekg_db, table="mappings", batch_size=db_batch_size) as db:
+        cimplekg_collectors.process_all(
+            db,
+            cimplekg_collectors.iter_claims(
+                page_size=cimplekg_page_size,
+                checkpoint_file=cimplekg_checkpoint,
+                watermark_file=cimplekg_watermark,
+                overlap=timedelta(days=cimplekg_overlap_days),
+                full_sync=cimplekg_full_sync,
+                flush=db.storage.flush,
+            ),
+        )
 
-    with TinyDB(climafactskg_db, storage=serialization) as db:
-        db.default_table_name = "arguments"
+    with open_database(climafactskg_db, table="arguments", batch_size=db_batch_size) as db:
+        if new_only:
+            urls = skepticalscience_collectors.load_arguments_urls(urls_file)["added"]
+        else:
+            urls = skepticalscience_collectors.fetch_arguments_urls(ignore_urls=ignore_urls)
 
-        skepticalscience_collectors.process_urls(
+        summary = skepticalscience_collectors.process_urls(
             db=db,
-            urls=skepticalscience_collectors.fetch_arguments_urls(ignore_urls=ignore_urls),
+            urls=urls,
             ignore_urls=ignore_urls,
+            workers=workers,
+            parse_workers=parse_workers,
+            parse_cache=parse_cache,
+            max_per_host=max_per_host,
+            requests_per_second=requests_per_second,
         )
+    print(
+        f"SkepticalScience pages: {summary['new']} new, {summary['changed']} changed, "
+        f"{summary['unchanged']} unchanged ({summary['duplicates']} duplicate URLs skipped)."
+    )
 
 
 @app.command()
@@ -96,6 +173,10 @@ def build(
         help="Path to the output file for the ClimaFactsKG knowledge graph.",
     ),
     output_format: str = typer.Option("ttl", help="Format of the output file."),
+    taxonomy_url: str = typer.Option(
+        "https://skepticalscience.com/argument.php?f=taxonomy",
+        help="URL of the SkepticalScience taxonomy page (empty to leave the taxonomy out of the graph).",
+    ),
 ):
     """Build the ClimaFactsKG knowledge graph."""
     from climafactskg.builders.climafactskg import build_climafactskg
@@ -107,10 +188,79 @@ def build(
         cards_ttl=cards_ttl,
         cimplekg_db=cimplekg_db,
         ignore_urls=ignore_urls,
+        taxonomy_url=taxonomy_url or None,
     )
     g.serialize(destination=output, format=output_format)
 
 
+@app.command()
+def export(
+    climafactskg_db: str = typer.Option(
+        "data/skepticalscience_arguments_db.json",
+        help="Path to the SkepticalScience arguments database.",
+    ),
+    cimplekg_db: str = typer.Option("data/cimplekg_mappings_db.json", help="Path to the CimpleKG claims database."),
+    output_dir: str = typer.Option("data/export", help="Directory of the exported files."),
+    export_format: str = typer.Option(
+        "parquet", "--format", help="Format of the files: 'parquet' or 'arrow' (uncompressed, for memory mapping)."
+    ),
+):
+    """Export the arguments and mappings tables to columnar files (Parquet or Arrow)."""
+    from climafactskg.export import EXPORT_FORMATS, export_table
+
+    for db_path, table_name in ((climafactskg_db, "arguments"), (cimplekg_db, "mappings")):
+        output = os.path.join(output_dir, table_name + EXPORT_FORMATS.get(export_format, ""))
+        try:
+            count = export_table(db_path, table_name, output, export_format=export_format)
+        except (FileNotFoundError, ValueError) as e:
+            print(e)
+            raise typer.Exit(code=1) from e
+        print(f"Exported {count} {table_name} to '{output}'.")
+
+
+@app.command()
+def stats(
+    climafactskg_db: str = typer.Option(
+        "data/skepticalscience_arguments_db.json",
+        help="Path to the SkepticalScience arguments database.",
+    ),
+    cimplekg_db: str = typer.Option("data/cimplekg_mappings_db.json", help="Path to the CimpleKG claims database."),
+    key: Optional[list[str]] = typer.Option(  # noqa: B008
+        None, help="Field whose values are counted (repeatable). Defaults to lang, cards_category, etc."
+    ),
+    crosstab: Optional[list[str]] = typer.Option(  # noqa: B008
+        None, help="Pair of fields to cross-tabulate, as 'first:second' (repeatable). Defaults to lang:cards_category."
+    ),
+    top: Optional[int] = typer.Option(None, help="Only report the most common values of each field."),
+    output: Optional[str] = typer.Option(None, help="Write the statistics to this JSON file instead of stdout."),
+):
+    """Compute statistics on the databases (value counts, cross-tabs, missing fields) as JSON."""
+    import json
+
+    from climafactskg.stats import collect_stats
+
+    crosstabs = None
+    if crosstab:
+        if any(value.count(":") != 1 for value in crosstab):
+            print("Cross-tabs must be given as 'first:second'.")
+            raise typer.Exit(code=1)
+        crosstabs = [tuple(value.split(":")) for value in crosstab]
+
+    try:
+        result = collect_stats(
+            {"arguments": climafactskg_db, "mappings": cimplekg_db}, keys=key or None, crosstabs=crosstabs, top=top
+        )
+    except FileNotFoundError as e:
+        print(e)
+        raise typer.Exit(code=1) from e
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
 @app.command()
 def classify(text: str = typer.Argument(..., help="Text to classify using CARDS.")):
     """Classify text using CARDS."""
@@ -139,5 +289,221 @@ def serve(
     serve_endpoint(app, host=host, port=port)
 
 
+@app.command()
+def benchmark(
+    sources: Optional[list[str]] = typer.Argument(  # noqa: B008
+        None, help="HTML files, directories of HTML files or URLs to parse. Defaults to the benchmark corpus."
+    ),
+    parser: Optional[list[str]] = typer.Option(  # noqa: B008
+        None, help="BeautifulSoup parser backend to benchmark (repeatable). Defaults to 'html.parser' and 'lxml'."
+    ),
+    repeat: int = typer.Option(3, help="Number of runs over all the pages (the fastest run is reported)."),
+    check_golden: bool = typer.Option(
+        False, help="Only check the parser output on the benchmark corpus against the golden output."
+    ),
+    update_golden: bool = typer.Option(False, help="Write the parser output on the corpus as the new golden output."),
+    full_parse: bool = typer.Option(
+        False, help="Build the tree of the whole pages instead of only their content regions."
+    ),
+):
+    """Benchmark the SkepticalScience parsers with each parser backend."""
+    from climafactskg import benchmarks
+
+    if check_golden or update_golden:
+        mismatches = benchmarks.check_golden(
+            parser=parser[0] if parser else None, update=update_golden, scoped=False if full_parse else None
+        )
+        if update_golden:
+            print(f"Updated the golden output in {benchmarks.CORPUS_DIR}.")
+            return
+        for file in mismatches:
+            print(f"  mismatch: {file}")
+        print(f"{len(mismatches)} page(s) differ from the golden output.")
+        raise typer.Exit(code=1 if mismatches else 0)
+
+    for result in benchmarks.run_benchmarks(
+        sources, parsers=parser, repeat=repeat, scoped=False if full_parse else None
+    ):
+        print(
+            f"{result['parser']}: {result['pages_per_second']} pages/s, {result['ms_per_page']} ms/page "
+            f"(x{result['speedup']}), peak {result['mean_peak_kib']} KiB/page (max {result['max_peak_kib']} KiB), "
+            f"retained {result['retained_kib']} KiB in {result['retained_blocks']} blocks, "
+            f"{len(result['mismatches'])} mismatching page(s)"
+        )
+        for allocation in result["top_allocations"]:
+            print(f"  {allocation['line']}: {allocation['kib']} KiB in {allocation['blocks']} blocks")
+        for file in result["mismatches"]:
+            print(f"  mismatch: {file}")
+
+
+cache_app = typer.Typer(help="Manage the page cache used by the collectors.")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("migrate")
+def cache_migrate(
+    cache_dir: str = typer.Option(
+        os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()), help="Path to the cache directory."
+    ),
+    source: str = typer.Option("directory", help="Backend to migrate from ('directory' or 'sqlite')."),
+    target: str = typer.Option("sqlite", help="Backend to migrate to ('directory' or 'sqlite')."),
+    remove: bool = typer.Option(False, help="Remove the migrated entries from the source cache."),
+):
+    """Migrate the page cache from one backend to another (e.g. from one JSON file per URL to SQLite)."""
+    from climafactskg.cache import get_page_cache, migrate_page_cache
+
+    migrated = migrate_page_cache(
+        get_page_cache(cache_dir, backend=source),
+        get_page_cache(cache_dir, backend=target),
+        remove=remove,
+    )
+    print(f"Migrated {migrated} cache entries from '{source}' to '{target}'.")
+
+
+@cache_app.command("stats")
+def cache_stats(
+    cache_dir: str = typer.Option(
+        os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()), help="Path to the cache directory."
+    ),
+    backend: Optional[str] = typer.Option(None, help="Cache backend ('directory' or 'sqlite'). Defaults to the env."),
+):
+    """Show the number of entries and the size of the page cache."""
+    import json
+
+    from climafactskg.cache import get_page_cache
+
+    print(json.dumps(get_page_cache(cache_dir, backend=backend).stats(), indent=2))
+
+
+@cache_app.command("prune")
+def cache_prune(
+    cache_dir: str = typer.Option(
+        os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()), help="Path to the cache directory."
+    ),
+    backend: Optional[str] = typer.Option(None, help="Cache backend ('directory' or 'sqlite'). Defaults to the env."),
+    max_bytes: Optional[int] = typer.Option(
+        None, help="Evict the least recently used entries until the cache fits this size (in bytes)."
+    ),
+    max_age: Optional[int] = typer.Option(None, help="Evict the entries fetched more than this many seconds ago."),
+):
+    """Evict old and least recently used pages, old SPARQL query results and outdated parse results."""
+    from datetime import timedelta
+
+    from climafactskg.cache import get_page_cache, get_parse_store, get_query_cache
+    from climafactskg.parsers.skepticalscience import parser_fingerprint
+
+    evicted = get_page_cache(cache_dir, backend=backend).prune(
+        max_bytes=max_bytes,
+        max_age=timedelta(seconds=max_age) if max_age is not None else None,
+    )
+    print(f"Evicted {evicted} cache entries.")
+
+    if max_age is not None:
+        removed = get_query_cache(cache_dir).prune(timedelta(seconds=max_age))
+        print(f"Removed {removed} cached SPARQL query results.")
+
+    removed = get_parse_store(cache_dir).prune(parser_fingerprint())
+    print(f"Removed {removed} articles extracted by other versions of the parser.")
+
+
+@cache_app.command("warm")
+def cache_warm(
+    url_list: str = typer.Argument(..., help="Path to a file with one URL per line."),
+    cache_dir: str = typer.Option(
+        os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()), help="Path to the cache directory."
+    ),
+    workers: int = typer.Option(4, help="Number of URLs fetched concurrently."),
+    max_per_host: int = typer.Option(4, help="Maximum number of concurrent requests per host."),
+    requests_per_second: Optional[float] = typer.Option(
+        None, help="Maximum number of requests per second per host (unlimited by default)."
+    ),
+):
+    """Fetch a list of URLs into the page cache."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from climafactskg.throttling import HostRateLimiter
+    from climafactskg.utils import fetch_url_content
+
+    with open(url_list, "r", encoding="utf-8") as f:
+        urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    rate_limiter = HostRateLimiter(max_concurrency=max_per_host, requests_per_second=requests_per_second)
+
+    def warm(url: str) -> bool:
+        try:
+            fetch_url_content(url, cache_dir=cache_dir, rate_limiter=rate_limiter)
+            return True
+        except Exception as e:
+            print(f"Failed to fetch '{url}': {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        fetched = sum(executor.map(warm, urls))
+    print(f"Warmed {fetched}/{len(urls)} URLs.")
+
+
+@cache_app.command("verify")
+def cache_verify(
+    cache_dir: str = typer.Option(
+        os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()), help="Path to the cache directory."
+    ),
+    backend: Optional[str] = typer.Option(None, help="Cache backend ('directory' or 'sqlite'). Defaults to the env."),
+    fix: bool = typer.Option(False, help="Remove the corrupted entries."),
+):
+    """Check that every entry of the page cache can be read."""
+    from climafactskg.cache import get_page_cache
+
+    corrupted = get_page_cache(cache_dir, backend=backend).verify(remove=fix)
+    print(f"Found {len(corrupted)} corrupted cache entries{' (removed)' if fix and corrupted else ''}.")
+    if corrupted and not fix:
+        raise typer.Exit(code=1)
+
+
+@cache_app.command("import-warc")
+def cache_import_warc(
+    warc: str = typer.Argument(..., help="Path to the WARC archive."),
+    cache_dir: str = typer.Option(
+        os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()), help="Path to the cache directory."
+    ),
+    backend: Optional[str] = typer.Option(None, help="Cache backend ('directory' or 'sqlite'). Defaults to the env."),
+):
+    """Load the responses of a WARC archive into the page cache."""
+    from datetime import datetime
+
+    from climafactskg.archives import WARCArchive
+    from climafactskg.cache import get_page_cache
+
+    archive = WARCArchive(warc)
+    cache = get_page_cache(cache_dir, backend=backend)
+    for url in archive.urls():
+        cache.set(url, {"content": archive.get(url), "timestamp": datetime.now()})
+    print(f"Imported {len(archive)} responses into the page cache.")
+
+
+db_app = typer.Typer(help="Manage the document databases (TinyDB JSON files, SQLite or JSONL journals).")
+app.add_typer(db_app, name="db")
+
+
+@db_app.command("migrate")
+def db_migrate(
+    source: str = typer.Argument(..., help="Path to the database to convert (e.g. a TinyDB JSON file)."),
+    target: str = typer.Argument(
+        ...,
+        help="Path to the new database. Files ending with .sqlite, .sqlite3 or .db are stored in SQLite, files ending"
+        " with .jsonl in an append-only journal.",
+    ),
+    overwrite: bool = typer.Option(False, help="Replace the content of the target database if it is not empty."),
+):
+    """Convert a database to another storage (e.g. from a TinyDB JSON file to SQLite or a JSONL journal)."""
+    from climafactskg.storage import migrate_database
+
+    try:
+        count = migrate_database(source, target, overwrite=overwrite)
+    except (FileNotFoundError, FileExistsError) as e:
+        print(e)
+        raise typer.Exit(code=1) from e
+    print(f"Migrated {count} documents from '{source}' to '{target}'.")
+
+
 if __name__ == "__main__":
     app()
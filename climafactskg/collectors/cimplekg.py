@@ -1,4 +1,8 @@
+import json
 import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 import pandas as pd
 from langdetect import detect
@@ -12,6 +16,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+CIMPLEKG_ENDPOINT = os.getenv("CLIMAFACTSKG_CIMPLEKG_ENDPOINT", "https://data.cimple.eu/sparql")
+
+# Claims are paginated with a keyset on (?date_published, ?rev), compared as strings so that the query behaves the
+# same on any endpoint whatever the datatype of the dates. A review with several claim texts may be split across two
+# pages; only its first text is stored by `process_claims` anyway. `%(order)s` is "ASC" (oldest first) or "DESC"
+# (newest first).
 CIMPLEKG_QUERY = """
 PREFIX schema: <http://schema.org/>
 PREFIX cimple: <http://data.cimple.eu/ontology#>
@@ -23,30 +33,184 @@ WHERE {
         schema:datePublished ?date_published ;
         schema:itemReviewed ?cl .
     ?cl schema:text ?text .
+    %(filter)s
 }
-ORDER BY DESC(?date_published)
-LIMIT 100
+ORDER BY %(order)s(STR(?date_published)) %(order)s(STR(?rev))
+LIMIT %(limit)d
 """
 
 
-def fetch_claims() -> pd.DataFrame:
-    """Fetch claims from the CimpleKG SPARQL endpoint and return as a DataFrame."""
-    results = query_sparqlendpoint("https://data.cimple.eu/sparql", CIMPLEKG_QUERY)  # TODO Cache query results.
+def _sparql_string(value: str) -> str:
+    """Returns a value as a SPARQL string literal."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    return f'"{escaped}"'
+
+
+def _load_state(state_file: Optional[str]) -> Optional[dict]:
+    if state_file and os.path.exists(state_file):
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def _save_state(state_file: str, state: Optional[dict]) -> None:
+    if state is None:
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+
+def _watermark_start(watermark: str, overlap: timedelta) -> str:
+    """Returns the date from which an incremental sync starts: the watermark minus the overlap window."""
+    try:
+        return (date.fromisoformat(watermark[:10]) - overlap).isoformat()
+    except ValueError:
+        logger.warning(f"Cannot apply the overlap window to the CimpleKG watermark: {watermark}")
+        return watermark
+
+
+def iter_claims(
+    endpoint_url: str = CIMPLEKG_ENDPOINT,
+    page_size: int = 1000,
+    checkpoint_file: Optional[str] = None,
+    max_pages: Optional[int] = None,
+    watermark_file: Optional[str] = None,
+    overlap: timedelta = timedelta(days=int(os.getenv("CLIMAFACTSKG_CIMPLEKG_SYNC_OVERLAP_DAYS", 7))),  # noqa: B008
+    full_sync: bool = False,
+    flush: Optional[Callable[[], None]] = None,
+    newest_first: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """Harvest the English claims of CimpleKG page by page, from the oldest to the newest review (or the reverse).
+
+    Pages are requested with a keyset on `(date_published, rev)`, so each query only scans the claims after the
+    previous page. When a checkpoint file is provided, the position of the harvest is saved after each page has been
+    consumed, and an interrupted harvest resumes from there. The checkpoint is removed once the harvest completes.
+    When the claims are stored in a database with batched writes, `flush` must write them to disk, so that the
+    checkpoint and the watermark never get ahead of the stored claims.
+
+    When a watermark file is provided, the newest `date_published` seen is saved once the harvest completes, and the
+    next harvest only requests the reviews published after the watermark minus the overlap window (to catch reviews
+    published late in CimpleKG). Claims already stored are skipped by `process_claims`, so the overlap is safe. A
+    full sync ignores the watermark, but still saves it once the harvest completes.
+
+    Args:
+        endpoint_url (str, optional): The SPARQL endpoint. Defaults to the `CLIMAFACTSKG_CIMPLEKG_ENDPOINT`
+            environment variable or https://data.cimple.eu/sparql.
+        page_size (int, optional): The number of claims requested per query. Defaults to 1000.
+        checkpoint_file (str, optional): The path to the checkpoint file. Defaults to None (no checkpoint).
+        max_pages (int, optional): Stop after this number of pages (the checkpoint is kept). Defaults to None.
+        watermark_file (str, optional): The path to the watermark file. Defaults to None (full harvest).
+        overlap (timedelta, optional): The overlap window of incremental harvests. Defaults to the
+            `CLIMAFACTSKG_CIMPLEKG_SYNC_OVERLAP_DAYS` environment variable or 7 days.
+        full_sync (bool, optional): Harvest all the claims, whatever the watermark. Defaults to False.
+        flush (Callable[[], None], optional): Called before the checkpoint or the watermark is saved, to write the
+            claims consumed so far (e.g. `db.storage.flush` for a database opened with `open_database`). Defaults to
+            None.
+        newest_first (bool, optional): Harvest from the newest to the oldest review, e.g. to get the latest claims
+            with `max_pages`. Incompatible with a watermark file. Defaults to False.
+
+    Yields:
+        pd.DataFrame: A page of claims with the columns `rev`, `date_published` and `text`.
+
+    Raises:
+        ValueError: If both a watermark file and `newest_first` are given.
+    """
+    if newest_first and watermark_file:
+        raise ValueError("The CimpleKG watermark requires harvesting from the oldest to the newest review.")
+    order, after = ("DESC", "<") if newest_first else ("ASC", ">")
+
+    watermark = None if full_sync else (_load_state(watermark_file) or {}).get("watermark")
+    position = _load_state(checkpoint_file)
+    if position is not None:
+        logger.info(f"Resuming CimpleKG harvest after {position['date_published']} ({position['rev']}).")
+    elif watermark is not None:
+        # An empty rev sorts before any other, so the reviews published on the start date are included:
+        position = {"date_published": _watermark_start(watermark, overlap), "rev": ""}
+        logger.info(f"Syncing CimpleKG claims published since {position['date_published']} (watermark {watermark}).")
+
+    pages = 0
+    complete = False
+    while max_pages is None or pages < max_pages:
+        if position is None:
+            keyset_filter = ""
+        else:
+            date_published = _sparql_string(position["date_published"])
+            rev = _sparql_string(position["rev"])
+            keyset_filter = (
+                f"FILTER (STR(?date_published) {after} {date_published} || "
+                f"(STR(?date_published) = {date_published} && STR(?rev) {after} {rev}))"
+            )
+
+        page = query_sparqlendpoint(
+            endpoint_url,
+            CIMPLEKG_QUERY % {"filter": keyset_filter, "order": order, "limit": page_size},
+            streaming=True,
+        )
+        pages += 1
+        logger.info(f"Fetched CimpleKG page {pages} ({len(page)} claims).")
+
+        if page.empty:
+            complete = True
+            break
+
+        yield page
+
+        last = page.iloc[-1]
+        position = {"date_published": str(last["date_published"]), "rev": str(last["rev"])}
+        if checkpoint_file:
+            if flush is not None:
+                flush()
+            _save_state(checkpoint_file, position)
 
-    # Ensure results is a DataFrame
-    if not isinstance(results, pd.DataFrame):
-        results = pd.DataFrame(results)
+        if len(page) < page_size:
+            complete = True
+            break
+
+    if complete:
+        if flush is not None and (checkpoint_file or watermark_file):
+            flush()
+        if checkpoint_file:
+            _save_state(checkpoint_file, None)
+        # Pages are sorted by date, so the last position holds the newest date seen:
+        if watermark_file and position is not None and position["rev"]:
+            newest = max(watermark or "", position["date_published"])
+            _save_state(watermark_file, {"watermark": newest, "updated": datetime.now().isoformat()})
+            logger.info(f"CimpleKG watermark set to {newest}.")
+
+
+def fetch_claims(
+    endpoint_url: str = CIMPLEKG_ENDPOINT,
+    page_size: int = 1000,
+    max_pages: Optional[int] = 1,
+) -> pd.DataFrame:
+    """Fetch claims from the CimpleKG SPARQL endpoint and return as a DataFrame, from the newest to the oldest.
+
+    Only the first `max_pages` pages are fetched (by default the `page_size` newest claims), as all the pages are kept
+    in memory. See `iter_claims` for harvesting all the claims page by page.
+    """
+    pages = list(iter_claims(endpoint_url, page_size=page_size, max_pages=max_pages, newest_first=True))
+    results = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
 
     logger.info(f"Number of results: {len(results)}")
     return results
 
 
 def process_claims(db: TinyDB, claims_df: pd.DataFrame) -> None:
+    # Claims to insert, and their URLs (a page may list the same claim several times):
+    mappings = []
+    pending_urls = set()
+
     for _, row in track(claims_df.iterrows(), total=claims_df.shape[0], description="Processing claims"):
         text = row.get("text")
 
-        # Check if URL not already in database
-        if not db.contains(where("url") == row.get("rev")):
+        # Check if URL not already in database (databases opened with `open_database` answer this from an index)
+        if row.get("rev") not in pending_urls and not db.contains(where("url") == row.get("rev")):
             print(f"Processing claim with URL: {row.get('rev')}")
             if isinstance(text, str) and text.strip():
                 lang = None
@@ -60,10 +224,15 @@ def process_claims(db: TinyDB, claims_df: pd.DataFrame) -> None:
                     "claim": text,
                     "lang": lang,
                 }
-                db.insert(mapping)
+                mappings.append(mapping)
+                pending_urls.add(row.get("rev"))
         else:
             logger.info(f"Skipping already processed claim with URL: {row.get('rev')}")
 
+    # Every TinyDB write goes through the whole table, so the new claims are inserted at once:
+    if mappings:
+        db.insert_multiple(mappings)
+
 
 def classify_claims(db: TinyDB, filter_lang: str = "en") -> None:
     """Classifies claims in the TinyDB database using the CARDSClassifier.
@@ -95,33 +264,42 @@ def classify_claims(db: TinyDB, filter_lang: str = "en") -> None:
             db.update({"cards_category": prediction}, doc_ids=[claim.doc_id])
 
 
-def process_all(db: TinyDB, claims_df: pd.DataFrame, filter_lang: str = "en") -> None:
+def process_all(
+    db: TinyDB,
+    claims_df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    filter_lang: str = "en",
+) -> None:
     """Fetches claims from CimpleKG, processes them, and stores them in the TinyDB database.
 
     Args:
         db (TinyDB): The TinyDB database instance where claims will be stored.
-        claims_df (pd.DataFrame): DataFrame containing claims to be processed.
+        claims_df (pd.DataFrame or Iterable[pd.DataFrame]): DataFrame containing claims to be processed, or an
+            iterable of DataFrames (e.g. the pages returned by `iter_claims`).
         filter_lang (str): Language code to filter claims for classification (default is "en").
 
     Returns:
         None
     """
     logger.info("Processing claims...")
-    process_claims(db, claims_df)
+    for chunk in [claims_df] if isinstance(claims_df, pd.DataFrame) else claims_df:
+        process_claims(db, chunk)
     logger.info("Classifying claims...")
     classify_claims(db, filter_lang=filter_lang)
 
 
 if __name__ == "__main__":
     from dotenv import load_dotenv
-    from tinydb import JSONStorage
-    from tinydb_serialization import SerializationMiddleware
-    from tinydb_serialization.serializers import DateTimeSerializer
+
+    from climafactskg.storage import open_database
 
     load_dotenv()
-    serialization = SerializationMiddleware(JSONStorage)
-    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
 
-    with TinyDB("data/cimplekg_claims_db.json", storage=serialization) as db:
-        db.default_table_name = "mappings"
-        process_all(db, fetch_claims())
+    with open_database("data/cimplekg_claims_db.json", table="mappings") as db:
+        process_all(
+            db,
+            iter_claims(
+                checkpoint_file="data/cimplekg_checkpoint.json",
+                watermark_file="data/cimplekg_watermark.json",
+                flush=db.storage.flush,
+            ),
+        )
@@ -1,25 +1,94 @@
+import json
 import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
 from typing import Optional
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from rich.progress import track
 from tinydb import Query, TinyDB
 
+from climafactskg.cache import ParseResultStore, get_parse_store
 from climafactskg.classifiers.cards import CARDSClassifier
 from climafactskg.parsers.skepticalscience import (
+    PARSER_VERSION,
     parse_main_article,
     parse_translated_article,
+    parser_fingerprint,
 )
-from climafactskg.utils import fetch_url_content
+from climafactskg.throttling import HostRateLimiter, get_adaptive_controller
+from climafactskg.utils import fetch_url_content, hash_string, normalize_url
 
 logging.basicConfig(level=logging.INFO)
 
+# Minimum number of seconds between two logs of the HTTP metrics during a crawl:
+METRICS_LOG_SECONDS = float(os.getenv("CLIMAFACTSKG_METRICS_LOG_SECONDS", 30))
 
-def fetch_arguments_urls(ignore_urls: Optional[list] = None) -> list:
+
+class CrawlFrontier:
+    """Keeps track of the pages already handled during a crawl, so each page is processed at most once per run.
+
+    URLs are compared in their normalized form (see `normalize_url`). The frontier is thread-safe and is shared by
+    all the workers of a crawl.
+    """
+
+    def __init__(self):
+        self.visited: set[str] = set()
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+    def claim(self, url: str) -> bool:
+        """Mark a URL as visited.
+
+        Args:
+            url (str): The URL about to be processed.
+
+        Returns:
+            bool: True if the URL was not visited yet (the caller should process it), False if it is a duplicate.
+        """
+        key = normalize_url(url)
+        with self._lock:
+            if key in self.visited:
+                self.duplicates += 1
+                return False
+            self.visited.add(key)
+            return True
+
+    def __len__(self) -> int:
+        return len(self.visited)
+
+
+# Index pages listing the arguments, with the id of the page region containing the links and the links selector:
+ARGUMENTS_INDEX_PAGES = [
+    ("https://skepticalscience.com/argument.php", "mainbody", "#mainbody table a"),
+    ("https://skepticalscience.com/shorturls.php", "centerColumn", "#centerColumn table a"),
+    ("https://skepticalscience.com/fixednum.php", "centerColumn", "#centerColumn table a"),
+    ("https://skepticalscience.com/argument.php?f=taxonomy", "mainbody", "#mainbody ul a"),
+]
+
+
+def _extract_index_urls(url: str, region_id: str, selector: str) -> list[str]:
+    """Extracts the argument URLs of an index page, only building the tree of the region containing the links."""
+    content = fetch_url_content(url)
+    soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer(id=region_id))
+    links = soup.select(selector)
+    if not links:
+        # Fall back to a full parse if the page layout changed:
+        links = BeautifulSoup(content, "html.parser").select(selector)
+    return [urljoin(url, str(a["href"])) for a in links]
+
+
+def fetch_arguments_urls(ignore_urls: Optional[list] = None, urls_file: Optional[str] = None) -> list:
     """Fetch a list of argument URLs from various pages on the Skeptical Science website.
 
-    This function extracts URLs from the following pages:
+    This function extracts URLs from the following pages (fetched concurrently):
     1. The main list of arguments (https://skepticalscience.com/argument.php).
     2. The short URLs list (https://skepticalscience.com/shorturls.php).
     3. The fixed number list (https://skepticalscience.com/fixednum.php).
@@ -27,115 +96,318 @@ def fetch_arguments_urls(ignore_urls: Optional[list] = None) -> list:
 
     Args:
         ignore_urls (list, optional): A list of URLs to exclude from the results. Defaults to None.
+        urls_file (str, optional): If provided, the URLs are saved to this file together with the URLs added and
+            removed since the previous run (see `save_arguments_urls`). Defaults to None.
 
     Returns:
         list: A sorted list of unique argument URLs, excluding any ignored URLs if provided.
     """
-    arguments_urls = []
+    with ThreadPoolExecutor(max_workers=len(ARGUMENTS_INDEX_PAGES)) as executor:
+        results = executor.map(lambda page: _extract_index_urls(*page), ARGUMENTS_INDEX_PAGES)
+        arguments_urls = {url for urls in results for url in urls}  # Remove duplicates
 
-    # 1) Extract from the main list:
-    url = "https://skepticalscience.com/argument.php"
-    content = fetch_url_content(url)
-    soup = BeautifulSoup(content, "html.parser")
-    arguments_urls = [urljoin(url, str(a["href"])) for a in soup.select("#mainbody table a")]
+    # Remove ignored URLs if provided:
+    if ignore_urls:
+        arguments_urls = {url for url in arguments_urls if url not in ignore_urls}
 
-    # 2) Extract from the shorturls list:
-    url = "https://skepticalscience.com/shorturls.php"
-    content = fetch_url_content(url)
-    soup = BeautifulSoup(content, "html.parser")
-    arguments_urls += [urljoin(url, str(a["href"])) for a in soup.select("#centerColumn table a")]
+    # Sort the URLs:
+    sorted_urls = sorted(arguments_urls)
 
-    # 3) Extract from the fixednum list:
-    url = "https://skepticalscience.com/fixednum.php"
-    content = fetch_url_content(url)
-    soup = BeautifulSoup(content, "html.parser")
-    arguments_urls += [urljoin(url, str(a["href"])) for a in soup.select("#centerColumn table a")]
+    if urls_file:
+        save_arguments_urls(sorted_urls, urls_file)
 
-    # 4) Extract from the taxonomy list:
-    url = "https://skepticalscience.com/argument.php?f=taxonomy"
-    content = fetch_url_content(url)
-    soup = BeautifulSoup(content, "html.parser")
-    arguments_urls += [urljoin(url, str(a["href"])) for a in soup.select("#mainbody ul a")]
+    return sorted_urls
 
-    arguments_urls = list(set(arguments_urls))  # Remove duplicates
 
-    # Remove ignored URLs if provided:
-    if ignore_urls:
-        arguments_urls = [url for url in arguments_urls if url not in ignore_urls]
+def load_arguments_urls(urls_file: str) -> dict:
+    """Load the argument URLs saved by `save_arguments_urls`.
 
-    # Sort the URLs:
-    arguments_urls.sort()
+    Args:
+        urls_file (str): The path to the URLs file.
+
+    Returns:
+        dict: A dictionary with the keys "updated" (ISO date of the last save), "urls" (all the URLs), "added" and
+            "removed" (the URLs added and removed by the last save). All the lists are empty if the file does not
+            exist.
+    """
+    if not os.path.exists(urls_file):
+        return {"updated": None, "urls": [], "added": [], "removed": []}
 
-    return arguments_urls
+    with open(urls_file, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
-def process_urls(db: TinyDB, urls: list[str], ignore_urls: Optional[list] = None) -> None:
+def save_arguments_urls(urls: list[str], urls_file: str) -> dict:
+    """Save a list of argument URLs with the difference from the previously saved list.
+
+    Args:
+        urls (list[str]): The argument URLs.
+        urls_file (str): The path to the URLs file.
+
+    Returns:
+        dict: The saved data (see `load_arguments_urls`).
+    """
+    previous = set(load_arguments_urls(urls_file)["urls"])
+    current = set(urls)
+
+    data = {
+        "updated": datetime.now().isoformat(),
+        "urls": sorted(current),
+        "added": sorted(current - previous),
+        "removed": sorted(previous - current),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(urls_file)), exist_ok=True)
+    with open(urls_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+    logging.info(
+        f"Saved {len(data['urls'])} argument URLs ({len(data['added'])} added, {len(data['removed'])} removed)."
+    )
+    return data
+
+
+def _log_http_metrics() -> None:
+    for host, metrics in get_adaptive_controller().metrics().items():
+        logging.info(f"HTTP metrics for {host}: {metrics}")
+
+
+def _parse_page(
+    url: str,
+    content: str,
+    known_articles: dict,
+    language_code: Optional[str] = None,
+    parse_pool: Optional[Executor] = None,
+    parse_store: Optional[ParseResultStore] = None,
+) -> tuple[str, dict]:
+    """Parses a page unless the stored article was extracted from the same HTML by the same parser code.
+
+    When a parse pool is given, the page is parsed by one of its workers and the calling thread waits for the result.
+    When a parse store is given, the article is taken from the store if this version of the parser already parsed
+    the same HTML, and stored otherwise. Parsers are compared by their fingerprint (see `parser_fingerprint`), so
+    a change to the parser code or mode re-parses the page even if `PARSER_VERSION` was not increased.
+
+    Returns:
+        tuple[str, dict]: The status of the page ("new", "changed" or "unchanged") and the article. For unchanged
+            pages, the stored article is returned.
+    """
+    source_hash = hash_string(content)
+    fingerprint = parser_fingerprint()
+    known = known_articles.get(url)
+    if known is not None and known.get("source_hash") == source_hash and known.get("parser_fingerprint") == fingerprint:
+        return "unchanged", known
+
+    article = parse_store.get(url, source_hash, fingerprint, language_code) if parse_store is not None else None
+    if article is None:
+        if parse_pool is not None:
+            if language_code is None:
+                article = parse_pool.submit(parse_main_article, url, content).result()
+            else:
+                article = parse_pool.submit(
+                    parse_translated_article, url, content, language_code=language_code
+                ).result()
+        elif language_code is None:
+            article = parse_main_article(url, content)
+        else:
+            article = parse_translated_article(url, content, language_code=language_code)
+
+        if parse_store is not None:
+            parse_store.set(url, source_hash, fingerprint, article, language_code)
+
+    article["source_hash"] = source_hash
+    article["parser_version"] = PARSER_VERSION
+    article["parser_fingerprint"] = fingerprint
+    return ("new" if known is None else "changed"), article
+
+
+def collect_argument(
+    main_url: str,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    frontier: Optional[CrawlFrontier] = None,
+    known_articles: Optional[dict] = None,
+    parse_pool: Optional[Executor] = None,
+    parse_store: Optional[ParseResultStore] = None,
+) -> list[tuple[str, dict]]:
+    """Fetches and parses an argument together with its level and translated versions.
+
+    This function does not touch the database, so it can safely run in a worker thread.
+
+    Args:
+        main_url (str): The URL of the main argument page.
+        rate_limiter (HostRateLimiter, optional): A limiter shared by all the workers of the crawl. Defaults to None.
+        frontier (CrawlFrontier, optional): The pages already handled during the crawl. Level and translated pages
+            already in the frontier are skipped. The main URL is expected to be claimed by the caller.
+            Defaults to None (no deduplication).
+        known_articles (dict, optional): The articles already stored, indexed by URL. Pages whose HTML hash and parser
+            fingerprint match the stored article are not parsed again. Defaults to None.
+        parse_pool (Executor, optional): A pool of processes parsing the pages. Defaults to None (pages are parsed
+            by the calling thread).
+        parse_store (ParseResultStore, optional): The articles already extracted from identical pages. Defaults to
+            None.
+
+    Returns:
+        list[tuple[str, dict]]: The status ("new", "changed" or "unchanged") and the article of each page, starting
+            with the main article, followed by the level articles and the translated articles in page order.
+    """
+    if frontier is None:
+        frontier = CrawlFrontier()
+        frontier.claim(main_url)
+    if known_articles is None:
+        known_articles = {}
+
+    content = fetch_url_content(main_url, rate_limiter=rate_limiter)
+    status, article = _parse_page(main_url, content, known_articles, parse_pool=parse_pool, parse_store=parse_store)
+    articles = [(status, article)]
+
+    # Process the article levels:
+    if article.get("levels"):
+        for level in article["levels"]:
+            logging.info(f"Processing level: {level['level']}")
+
+            for level_url in level["urls"]:
+                if not frontier.claim(level_url):
+                    logging.info(f"Skipping already processed level URL: {level_url}")
+                    continue
+
+                logging.info(f"Processing level URL: {level_url}")
+                # Parse the main article for each level URL
+                level_content = fetch_url_content(level_url, rate_limiter=rate_limiter)
+                articles.append(
+                    _parse_page(
+                        level_url, level_content, known_articles, parse_pool=parse_pool, parse_store=parse_store
+                    )
+                )
+
+    if article.get("languages"):
+        for lang in article["languages"]:
+            if not frontier.claim(lang["url"]):
+                logging.info(f"Skipping already processed language URL: {lang['url']}")
+                continue
+
+            logging.info(f"Processing language URL: {lang['url']}")
+            lang_content = fetch_url_content(lang["url"], rate_limiter=rate_limiter)
+            articles.append(
+                _parse_page(
+                    lang["url"],
+                    lang_content,
+                    known_articles,
+                    language_code=lang["code"],
+                    parse_pool=parse_pool,
+                    parse_store=parse_store,
+                )
+            )
+
+    return articles
+
+
+def process_urls(
+    db: TinyDB,
+    urls: list[str],
+    ignore_urls: Optional[list] = None,
+    workers: int = 1,
+    max_per_host: int = 4,
+    requests_per_second: Optional[float] = None,
+    parse_workers: int = 0,
+    parse_cache: bool = True,
+) -> dict:
     """Processes a list of URLs by parsing articles, and storing the results in a TinyDB database.
     Also processes nested article levels and translated language versions if available.
 
         db (TinyDB): The TinyDB database instance where articles and related data will be stored.
         urls (list[str]): List of URLs to process.
         ignore_urls (Optional[list], optional): List of URLs to ignore during processing. Defaults to None.
+        workers (int, optional): Number of arguments crawled concurrently. Defaults to 1 (sequential crawl).
+        max_per_host (int, optional): Maximum number of concurrent requests per host. Defaults to 4.
+        requests_per_second (float, optional): Maximum number of requests per second per host. Defaults to None
+            (unlimited).
+        parse_workers (int, optional): Number of processes parsing the pages. Parsing is CPU-bound, so this is what
+            uses several cores when the page cache is warm. Defaults to 0 (pages are parsed by the crawl threads).
+        parse_cache (bool, optional): Reuse the articles extracted from identical pages by the same parser code in
+            previous runs (see `ParseResultStore`), even when they are not in the database. Defaults to True.
+
+        dict: A summary of the crawl with the number of "new", "changed" and "unchanged" pages, and the number of
+            duplicate URLs that were skipped ("duplicates").
 
         1. Filters out URLs present in `ignore_urls`.
-            - Fetches the content.
+            - Skips URLs already handled during the run (main, level and translation URLs are deduplicated together).
+            - Fetches the content (in worker threads when `workers` > 1).
+            - Skips parsing and storing pages whose HTML hash and parser fingerprint match the stored article.
             - Processes and stores articles for each nested level URL, if present.
             - Processes and stores articles for each translated language version, if present.
+            - Logs the HTTP metrics of each host (see `AdaptiveController.metrics`) every `METRICS_LOG_SECONDS`.
 
         - Assumes the existence of helper functions: `fetch_url_content`, `parse_main_article`,
             and `parse_translated_article`.
-        - Uses TinyDB's `upsert` to update or insert articles based on their URL.
+        - Uses TinyDB's `upsert` to update or insert articles based on their URL. Database writes are always
+            performed by the calling thread, in the order of `urls`.
 
         Any exceptions raised by helper functions or database operations will propagate to the caller.
     """  # noqa: D205
     if ignore_urls is None:
         ignore_urls = []
 
-    urls = [url for url in urls if url not in ignore_urls]
-
-    logging.info(f"Processing {len(urls)} URLs.")
-
-    for i, main_url in enumerate(urls, start=1):
-        logging.info(f"Processing URL {i}/{len(urls)}: {main_url}")
-        content = fetch_url_content(main_url)
-
-        article = parse_main_article(main_url, content)
-
-        # Store the article in TinyDB
-        db.upsert(article, Query().url == main_url)
-        logging.info(f"Stored article for URL: {main_url}")
-
-        # Process the article levels:
-        logging.info(f"Processing levels for URL {i}/{len(urls)}: {main_url}")
-        if "levels" in article:
-            for level in article["levels"]:
-                logging.info(f"Processing level: {level['level']}")
-
-                for level_url in level["urls"]:
-                    logging.info(f"Processing level URL: {level_url}")
-                    # Parse the main article for each level URL
-                    level_article = parse_main_article(level_url)
-
-                    # Store the article in TinyDB
-                    db.upsert(level_article, Query().url == level_url)
-                    logging.info(f"Stored level article for URL: {level_url}")
-
-                logging.info(f"Finished level: {level['level']}")
-
-        if "languages" in article:
-            for lang in article["languages"]:
-                logging.info(f"Processing language : {lang['lang']}")
-
-                logging.info(f"Processing language URL: {lang['url']}")
-                lang_article = parse_translated_article(lang["url"], language_code=lang["code"])
-
-                # Store the  article in TinyDB
-                db.upsert(lang_article, Query().url == lang["url"])
-                logging.info(f"Stored translated article for language URL: {lang['url']}")
-
-                logging.info(f"Finished language: {lang['lang']}")
-
-        logging.info(f"Finished processing URL {i}/{len(urls)}: {main_url}")
+    # Claim the main URLs up front, so that an argument listed as another argument's level is still processed as a
+    # main argument (with its own levels and translations):
+    frontier = CrawlFrontier()
+    urls = [url for url in urls if url not in ignore_urls and frontier.claim(url)]
+
+    logging.info(f"Processing {len(urls)} URLs with {workers} worker(s).")
+
+    # Snapshot of the stored articles, read by the workers to detect unchanged pages. Articles stored without a source
+    # hash (by older versions) are known, so their pages are reported as changed rather than new:
+    known_articles = {doc["url"]: doc for doc in db.all() if "url" in doc}
+
+    rate_limiter = HostRateLimiter(max_concurrency=max_per_host, requests_per_second=requests_per_second)
+    summary = {"new": 0, "changed": 0, "unchanged": 0}
+
+    parse_store = get_parse_store(os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir())) if parse_cache else None
+
+    # Worker processes are spawned rather than forked, as forking a process running threads is not safe:
+    parse_pool = (
+        ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        if parse_workers > 0
+        else None
+    )
+
+    # Each crawl thread waits for its own parses, so there must be at least one thread per parse process:
+    with parse_pool or nullcontext(), ThreadPoolExecutor(max_workers=max(1, workers, parse_workers)) as executor:
+        # `map` yields results in submission order, which keeps the stored documents deterministic:
+        results = executor.map(
+            lambda url: collect_argument(
+                url,
+                rate_limiter=rate_limiter,
+                frontier=frontier,
+                known_articles=known_articles,
+                parse_pool=parse_pool,
+                parse_store=parse_store,
+            ),
+            urls,
+        )
+
+        last_metrics_log = time.monotonic()
+        for i, (main_url, articles) in enumerate(zip(urls, results, strict=True), start=1):
+            for status, article in articles:
+                summary[status] += 1
+                if status == "unchanged":
+                    logging.info(f"Skipping unchanged article for URL: {article['url']}")
+                    continue
+
+                # Store the article in TinyDB
+                db.upsert(article, Query().url == article["url"])
+                logging.info(f"Stored {status} article for URL: {article['url']}")
+
+            logging.info(f"Finished processing URL {i}/{len(urls)}: {main_url}")
+            if time.monotonic() - last_metrics_log >= METRICS_LOG_SECONDS:
+                _log_http_metrics()
+                last_metrics_log = time.monotonic()
+
+    summary["duplicates"] = frontier.duplicates
+    _log_http_metrics()
+    logging.info(
+        f"Pages: {summary['new']} new, {summary['changed']} changed, {summary['unchanged']} unchanged "
+        f"({summary['duplicates']} duplicate URLs skipped)."
+    )
+    return summary
 
 
 def classify_urls(db: TinyDB) -> None:
@@ -170,7 +442,12 @@ def process_all(
     db: TinyDB,
     urls: Optional[list[str]] = None,
     ignore_urls: Optional[list] = None,
-) -> None:
+    workers: int = 1,
+    max_per_host: int = 4,
+    requests_per_second: Optional[float] = None,
+    parse_workers: int = 0,
+    parse_cache: bool = True,
+) -> dict:
     """Fetches, processes, and classifies arguments from Skeptical Science.
 
     This function fetches argument URLs, processes them to extract articles and their levels,
@@ -180,11 +457,26 @@ def process_all(
         db (TinyDB): The TinyDB database instance where articles and classifications will be stored.
         urls (list[str]): List of URLs to process and classify.
         ignore_urls (Optional[list], optional): List of URLs to ignore during processing. Defaults to None.
+        workers (int, optional): Number of arguments crawled concurrently. Defaults to 1.
+        max_per_host (int, optional): Maximum number of concurrent requests per host. Defaults to 4.
+        requests_per_second (float, optional): Maximum number of requests per second per host. Defaults to None.
+        parse_workers (int, optional): Number of processes parsing the pages. Defaults to 0 (no process pool).
+        parse_cache (bool, optional): Reuse the articles extracted from identical pages. Defaults to True.
 
     Returns:
-        None
+        dict: The summary of the crawl returned by `process_urls`.
     """
     if urls is None:
         urls = []
-    process_urls(db, urls, ignore_urls=ignore_urls)
+    summary = process_urls(
+        db,
+        urls,
+        ignore_urls=ignore_urls,
+        workers=workers,
+        max_per_host=max_per_host,
+        requests_per_second=requests_per_second,
+        parse_workers=parse_workers,
+        parse_cache=parse_cache,
+    )
     classify_urls(db)
+    return summary
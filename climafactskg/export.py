@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.feather
+import pyarrow.parquet
+
+from climafactskg.storage import open_database
+
+logging.basicConfig(level=logging.INFO)
+
+# Export formats and the extension of their files. "arrow" files are uncompressed Arrow IPC (Feather v2) files, which
+# can be memory-mapped; "parquet" files are smaller and compressed with zstd.
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def table_schema(table_name: str) -> dict[str, Any]:
+    """Return the types of the known columns of a table ("arguments" or "mappings").
+
+    Categorical fields (`lang`, `level`, `cards_category`) are dictionary-encoded and the nested fields of the
+    arguments are list (and list of struct) columns.
+
+    Args:
+        table_name (str): The name of the table.
+
+    Returns:
+        dict[str, pyarrow.DataType]: The type of each known column, in column order. Unknown tables only have a
+            `url` column.
+    """
+    category = pa.dictionary(pa.int32(), pa.string())
+
+    if table_name == "arguments":
+        return {
+            "url": pa.string(),
+            "main_url": pa.string(),
+            "lang": category,
+            "level": category,
+            "title": pa.string(),
+            "description": pa.string(),
+            "author": pa.string(),
+            "last_update": pa.timestamp("us"),
+            "keywords": pa.list_(pa.string()),
+            "climate_myth": pa.string(),
+            "climate_myth_source": pa.struct([("name", pa.string()), ("url", pa.string())]),
+            "what_the_science_says": pa.string(),
+            "at_glance": pa.string(),
+            "content": pa.string(),
+            "figures": pa.list_(pa.struct([("src", pa.string()), ("alt", pa.string()), ("caption", pa.string())])),
+            "languages": pa.list_(pa.struct([("code", category), ("lang", pa.string()), ("url", pa.string())])),
+            "levels": pa.list_(pa.struct([("level", category), ("urls", pa.list_(pa.string()))])),
+            "related_arguments": pa.list_(pa.struct([("title", pa.string()), ("url", pa.string())])),
+            "cards_category": category,
+            "source_hash": pa.string(),
+            "parser_version": category,
+            "parser_fingerprint": category,
+        }
+    elif table_name == "mappings":
+        return {
+            "url": pa.string(),
+            # Kept as returned by the CimpleKG endpoint, as the dates do not all have the same precision:
+            "date_published": pa.string(),
+            "claim": pa.string(),
+            "lang": category,
+            "cards_category": category,
+        }
+    return {"url": pa.string()}
+
+
+def documents_to_arrow(documents: list[dict], table_name: str):
+    """Convert the documents of a table to an Arrow table, sorted by URL.
+
+    The known columns of the table (see `table_schema`) come first, followed by the other fields of the documents
+    in alphabetical order, whose type is inferred. A column whose values cannot be converted to its type (e.g. a
+    field with values of different types) is stored as JSON text.
+
+    Args:
+        documents (list[dict]): The documents of the table.
+        table_name (str): The name of the table.
+
+    Returns:
+        pyarrow.Table: The table.
+    """
+    # Sort by URL (then by document ID), so that the row order does not depend on the order of the crawl:
+    documents = sorted(documents, key=lambda doc: (str(doc.get("url") or ""), getattr(doc, "doc_id", 0)))
+
+    schema = table_schema(table_name)
+    extra_fields = sorted({key for doc in documents for key in doc} - set(schema))
+    columns = {**schema, **dict.fromkeys(extra_fields)}
+
+    arrays = {}
+    for name, column_type in columns.items():
+        values = [doc.get(name) for doc in documents]
+        try:
+            arrays[name] = pa.array(values, type=column_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+            logging.warning(f"Storing column '{name}' of table '{table_name}' as JSON text: {e}")
+            arrays[name] = pa.array(
+                [json.dumps(value, default=str, ensure_ascii=False) if value is not None else None for value in values],
+                type=pa.string(),
+            )
+    return pa.table(arrays)
+
+
+def export_table(db_path: str, table_name: str, output_path: str, export_format: str = "parquet") -> int:
+    """Export a table of a database (TinyDB JSON file or SQLite) to a columnar file.
+
+    Args:
+        db_path (str): The path to the database.
+        table_name (str): The name of the table (e.g. "arguments" or "mappings").
+        output_path (str): The path to the file to write. It is replaced atomically.
+        export_format (str, optional): "parquet" or "arrow" (uncompressed Arrow IPC file, for memory-mapped
+            reads). Defaults to "parquet".
+
+    Returns:
+        int: The number of exported documents.
+
+    Raises:
+        FileNotFoundError: If the database does not exist.
+        ValueError: If the format is unknown.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: '{export_format}'. Expected one of: {', '.join(EXPORT_FORMATS)}.")
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"The database '{db_path}' does not exist.")
+    with open_database(db_path) as db:
+        documents = db.table(table_name).all()
+    table = documents_to_arrow(documents, table_name)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    if export_format == "parquet":
+        pa.parquet.write_table(table, tmp_path, compression="zstd")
+    else:
+        pa.feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, output_path)
+
+    logging.info(f"Exported {table.num_rows} documents of table '{table_name}' to: {output_path}")
+    return table.num_rows
@@ -1,24 +1,122 @@
+import inspect
+import logging
+import os
 import re
+import sys
 import unicodedata
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from urllib.parse import urljoin
 
+import bs4
 import langcodes
 from bs4 import BeautifulSoup, Tag
+from bs4.builder import builder_registry
+from bs4.filter import ElementFilter
 
-from climafactskg.utils import extract_hierarchy, fetch_url_content, remove_html_tags
+from climafactskg.utils import extract_hierarchy, fetch_url_content, hash_string, remove_html_tags
+
+# Version of the article parsers. Increase it whenever a change to the parsers changes the extracted articles, so
+# that incremental runs re-parse pages whose HTML did not change.
+PARSER_VERSION = "1"
+
+# BeautifulSoup tree builder used by the parsers: "html.parser" (pure Python, always available) or "lxml" (much
+# faster, requires the optional lxml package: `pip install climafactskg[lxml]`). Both produce the same articles for
+# well-formed SkepticalScience pages, which can be checked with `climafactskg benchmark`.
+HTML_PARSER = os.getenv("CLIMAFACTSKG_HTML_PARSER", "html.parser")
+if builder_registry.lookup(HTML_PARSER) is None:
+    logging.warning(f"The '{HTML_PARSER}' parser backend is not installed, using 'html.parser' instead.")
+    HTML_PARSER = "html.parser"
+
+# Only build the tree of the regions of the article pages read by the parsers (the title, the meta tags and the
+# content columns), unless the `CLIMAFACTSKG_SCOPED_PARSING` environment variable is set to 0:
+SCOPED_PARSING = os.getenv("CLIMAFACTSKG_SCOPED_PARSING", "1") != "0"
+CONTENT_REGIONS = ("centerColumn", "mainbody")
+
+# Texts read by the main article parser, and fields found in every article. A scoped parse is discarded for a parse
+# of the whole page when one of these texts is in the page but not in the content regions, or one of these fields
+# is empty:
+SCOPED_MARKERS = ("Rebuttal not found", "Select a level...", "Last updated on", "Translation by")
+SCOPED_EXPECTED_FIELDS = ("title", "author", "what_the_science_says", "climate_myth", "content")
+# The "What the science says" section follows a heading, so the pages without any (legacy arguments) always miss an
+# expected field and are parsed whole at once:
+_HEADING_PATTERN = re.compile(r"<h2[\s>]", re.IGNORECASE)
+
+TAXONOMY_URL = "https://skepticalscience.com/argument.php?f=taxonomy"
+
+
+class _ContentRegionsFilter(ElementFilter):
+    # BeautifulSoup only asks the filter about top-level elements, so every descendant of an allowed element is kept
+    # (including text), while the navigation, sidebars, scripts and comments are never built.
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return name in ("title", "meta") or (attrs or {}).get("id") in CONTENT_REGIONS
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+
+@lru_cache(maxsize=None)
+def parser_fingerprint(parser: Optional[str] = None, scoped: Optional[bool] = None) -> str:
+    """Return an identifier of the exact code extracting the articles, used to invalidate stored parse results.
+
+    The fingerprint combines `PARSER_VERSION`, a hash of the source of the parsers (this module and the helpers it
+    uses), the tree builder, the parsing mode (scoped or whole page) and the version of BeautifulSoup, so it changes
+    whenever the extracted articles may change, even if `PARSER_VERSION` was not increased.
+
+    Args:
+        parser (str, optional): The BeautifulSoup tree builder. Defaults to `HTML_PARSER`.
+        scoped (bool, optional): Whether only the content regions of the pages are parsed. Defaults to
+            `SCOPED_PARSING`.
+
+    Returns:
+        str: The fingerprint.
+    """
+    try:
+        sources = [inspect.getsource(obj) for obj in (sys.modules[__name__], extract_hierarchy, remove_html_tags)]
+    except OSError:
+        # The source is not available (e.g. compiled distribution), rely on `PARSER_VERSION` only:
+        sources = []
+    mode = "scoped" if (scoped if scoped is not None else SCOPED_PARSING) else "full"
+    return f"{PARSER_VERSION}-{hash_string(''.join(sources))}-{parser or HTML_PARSER}-{mode}-{bs4.__version__}"
+
+
+def _is_comment_myth(tag: Tag) -> bool:
+    # Equivalent to the `.comment.myth` CSS selector:
+    classes = tag.get("class") or []
+    return "comment" in classes and "myth" in classes
+
+
+def _find_links_in_paragraphs(container: Optional[Tag]) -> list[Tag]:
+    # Equivalent to the `<container> p a` CSS selector (links inside a paragraph of the container, in document order):
+    if container is None:
+        return []
+
+    links = []
+    seen = set()
+    for p in container.find_all("p"):
+        for a in p.find_all("a"):
+            if id(a) not in seen:
+                seen.add(id(a))
+                links.append(a)
+    return links
 
 
 def parse_taxonomy(
-    url: str = "https://skepticalscience.com/argument.php?f=taxonomy",
+    url: str = TAXONOMY_URL,
     html: Optional[str] = None,
+    parser: Optional[str] = None,
+    scoped: Optional[bool] = None,
 ) -> list:
     """Parses the taxonomy hierarchy from the given Skeptical Science taxonomy URL or provided HTML.
 
     Args:
         url (str, optional): The URL of the taxonomy page. Defaults to "https://skepticalscience.com/argument.php?f=taxonomy".
         html (str, optional): The HTML content of the taxonomy page. If not provided, it will be fetched from the URL.
+        parser (str, optional): The BeautifulSoup tree builder. Defaults to `HTML_PARSER`.
+        scoped (bool, optional): Only build the tree of the content columns of the page (the whole page is parsed if
+            the taxonomy is not found there). Defaults to `SCOPED_PARSING`.
 
     Returns:
         dict: A nested dictionary representing the taxonomy hierarchy.
@@ -28,10 +126,15 @@ def parse_taxonomy(
         html = fetch_url_content(url)
 
     # Parse the HTML content using BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
+    top_level_ul = None
+    if scoped if scoped is not None else SCOPED_PARSING:
+        soup = BeautifulSoup(html, parser or HTML_PARSER, parse_only=_ContentRegionsFilter())
+        top_level_ul = soup.select_one("#mainbody > ul")
+    if not top_level_ul:
+        soup = BeautifulSoup(html, parser or HTML_PARSER)
 
-    # Extract the top-level <ul> element containing the taxonomy
-    top_level_ul = soup.select_one("#mainbody > ul")  # Adjust selector based on the actual HTML structure
+        # Extract the top-level <ul> element containing the taxonomy
+        top_level_ul = soup.select_one("#mainbody > ul")  # Adjust selector based on the actual HTML structure
     if not top_level_ul:
         raise ValueError("Failed to locate the taxonomy hierarchy in the page.")
 
@@ -39,7 +142,87 @@ def parse_taxonomy(
     return extract_hierarchy(top_level_ul)
 
 
-def parse_main_article(url: str, html: Optional[str] = None) -> dict:
+class TaxonomyIndex:
+    """Flat index of a taxonomy hierarchy, to look up the position of an argument in the taxonomy in constant time.
+
+    The items of the hierarchy are numbered in document order (pre-order) and stored in parallel arrays: `urls[i]`
+    is the URL of item `i` (None for an item without link), `parents[i]` the number of its parent (-1 for top-level
+    items) and `ancestors[i]` the numbers of its ancestors, from the top-level item down to its parent. `positions`
+    maps each URL to the number of its item. When a URL appears several times, its first occurrence is indexed.
+
+    Args:
+        hierarchy (list[dict]): The taxonomy hierarchy, as returned by `parse_taxonomy`.
+        base_url (str, optional): The URL relative links of the hierarchy are resolved against. Defaults to an empty
+            string (the URLs are indexed as they are).
+    """
+
+    def __init__(self, hierarchy: list[dict], base_url: str = ""):
+        self.hierarchy = hierarchy
+        self.urls: list[Optional[str]] = []
+        self.parents: list[int] = []
+        self.ancestors: list[tuple[int, ...]] = []
+        self.positions: dict[str, int] = {}
+
+        stack = [(item, -1) for item in reversed(hierarchy)]
+        while stack:
+            item, parent = stack.pop()
+            position = len(self.urls)
+            url = urljoin(base_url, item["url"]) if item.get("url") is not None else None
+            self.urls.append(url)
+            self.parents.append(parent)
+            self.ancestors.append(self.ancestors[parent] + (parent,) if parent >= 0 else ())
+            if url is not None:
+                self.positions.setdefault(url, position)
+            stack += [(child, position) for child in reversed(item.get("subcategories", []))]
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.positions
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def parent(self, url: str) -> Optional[str]:
+        """Return the URL of the parent of an item, or None if the item is a top-level item or is not indexed."""
+        position = self.positions.get(url)
+        if position is None or self.parents[position] < 0:
+            return None
+        return self.urls[self.parents[position]]
+
+    def categories(self) -> list[str]:
+        """Return the URLs of the items with subcategories, in document order."""
+        parents = set(self.parents)
+        return [url for position, url in enumerate(self.urls) if position in parents and url is not None]
+
+    def path(self, url: str) -> list[str]:
+        """Return the URLs of the ancestors of an item followed by its own URL, or an empty list if it is not indexed.
+
+        Ancestors without link are skipped.
+        """
+        position = self.positions.get(url)
+        if position is None:
+            return []
+        return [u for u in (self.urls[i] for i in (*self.ancestors[position], position)) if u is not None]
+
+
+@lru_cache(maxsize=None)
+def load_taxonomy(url: str = TAXONOMY_URL, parser: Optional[str] = None) -> TaxonomyIndex:
+    """Parse the taxonomy page once per process and return its index, with the URLs resolved against the page URL.
+
+    The result is shared by all the callers, so its hierarchy must not be modified.
+
+    Args:
+        url (str, optional): The URL of the taxonomy page. Defaults to `TAXONOMY_URL`.
+        parser (str, optional): The BeautifulSoup tree builder. Defaults to `HTML_PARSER`.
+
+    Returns:
+        TaxonomyIndex: The index of the taxonomy.
+    """
+    return TaxonomyIndex(parse_taxonomy(url, parser=parser), base_url=url)
+
+
+def parse_main_article(
+    url: str, html: Optional[str] = None, parser: Optional[str] = None, scoped: Optional[bool] = None
+) -> dict:
     """Parses article metadata from the given URL or provided HTML content.
 
     This function extracts various metadata and content from an article's HTML or URL, including
@@ -49,6 +232,12 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
         url (str): The URL of the article to parse.
         html (str, optional): The HTML content of the article. If not provided, the function will
             fetch the HTML content from the given URL.
+        parser (str, optional): The BeautifulSoup tree builder ("html.parser" or "lxml"). Defaults to
+            `HTML_PARSER`.
+        scoped (bool, optional): Only build the tree of the title, the meta tags and the content columns of the
+            page. The whole page is parsed if it has no `#mainbody` or if the content columns miss part of the
+            article (see `SCOPED_MARKERS` and `SCOPED_EXPECTED_FIELDS`), and right away if it has no heading
+            (legacy arguments). Defaults to `SCOPED_PARSING`.
 
         dict: A dictionary containing the parsed article metadata with the following keys:
             - main_url (str): The main URL of the article.
@@ -89,11 +278,33 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
         html = fetch_url_content(url)
 
     # Parse the HTML content using BeautifulSoup:
-    soup = BeautifulSoup(html, "html.parser")
+    if (scoped if scoped is not None else SCOPED_PARSING) and (
+        "Rebuttal not found" in html or _HEADING_PATTERN.search(html)
+    ):
+        soup = BeautifulSoup(html, parser or HTML_PARSER, parse_only=_ContentRegionsFilter())
+        # Extracting the text walks the whole tree, so it is only done once:
+        page_text = soup.get_text()
+        if soup.find(id="mainbody") is not None and not any(
+            marker in html and marker not in page_text for marker in SCOPED_MARKERS
+        ):
+            article = _extract_main_article(url, soup, page_text)
+            if article["content"] is None or all(article[field] for field in SCOPED_EXPECTED_FIELDS):
+                return article
+        # Unexpected layout or incomplete article, fall back to a full parse:
+
+    soup = BeautifulSoup(html, parser or HTML_PARSER)
+    return _extract_main_article(url, soup, soup.get_text())
 
-    if "Rebuttal not found" in soup.text:
+
+def _extract_main_article(url: str, soup: BeautifulSoup, page_text: str) -> dict:
+    # Extracts the article of a parsed page (see `parse_main_article`), given the text of the page:
+    if "Rebuttal not found" in page_text:
         return {"url": url, "content": None}
 
+    # The CSS selectors of BeautifulSoup match every element of the page, so the main regions are looked up once with
+    # `find`, which is much faster:
+    mainbody = soup.find(id="mainbody")
+
     # Get the author and last updated date:
     title_tag = soup.find("title")
     title = title_tag.text if title_tag else None
@@ -101,17 +312,15 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
         soup.find("meta", attrs={"name": "keywords"})["content"]  # type: ignore
     ).split(", ")
 
-    if soup.find("meta", attrs={"name": "description"}):
-        description = remove_html_tags(
-            soup.find("meta", attrs={"name": "description"})["content"]  # type: ignore
-        )
+    if description_meta := soup.find("meta", attrs={"name": "description"}):
+        description = remove_html_tags(description_meta["content"])  # type: ignore
     else:
         description = None
 
     # Get the author and last updated date:
     last_update = None
     author = None
-    for box in soup.select("p.greenbox"):
+    for box in soup.find_all("p", class_="greenbox"):
         if "Last updated" in box.text:
             match = re.search(r"Last updated on (\d{1,2} \w+ \d{4})", box.text)
 
@@ -144,7 +353,7 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
 
     # Get language version with URLs:
     languages = []
-    for a in soup.select("#centerColumn p a"):
+    for a in _find_links_in_paragraphs(soup.find(id="centerColumn")):
         if a.has_attr("title") and "View this argument in " in a["title"]:
             match = re.search(r"View this argument in (.+)", str(a["title"]))
             if match:
@@ -159,9 +368,9 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
 
     # Get basic/intermediate/advanced/versions:
     level = None
-    if "Select a level..." in soup.text:
+    if "Select a level..." in page_text:
         levels = []
-        if table_list := soup.select_one("#mainbody tr"):
+        if table_list := (mainbody.find("tr") if mainbody else None):
             for t in table_list:
                 if t.text.strip() in ["Basic", "Intermediate", "Advanced"]:
                     if a := t.find("a"):  # type: ignore
@@ -190,27 +399,29 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
     what_the_science_says = None
     climate_myth = None
     climate_myth_source = None
-    h2_elem = soup.select_one("#mainbody h2")
+    h2_elem = mainbody.find("h2") if mainbody else None
     if h2_elem is not None:
         sel = h2_elem.find_next_sibling("div")
         if sel:
             what_the_science_says = sel.text.strip()
 
-    if what_the_science_says and soup.select_one(".comment.myth"):
-        comment_myth_elem = soup.select_one(".comment.myth")
+    comment_myth_elem = soup.find(_is_comment_myth)
+    if what_the_science_says and comment_myth_elem:
         climate_myth = (
             unicodedata.normalize("NFKD", comment_myth_elem.text.strip()) if comment_myth_elem is not None else None
         )
 
         climate_myth_source = None
-        comment_myth_a = soup.select_one(".comment.myth a")
+        comment_myth_a = next(
+            (a for elem in soup.find_all(_is_comment_myth) if (a := elem.find("a")) is not None), None
+        )
         if comment_myth_a:
             climate_myth_source = {
                 "url": comment_myth_a["href"],
                 "name": comment_myth_a.text.strip(),
             }
     elif what_the_science_says:
-        comment_elem = soup.select_one(".comment")
+        comment_elem = soup.find(class_="comment")
         if comment_elem is not None:
             climate_myth = unicodedata.normalize("NFKD", comment_elem.text.strip())
             a_tag = comment_elem.find("a")
@@ -252,10 +463,11 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
 
     elif (
         what_the_science_says
-        and soup.select_one(".comment.myth")
-        and soup.find("div", class_="comment myth").next_sibling  # type: ignore
+        and comment_myth_elem
+        and (myth_div := soup.find("div", class_="comment myth"))
+        and myth_div.next_sibling
     ):
-        siblings = soup.find("div", class_="comment myth").next_sibling.find_all("p")  # type: ignore
+        siblings = myth_div.next_sibling.find_all("p")  # type: ignore
 
     elif what_the_science_says:
         comment_div = soup.find("div", class_="comment")
@@ -332,7 +544,13 @@ def parse_main_article(url: str, html: Optional[str] = None) -> dict:
     return article
 
 
-def parse_translated_article(url: str, html: Optional[str] = None, language_code: Optional[str] = None) -> dict:
+def parse_translated_article(
+    url: str,
+    html: Optional[str] = None,
+    language_code: Optional[str] = None,
+    parser: Optional[str] = None,
+    scoped: Optional[bool] = None,
+) -> dict:
     """Parses a translated article from the given URL and optional HTML content.
 
     This function processes the main article data and removes unnecessary fields
@@ -345,6 +563,9 @@ def parse_translated_article(url: str, html: Optional[str] = None, language_code
             the function will fetch the content based on the URL.
         language_code (str, optional): The language code of the article. If not provided,
             the function will attempt to determine it automatically.
+        parser (str, optional): The BeautifulSoup tree builder. Defaults to `HTML_PARSER`.
+        scoped (bool, optional): Only build the tree of the regions read by the parser (see `parse_main_article`).
+            Defaults to `SCOPED_PARSING`.
 
     Returns:
         dict: A dictionary containing the parsed article data with the following modifications:
@@ -353,7 +574,7 @@ def parse_translated_article(url: str, html: Optional[str] = None, language_code
             - Adds a "lang" field indicating the language code of the article.
             - Adds a "main_url" field pointing to the main English version of the article.
     """
-    article = parse_main_article(url, html)
+    article = parse_main_article(url, html, parser=parser, scoped=scoped)
 
     # Remove unnecessary fields for translated articles:
     del article["keywords"]
@@ -382,8 +603,8 @@ if __name__ == "__main__":
     from climafactskg.classifiers.cards import CARDSMatcher
     from climafactskg.utils import print_dict_tree
 
-    taxonomy = parse_taxonomy()
-    print_dict_tree(taxonomy, main_key="url", list_key="subcategories")
+    taxonomy = load_taxonomy()
+    print_dict_tree(taxonomy.hierarchy, main_key="url", list_key="subcategories")
 
     cm = CARDSMatcher()
     print(cm.clean("This is some testing text with some 'climate' myths."))
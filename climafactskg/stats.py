@@ -1,8 +1,131 @@
-from collections import Counter
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
 
-from tinydb import JSONStorage, TinyDB
-from tinydb_serialization import SerializationMiddleware
-from tinydb_serialization.serializers import DateTimeSerializer
+from climafactskg.storage import iter_documents
+
+# Counters computed by default for each table: the fields whose values are counted, and the pairs of fields that are
+# cross-tabulated.
+DEFAULT_STATS = {
+    "arguments": {
+        "keys": ["lang", "level", "cards_category", "main_url"],
+        "crosstabs": [("lang", "cards_category"), ("lang", "level")],
+    },
+    "mappings": {
+        "keys": ["lang", "cards_category"],
+        "crosstabs": [("lang", "cards_category")],
+    },
+}
+
+
+def _value_key(value) -> str:
+    # JSON object keys must be strings:
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, default=str, sort_keys=True)
+
+
+def _is_missing(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def compute_stats(
+    documents: Iterable[dict],
+    keys: Iterable[str] = (),
+    crosstabs: Iterable[tuple[str, str]] = (),
+    top: Optional[int] = None,
+) -> dict:
+    """Compute counters over documents in a single pass.
+
+    Args:
+        documents (Iterable[dict]): The documents (e.g. from `iter_documents`). They are only iterated once.
+        keys (Iterable[str], optional): The fields whose values are counted. Defaults to none.
+        crosstabs (Iterable[tuple[str, str]], optional): The pairs of fields whose combinations of values are
+            counted. Defaults to none.
+        top (int, optional): Only report the `top` most common values of each field. Defaults to None (all values).
+
+    Returns:
+        dict: The number of `documents`, then for each counted field (`keys`) the number of `unique` non-null
+            values, the number of documents where it is `missing` (or null) and the `counts` of each value (most
+            common first), the `crosstabs` (as nested counts, e.g. `{"en": {"1_1": 3}}` for `lang:cards_category`),
+            and for every field found in the documents, the number of documents where it is missing, null or empty
+            (`missing`).
+    """
+    keys = list(keys)
+    crosstabs = list(crosstabs)
+
+    total = 0
+    counters = {key: Counter() for key in keys}
+    crosstab_counters = {pair: defaultdict(Counter) for pair in crosstabs}
+    filled = Counter()
+
+    for document in documents:
+        total += 1
+        for key in keys:
+            if key in document:
+                counters[key][_value_key(document[key])] += 1
+        for first, second in crosstabs:
+            crosstab_counters[(first, second)][_value_key(document.get(first))][_value_key(document.get(second))] += 1
+        filled.update(field for field, value in document.items() if not _is_missing(value))
+
+    fields = set(filled) | set(keys)
+    return {
+        "documents": total,
+        "keys": {
+            key: {
+                "unique": len(counters[key]) - ("null" in counters[key]),
+                "missing": total - sum(counters[key].values()) + counters[key].get("null", 0),
+                "counts": dict(counters[key].most_common(top)),
+            }
+            for key in keys
+        },
+        "crosstabs": {
+            f"{first}:{second}": {
+                value: dict(counts.most_common())
+                for value, counts in sorted(crosstab_counters[(first, second)].items())
+            }
+            for first, second in crosstabs
+        },
+        "missing": {field: total - filled[field] for field in sorted(fields)},
+    }
+
+
+def collect_stats(
+    databases: dict[str, str],
+    keys: Optional[list[str]] = None,
+    crosstabs: Optional[list[tuple[str, str]]] = None,
+    top: Optional[int] = None,
+) -> dict:
+    """Compute the statistics of the tables of several databases, reading each table once.
+
+    Args:
+        databases (dict[str, str]): The path to the database of each table (e.g. `{"arguments": "data/..."}`).
+        keys (list[str], optional): The fields whose values are counted. Defaults to the `DEFAULT_STATS` of each
+            table.
+        crosstabs (list[tuple[str, str]], optional): The pairs of fields to cross-tabulate. Defaults to the
+            `DEFAULT_STATS` of each table.
+        top (int, optional): Only report the `top` most common values of each field. Defaults to None (all values).
+
+    Returns:
+        dict: The time the statistics were `generated` at, and the result of `compute_stats` for each table, with
+            the path of its `database`.
+    """
+    stats: dict = {"generated": datetime.now(timezone.utc).isoformat()}
+    for table_name, path in databases.items():
+        defaults = DEFAULT_STATS.get(table_name, {"keys": [], "crosstabs": []})
+        stats[table_name] = {
+            "database": path,
+            **compute_stats(
+                iter_documents(path, table_name),
+                keys=keys if keys is not None else defaults["keys"],
+                crosstabs=crosstabs if crosstabs is not None else defaults["crosstabs"],
+                top=top,
+            ),
+        }
+    return stats
 
 
 def count_unique_values(
@@ -10,16 +133,10 @@ def count_unique_values(
     key="main_url",
     table_name="arguments",
 ):
-    serialization = SerializationMiddleware(JSONStorage)
-    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
-
-    with TinyDB(json_db, storage=serialization) as db:
-        db.default_table_name = table_name
+    values = [item.get(key) for item in iter_documents(json_db, table_name) if key in item]
+    unique_values = Counter(values)
 
-        values = [item.get(key) for item in db.all() if key in item]
-        unique_values = Counter(values)
-
-        print(f"Unique values for '{key}' in table '{table_name}': {len(unique_values)}")
+    print(f"Unique values for '{key}' in table '{table_name}': {len(unique_values)}")
 
     return unique_values
 
@@ -28,18 +145,13 @@ if __name__ == "__main__":
     from dotenv import load_dotenv
 
     load_dotenv()
-    json_db = "data/skepticalscience_arguments_db.json"
-
-    print("---------- ClimaFactsKG ----------")
-    count_unique_values(json_db, key="lang", table_name="arguments")
-    count_unique_values(json_db, key="main_url", table_name="arguments")
-    print(count_unique_values(json_db, key="cards_category", table_name="arguments"))
 
-    print("---------- CimpleKG ----------")
-    json_db = "data/cimplekg_claims_db.json"
-    cnt = count_unique_values(json_db, key="cards_category", table_name="mappings")
+    stats = collect_stats(
+        {"arguments": "data/skepticalscience_arguments_db.json", "mappings": "data/cimplekg_claims_db.json"}
+    )
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
 
     # Count the total number of claims except 0_0:
-    print(cnt)
-    total_claims = sum(cnt.values()) - cnt.get("0_0", 0) - cnt.get(None, 0)
+    cnt = stats["mappings"]["keys"]["cards_category"]["counts"]
+    total_claims = sum(cnt.values()) - cnt.get("0_0", 0) - cnt.get("null", 0)
     print(f"Total claims (excluding '0_0' and None): {total_claims}")
@@ -0,0 +1,713 @@
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+from tinydb import TinyDB
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import Storage
+from tinydb.table import Table
+from tinydb_serialization import SerializationMiddleware, Serializer
+from tinydb_serialization.serializers import DateTimeSerializer
+
+logging.basicConfig(level=logging.INFO)
+
+# Number of database writes kept in memory before they are flushed to disk, and maximum number of seconds between two
+# flushes. A batch size of 1 writes every change immediately.
+DB_BATCH_SIZE = int(os.getenv("CLIMAFACTSKG_DB_BATCH_SIZE", 100))
+DB_FLUSH_SECONDS = float(os.getenv("CLIMAFACTSKG_DB_FLUSH_SECONDS", 60))
+
+# Databases whose file has one of these extensions are stored in SQLite or in an append-only journal, the others in a
+# JSON file:
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+JOURNAL_EXTENSIONS = (".jsonl",)
+
+# Minimum number of records in a journal before it is compacted during a run (it is also compacted when it has more
+# records than the database has documents, and when the database is closed):
+JOURNAL_COMPACT_RECORDS = int(os.getenv("CLIMAFACTSKG_JOURNAL_COMPACT_RECORDS", 10_000))
+
+# Document fields exposed as indexed columns of the SQLite databases:
+INDEXED_FIELDS = ("url", "main_url", "lang", "cards_category")
+
+
+class AtomicJSONStorage(Storage):
+    """TinyDB storage writing the database to a JSON file atomically.
+
+    Unlike `tinydb.JSONStorage`, which rewrites the file in place, each write goes to a temporary file that then
+    replaces the database file, so an interrupted write never leaves a truncated database behind. The files are
+    compatible with `JSONStorage`.
+
+    Args:
+        path (str): The path to the JSON file.
+        create_dirs (bool, optional): Create the parent directories of the file if needed. Defaults to False.
+        encoding (str, optional): The encoding of the file. Defaults to "utf-8".
+        **kwargs: Arguments passed to `json.dump` (e.g. `indent`).
+    """
+
+    def __init__(self, path: str, create_dirs: bool = False, encoding: str = "utf-8", **kwargs):
+        super().__init__()
+        self.path = path
+        self.encoding = encoding
+        self.kwargs = kwargs
+        if create_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def read(self) -> Optional[dict[str, dict[str, Any]]]:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            # TinyDB initializes an empty database when the storage returns None:
+            return None
+        with open(self.path, "r", encoding=self.encoding) as f:
+            return json.load(f)
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding=self.encoding) as f:
+            json.dump(data, f, **self.kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class _IncrementalStorage(Storage):
+    # Base class of the storages that only write the documents that changed since the last read or write. They can
+    # serialize values themselves (in the format of `tinydb_serialization`), so that only the changed documents are
+    # serialized, rather than the whole database as `SerializationMiddleware` does on every write.
+
+    def __init__(self, serializers: Optional[dict[str, Serializer]] = None):
+        super().__init__()
+        self.serializers = serializers or {}
+        # Last state read from or written to the storage, per table and document ID:
+        self._snapshot: dict[str, dict[str, Any]] = {}
+
+    def _encode(self, value):
+        if not self.serializers:
+            return value
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._encode(item) for item in value]
+        for name, serializer in self.serializers.items():
+            if isinstance(value, serializer.OBJ_CLASS):
+                return f"{{{name}}}:{serializer.encode(value)}"
+        return value
+
+    def _decode(self, value):
+        if not self.serializers:
+            return value
+        if isinstance(value, dict):
+            return {key: self._decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if isinstance(value, str) and value.startswith("{"):
+            for name, serializer in self.serializers.items():
+                if value.startswith(f"{{{name}}}:"):
+                    return serializer.decode(value[len(name) + 3 :])
+        return value
+
+    def _load(self, text: str):
+        return self._decode(json.loads(text))
+
+    def _diff(
+        self, data: dict[str, dict[str, Any]], changes: Optional[dict[str, Optional[set[str]]]] = None
+    ) -> tuple[list, list, list, list]:
+        # Return the dropped and created tables, the changed documents as (table, doc ID, JSON text) and the removed
+        # documents as (table, doc ID). When the IDs of the documents changed in each table are given (None for a
+        # whole table), only these documents are compared with the snapshot, the other tables being unchanged:
+        dropped = sorted(set(self._snapshot) - set(data))
+        created = [table_name for table_name in data if table_name not in self._snapshot]
+        changed, removed = [], []
+
+        for table_name, table in data.items():
+            previous = self._snapshot.get(table_name, {})
+            if changes is None or table_name in created or changes.get(table_name, set()) is None:
+                doc_ids = [*table, *(doc_id for doc_id in previous if doc_id not in table)]
+            else:
+                doc_ids = sorted(changes.get(table_name, set()))
+
+            for doc_id in doc_ids:
+                if doc_id not in table:
+                    if doc_id in previous:
+                        removed.append((table_name, doc_id))
+                elif previous.get(doc_id) != table[doc_id]:
+                    changed.append((table_name, doc_id, json.dumps(self._encode(table[doc_id]))))
+        return dropped, created, changed, removed
+
+    def _commit(self, dropped: list, created: list, changed: list, removed: list) -> None:
+        # Apply the changes returned by `_diff` to the snapshot, once they are written:
+        for table_name in dropped:
+            del self._snapshot[table_name]
+        for table_name in created:
+            self._snapshot[table_name] = {}
+        for table_name, doc_id, text in changed:
+            # The snapshot gets its own copy, as the documents are modified in place by TinyDB:
+            self._snapshot[table_name][doc_id] = self._load(text)
+        for table_name, doc_id in removed:
+            del self._snapshot[table_name][doc_id]
+
+
+class SQLiteStorage(_IncrementalStorage):
+    """TinyDB storage keeping the documents in a SQLite database, one row per document.
+
+    The documents are stored as JSON text, with generated columns and indexes for the fields in `INDEXED_FIELDS`
+    (e.g. `SELECT lang, COUNT(*) FROM documents WHERE table_name = 'arguments' GROUP BY lang`). Only the documents
+    that changed since the last read or write are written, in a single transaction. The database uses WAL mode, so
+    other processes (e.g. `build`) can read it while it is being written, and always see the last committed state.
+
+    Args:
+        path (str): The path to the SQLite database file.
+        create_dirs (bool, optional): Create the parent directories of the file if needed. Defaults to False.
+        serializers (dict[str, Serializer], optional): Serializers of the values that are not JSON types, by name
+            (e.g. `{"TinyDate": DateTimeSerializer()}`). Defaults to None (documents are stored as given).
+    """
+
+    def __init__(
+        self, path: str, create_dirs: bool = False, serializers: Optional[dict[str, Serializer]] = None, **kwargs
+    ):
+        super().__init__(serializers)
+        self.path = path
+        self._lock = threading.Lock()
+
+        if create_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = "".join(
+            f", {field} GENERATED ALWAYS AS (json_extract(document, '$.{field}')) VIRTUAL" for field in INDEXED_FIELDS
+        )
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS documents (
+                table_name TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                document TEXT NOT NULL{columns},
+                PRIMARY KEY (table_name, doc_id)
+            )
+            """
+        )
+        for field in INDEXED_FIELDS:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS documents_{field} ON documents (table_name, {field})")
+        # Tables are listed separately, so that empty tables are kept:
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tables (name TEXT PRIMARY KEY)")
+        self._conn.commit()
+
+    def read(self) -> Optional[dict[str, dict[str, Any]]]:
+        with self._lock:
+            # Read the tables and the documents in the same transaction, to get a consistent state:
+            self._conn.execute("BEGIN")
+            try:
+                names = [row[0] for row in self._conn.execute("SELECT name FROM tables")]
+                rows = self._conn.execute(
+                    "SELECT table_name, doc_id, document FROM documents ORDER BY table_name, doc_id"
+                ).fetchall()
+            finally:
+                self._conn.commit()
+
+        self._snapshot = {name: {} for name in names}
+        if not names and not rows:
+            # TinyDB initializes an empty database when the storage returns None:
+            return None
+
+        data: dict[str, dict[str, Any]] = {name: {} for name in names}
+        for table_name, doc_id, document in rows:
+            # The snapshot gets its own copy, as the returned documents are modified in place by TinyDB:
+            data.setdefault(table_name, {})[str(doc_id)] = self._load(document)
+            self._snapshot.setdefault(table_name, {})[str(doc_id)] = self._load(document)
+        return data
+
+    def write(self, data: dict[str, dict[str, Any]], changes: Optional[dict[str, Optional[set[str]]]] = None) -> None:
+        dropped, created, changed, removed = self._diff(data, changes)
+        with self._lock, self._conn:
+            for table_name in dropped:
+                self._conn.execute("DELETE FROM documents WHERE table_name = ?", (table_name,))
+                self._conn.execute("DELETE FROM tables WHERE name = ?", (table_name,))
+            self._conn.executemany("INSERT OR IGNORE INTO tables (name) VALUES (?)", [(name,) for name in created])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (table_name, doc_id, document) VALUES (?, ?, ?)",
+                [(table_name, int(doc_id), text) for table_name, doc_id, text in changed],
+            )
+            self._conn.executemany(
+                "DELETE FROM documents WHERE table_name = ? AND doc_id = ?",
+                [(table_name, int(doc_id)) for table_name, doc_id in removed],
+            )
+        self._commit(dropped, created, changed, removed)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class JournalStorage(_IncrementalStorage):
+    """TinyDB storage appending the changes to a JSON Lines journal, folded into a JSON snapshot from time to time.
+
+    Each write appends one line per changed or removed document (and per created or dropped table) to the journal
+    and syncs it to disk, so its cost only depends on the number of changes. Reading the database loads the snapshot
+    (`<path>.snapshot.json`, a TinyDB JSON file) and replays the journal. A last line cut short by a crash, or a
+    line that is not a valid record (and the lines after it), is ignored, so the database is restored as of the last
+    complete write.
+
+    The journal is compacted (written into a new snapshot, then emptied) when a database that was written to is
+    closed, and during a run when it has more than `compact_records` records and more records than the database has
+    documents. Replaying the records is idempotent, so a crash during a compaction loses nothing.
+
+    Args:
+        path (str): The path to the journal.
+        create_dirs (bool, optional): Create the parent directories of the file if needed. Defaults to False.
+        compact_records (int, optional): The minimum number of records before the journal is compacted during a run.
+            Defaults to `JOURNAL_COMPACT_RECORDS`.
+        serializers (dict[str, Serializer], optional): Serializers of the values that are not JSON types, by name.
+            Defaults to None (documents are stored as given).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        create_dirs: bool = False,
+        compact_records: int = JOURNAL_COMPACT_RECORDS,
+        serializers: Optional[dict[str, Serializer]] = None,
+        **kwargs,
+    ):
+        super().__init__(serializers)
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot.json"
+        self.compact_records = compact_records
+        self._records = 0
+        # Length of the valid records of the journal, if it ends with an incomplete or corrupt record:
+        self._truncate_at: Optional[int] = None
+        self._written = False
+
+        if create_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def read(self) -> Optional[dict[str, dict[str, Any]]]:
+        data = AtomicJSONStorage(self.snapshot_path).read() or {}
+        self._records = 0
+        self._truncate_at = None
+
+        if os.path.exists(self.path):
+            offset = 0
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # The last write was interrupted (or is still in progress in another process):
+                        logging.warning(f"Ignoring an incomplete record at the end of the journal: {self.path}")
+                        self._truncate_at = offset
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    if not isinstance(record, dict):
+                        # The end of the file was not written before a crash (e.g. zero-filled blocks):
+                        logging.warning(f"Ignoring a corrupt record and the rest of the journal: {self.path}")
+                        self._truncate_at = offset
+                        break
+                    self._apply(data, record)
+                    offset += len(line)
+                    self._records += 1
+
+        text = json.dumps(data)
+        self._snapshot = self._load(text)
+        # TinyDB initializes an empty database when the storage returns None:
+        return self._load(text) or None
+
+    @staticmethod
+    def _apply(data: dict[str, dict[str, Any]], record: dict) -> None:
+        if "document" in record:
+            data.setdefault(record["table"], {})[record["doc_id"]] = record["document"]
+        elif "doc_id" in record:
+            data.get(record["table"], {}).pop(record["doc_id"], None)
+        elif record.get("drop"):
+            data.pop(record["table"], None)
+        else:
+            data.setdefault(record["table"], {})
+
+    def write(self, data: dict[str, dict[str, Any]], changes: Optional[dict[str, Optional[set[str]]]] = None) -> None:
+        dropped, created, changed, removed = self._diff(data, changes)
+        lines = [json.dumps({"table": table_name, "drop": True}) for table_name in dropped]
+        lines += [json.dumps({"table": table_name}) for table_name in created]
+        # The documents are already serialized, so they are inserted as is:
+        lines += [
+            f'{{"table": {json.dumps(table_name)}, "doc_id": {json.dumps(doc_id)}, "document": {text}}}'
+            for table_name, doc_id, text in changed
+        ]
+        lines += [json.dumps({"table": table_name, "doc_id": doc_id}) for table_name, doc_id in removed]
+
+        if lines:
+            if self._truncate_at is not None:
+                # Drop the incomplete record, so that the new records start on a new line:
+                os.truncate(self.path, self._truncate_at)
+                self._truncate_at = None
+            self._written = True
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self._records += len(lines)
+        self._commit(dropped, created, changed, removed)
+
+        if self._records > max(self.compact_records, sum(len(table) for table in self._snapshot.values())):
+            self.compact()
+
+    def compact(self) -> None:
+        """Write the current state of the database into the snapshot and empty the journal."""
+        if self._records == 0 and os.path.exists(self.snapshot_path):
+            return
+        AtomicJSONStorage(self.snapshot_path).write(self._encode(self._snapshot))
+        with open(self.path, "w", encoding="utf-8") as f:
+            os.fsync(f.fileno())
+        logging.info(f"Compacted {self._records} journal records into: {self.snapshot_path}")
+        self._records = 0
+        # The ignored records were emptied with the journal:
+        self._truncate_at = None
+
+    def close(self) -> None:
+        # Only the writers compact the journal, readers leave it as is:
+        if self._written:
+            self.compact()
+
+
+def get_storage_class(path: str) -> type[Storage]:
+    """Return the storage for a database file: `SQLiteStorage` for the `SQLITE_EXTENSIONS`, `JournalStorage` for the
+    `JOURNAL_EXTENSIONS`, `AtomicJSONStorage` otherwise.
+    """  # noqa: D205
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SQLiteStorage
+    elif path.lower().endswith(JOURNAL_EXTENSIONS):
+        return JournalStorage
+    return AtomicJSONStorage
+
+
+def iter_documents(path: str, table_name: str) -> Iterator[dict]:
+    """Iterate over the documents of a table without loading the database in TinyDB.
+
+    The documents of SQLite databases are streamed row by row, in document ID order. JSON databases and journals are
+    loaded once.
+    The values are returned as stored, without deserialization (e.g. datetimes are `{TinyDate}:...` strings).
+
+    Args:
+        path (str): The path to the database (JSON, SQLite or journal, see `get_storage_class`).
+        table_name (str): The name of the table.
+
+    Yields:
+        dict: The documents of the table.
+
+    Raises:
+        FileNotFoundError: If the database does not exist.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"The database '{path}' does not exist.")
+
+    if get_storage_class(path) is SQLiteStorage:
+        storage = SQLiteStorage(path)
+        try:
+            for (document,) in storage._conn.execute(
+                "SELECT document FROM documents WHERE table_name = ? ORDER BY doc_id", (table_name,)
+            ):
+                yield json.loads(document)
+        finally:
+            storage.close()
+    else:
+        storage = get_storage_class(path)(path)
+        try:
+            data = storage.read() or {}
+        finally:
+            storage.close()
+        yield from data.get(table_name, {}).values()
+
+
+class BatchedWriteMiddleware(CachingMiddleware):
+    """TinyDB middleware keeping the database in memory and writing it to the storage in batches.
+
+    Every change to a TinyDB table rewrites the whole storage, so writing documents one by one costs a full rewrite
+    of the database file per document. This middleware only writes the database once `batch_size` changes are
+    pending or `flush_seconds` have elapsed since the last write (a checkpoint), and when the database is closed.
+    If the process crashes, at most the changes made since the last checkpoint are lost.
+
+    When `track_changes` is set, the tables report the IDs of the documents they change (see `mark_changed` and
+    `URLIndexedTable`), and only these documents are compared with the stored ones when the changes are written to
+    an incremental storage (`SQLiteStorage` or `JournalStorage`). All the changes must then be made through tables
+    reporting them.
+
+    Args:
+        storage_cls: The storage (or middleware) class to wrap.
+        batch_size (int, optional): The number of changes kept in memory before a flush. Defaults to `DB_BATCH_SIZE`.
+        flush_seconds (float, optional): The maximum number of seconds between two flushes. Defaults to
+            `DB_FLUSH_SECONDS`.
+        track_changes (bool, optional): Only write the documents reported by the tables. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        storage_cls,
+        batch_size: int = DB_BATCH_SIZE,
+        flush_seconds: float = DB_FLUSH_SECONDS,
+        track_changes: bool = False,
+    ):
+        super().__init__(storage_cls)
+        self.WRITE_CACHE_SIZE = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.track_changes = track_changes
+        self._last_flush = time.monotonic()
+        # IDs of the documents changed since the last flush, per table (None when the whole table changed):
+        self._changes: dict[str, Optional[set[str]]] = {}
+        # Names of the tables as of the last read or write, to detect the tables dropped by the database:
+        self._tables: Optional[set[str]] = None
+
+    def read(self):
+        data = super().read()
+        if self._tables is None:
+            self._tables = set(data or {})
+        return data
+
+    def write(self, data):
+        if self.track_changes:
+            # A dropped table may be created again before the next flush, so all its documents are compared then:
+            for table_name in (self._tables or set()) - set(data):
+                self._changes[table_name] = None
+            self._tables = set(data)
+            # The changed documents are only known once the table operation returns, see `mark_changed`:
+            self.cache = data
+            self._cache_modified_count += 1
+            return
+
+        super().write(data)
+        self._maybe_flush()
+
+    def mark_changed(self, table_name: str, doc_ids: Optional[list[int]] = None) -> None:
+        """Record the documents changed by a table operation, then write the pending changes if a flush is due.
+
+        Args:
+            table_name (str): The name of the table.
+            doc_ids (list[int], optional): The IDs of the inserted, updated or removed documents. Defaults to None
+                (the whole table changed).
+        """
+        if doc_ids is None:
+            self._changes[table_name] = None
+        elif (changed := self._changes.setdefault(table_name, set())) is not None:
+            changed.update(str(doc_id) for doc_id in doc_ids)
+
+        if self._cache_modified_count >= self.WRITE_CACHE_SIZE:
+            self.flush()
+        else:
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self._cache_modified_count > 0 and time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Write the pending changes to the storage."""
+        if self._cache_modified_count > 0:
+            logging.debug(f"Flushing {self._cache_modified_count} pending database change(s).")
+            if self.track_changes and isinstance(self.storage, _IncrementalStorage):
+                self.storage.write(self.cache, self._changes)
+            else:
+                self.storage.write(self.cache)
+            self._cache_modified_count = 0
+        self._changes = {}
+        self._last_flush = time.monotonic()
+
+
+class URLIndexedTable(Table):
+    """TinyDB table keeping an in-memory index of the `url` field of its documents.
+
+    Queries testing the equality of the `url` field with a string (e.g. `where("url") == url` or
+    `Query().url == url`) passed to `contains`, `get`, `update` and `upsert` are answered from the index instead of
+    scanning the table. The index is built on first use and kept in sync with the writes made through the table; the
+    changes made by other processes are not seen.
+
+    The IDs of the documents changed by each operation are reported to the storage when it is a
+    `BatchedWriteMiddleware`, so that only these documents are written.
+    """
+
+    indexed_field = "url"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ids_by_value: Optional[dict[str, list[int]]] = None
+        self._value_by_id: dict[int, str] = {}
+
+    def _index(self) -> dict[str, list[int]]:
+        if self._ids_by_value is None:
+            self._ids_by_value, self._value_by_id = {}, {}
+            for doc_id, document in self._read_table().items():
+                self._add(int(doc_id), document)
+        return self._ids_by_value
+
+    def _add(self, doc_id: int, document) -> None:
+        if self._ids_by_value is not None and isinstance(document.get(self.indexed_field), str):
+            # The IDs are kept in table order, so `get` returns the same document as a scan:
+            bisect.insort(self._ids_by_value.setdefault(document[self.indexed_field], []), doc_id)
+            self._value_by_id[doc_id] = document[self.indexed_field]
+
+    def _discard(self, doc_id: int) -> None:
+        if self._ids_by_value is not None and (value := self._value_by_id.pop(doc_id, None)) is not None:
+            self._ids_by_value[value].remove(doc_id)
+            if not self._ids_by_value[value]:
+                del self._ids_by_value[value]
+
+    def _changed(self, doc_ids: Optional[list[int]] = None) -> None:
+        if isinstance(self._storage, BatchedWriteMiddleware):
+            self._storage.mark_changed(self.name, doc_ids)
+
+    def _indexed_ids(self, cond) -> Optional[list[int]]:
+        # Return the IDs of the documents matching the query if it can be answered by the index, None otherwise:
+        query = getattr(cond, "_hash", None)
+        if (
+            isinstance(query, tuple)
+            and len(query) == 3
+            and query[:2] == ("==", (self.indexed_field,))
+            and isinstance(query[2], str)
+        ):
+            return list(self._index().get(query[2], []))
+        return None
+
+    def get(self, cond=None, doc_id=None, doc_ids=None):
+        if doc_id is None and doc_ids is None and (ids := self._indexed_ids(cond)) is not None:
+            # The first document in table order, like a scan:
+            return super().get(doc_id=ids[0]) if ids else None
+        return super().get(cond, doc_id, doc_ids)
+
+    def insert(self, document) -> int:
+        doc_id = super().insert(document)
+        self._add(doc_id, document)
+        self._changed([doc_id])
+        return doc_id
+
+    def insert_multiple(self, documents) -> list[int]:
+        documents = list(documents)
+        doc_ids = super().insert_multiple(documents)
+        for doc_id, document in zip(doc_ids, documents, strict=True):
+            self._add(doc_id, document)
+        self._changed(doc_ids)
+        return doc_ids
+
+    def update(self, fields, cond=None, doc_ids=None) -> list[int]:
+        if doc_ids is None and (ids := self._indexed_ids(cond)) is not None:
+            if not ids:
+                return []
+            cond, doc_ids = None, ids
+
+        updated = super().update(fields, cond, doc_ids)
+        if callable(fields):
+            # The new values are unknown, rebuild the index on next use:
+            self._ids_by_value = None
+        elif self.indexed_field in fields:
+            for doc_id in updated:
+                self._discard(doc_id)
+                self._add(doc_id, fields)
+        self._changed(updated)
+        return updated
+
+    def update_multiple(self, updates) -> list[int]:
+        updated = super().update_multiple(updates)
+        self._ids_by_value = None
+        self._changed(updated)
+        return updated
+
+    def remove(self, cond=None, doc_ids=None) -> list[int]:
+        removed = super().remove(cond, doc_ids)
+        for doc_id in removed:
+            self._discard(doc_id)
+        self._changed(removed)
+        return removed
+
+    def truncate(self) -> None:
+        super().truncate()
+        self._ids_by_value = None
+        self._changed()
+
+
+def open_database(
+    path: str,
+    table: Optional[str] = None,
+    batch_size: int = DB_BATCH_SIZE,
+    flush_seconds: float = DB_FLUSH_SECONDS,
+) -> TinyDB:
+    """Open a TinyDB database with the datetime serializer, batched writes and URL index.
+
+    The database is stored in SQLite if the path has one of the `SQLITE_EXTENSIONS` (see `SQLiteStorage`), in an
+    append-only journal if it has one of the `JOURNAL_EXTENSIONS` (see `JournalStorage`), and in a JSON file written
+    atomically otherwise (see `AtomicJSONStorage`). The tables of the database are
+    `URLIndexedTable`s, so looking up or upserting a document by URL does not scan the table.
+
+    The database must be closed (or used as a context manager) for the last changes to be written.
+
+    Args:
+        path (str): The path to the database (e.g. `data/skepticalscience_arguments_db.json`, `.sqlite` or `.jsonl`).
+        table (str, optional): The default table of the database. Defaults to TinyDB's default table.
+        batch_size (int, optional): The number of changes kept in memory before they are written (1 writes every
+            change immediately). Defaults to `DB_BATCH_SIZE`.
+        flush_seconds (float, optional): The maximum number of seconds between two writes. Defaults to
+            `DB_FLUSH_SECONDS`.
+
+    Returns:
+        TinyDB: The database.
+
+    Example:
+        with open_database("data/skepticalscience_arguments_db.json", table="arguments") as db:
+            db.upsert(article, Query().url == article["url"])
+    """
+    serializers = {"TinyDate": DateTimeSerializer()}
+    storage_cls = get_storage_class(path)
+    if issubclass(storage_cls, _IncrementalStorage):
+        # These storages serialize the documents themselves, and only the ones reported by the tables:
+        storage = BatchedWriteMiddleware(
+            storage_cls, batch_size=batch_size, flush_seconds=flush_seconds, track_changes=True
+        )
+        db = TinyDB(path, storage=storage, create_dirs=True, serializers=serializers)
+    else:
+        serialization = SerializationMiddleware(storage_cls)
+        for name, serializer in serializers.items():
+            serialization.register_serializer(serializer, name)
+
+        # The cache sits above the serialization, so documents are only serialized when they are written to disk:
+        storage = BatchedWriteMiddleware(serialization, batch_size=batch_size, flush_seconds=flush_seconds)
+        db = TinyDB(path, storage=storage, create_dirs=True)
+    db.table_class = URLIndexedTable
+    if table is not None:
+        db.default_table_name = table
+    return db
+
+
+def migrate_database(source: str, target: str, overwrite: bool = False) -> int:
+    """Copy all the tables of a database to another database, possibly with another storage (e.g. JSON to SQLite).
+
+    The storage of each database is chosen from its file extension (see `get_storage_class`).
+
+    Args:
+        source (str): The path to the database to copy.
+        target (str): The path to the new database.
+        overwrite (bool, optional): Replace the content of the target database if it is not empty. Defaults to False.
+
+    Returns:
+        int: The number of copied documents.
+
+    Raises:
+        FileNotFoundError: If the source database does not exist.
+        FileExistsError: If the target database is not empty and `overwrite` is False.
+    """
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"The database '{source}' does not exist.")
+
+    source_storage = get_storage_class(source)(source)
+    try:
+        data = source_storage.read() or {}
+    finally:
+        source_storage.close()
+
+    target_storage = get_storage_class(target)(target, create_dirs=True)
+    try:
+        if target_storage.read() and not overwrite:
+            raise FileExistsError(f"The database '{target}' is not empty.")
+        target_storage.write(data)
+    finally:
+        target_storage.close()
+
+    count = sum(len(table) for table in data.values())
+    logging.info(f"Migrated {count} documents in {len(data)} table(s) from '{source}' to '{target}'.")
+    return count
@@ -0,0 +1,308 @@
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+logging.basicConfig(level=logging.INFO)
+
+
+class HostRateLimiter:
+    """Limits the number of concurrent requests and the request rate for each host.
+
+    The limiter is thread-safe and is meant to be shared by all the workers of a crawl. Each host gets its own
+    concurrency slots and its own request schedule, so a slow host does not block requests to other hosts.
+
+    Args:
+        max_concurrency (int): The maximum number of requests in flight for a single host. Defaults to 4.
+        requests_per_second (float, optional): The maximum number of requests started per second for a single host.
+            If None or not positive, the request rate is not limited.
+    """
+
+    def __init__(self, max_concurrency: int = 4, requests_per_second: Optional[float] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = 1.0 / requests_per_second if requests_per_second and requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._next_slot: dict[str, float] = {}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._semaphores[host]
+
+    def _wait_for_slot(self, host: str) -> None:
+        if self.min_interval <= 0:
+            return
+
+        # Reserve the next start time for this host, then sleep outside the lock:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.min_interval
+
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        """Context manager that blocks until a request to the host of the given URL is allowed.
+
+        Args:
+            url (str): The URL that is about to be requested.
+
+        Example:
+            with limiter.limit(url):
+                response = requests.get(url)
+        """
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._semaphore(host)
+        with semaphore:
+            self._wait_for_slot(host)
+            yield
+
+
+# Responses that mean the server is overloaded or temporarily unavailable, and that are worth retrying:
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+# Responses asking the client to slow down:
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the number of seconds to wait according to a `Retry-After` header (in seconds or as an HTTP date).
+
+    Args:
+        value (str, optional): The value of the header.
+
+    Returns:
+        float or None: The delay in seconds, or None if the header is missing or invalid.
+
+    Example:
+        >>> parse_retry_after("120")
+        120.0
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class _HostState:
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.retries = 0
+
+
+class AdaptiveController:
+    """Adapts the number of concurrent requests to each host and retries transient failures (AIMD).
+
+    Each host starts with `initial_concurrency` request slots. Every fast successful response adds about one slot
+    per round trip (additive increase, up to `max_concurrency`), while throttling responses (429, 503), transient
+    errors and responses slower than `slow_seconds` halve the slots (multiplicative decrease, down to one). Requests
+    that are legitimately slow (e.g. SPARQL queries) can be given their own threshold.
+
+    Throttled and transient failures (429, 502, 503, 504, connection errors and timeouts) are retried up to
+    `max_retries` times. The controller waits for the delay given by the `Retry-After` header if there is one, and
+    otherwise for an exponential backoff with jitter. The wait applies to every request to the host, not only the
+    retried one. The controller is thread-safe and its `metrics` can be read while requests are running.
+
+    Args:
+        initial_concurrency (int, optional): The initial number of concurrent requests per host. Defaults to 2.
+        max_concurrency (int, optional): The maximum number of concurrent requests per host. Defaults to 16.
+        max_retries (int, optional): The maximum number of retries of a request. Defaults to 5.
+        slow_seconds (float, optional): Responses slower than this are treated as congestion. Defaults to 10.
+        backoff_seconds (float, optional): The base delay of the exponential backoff. Defaults to 1.
+        max_backoff_seconds (float, optional): The maximum delay between two attempts. Defaults to 120.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int = 2,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        slow_seconds: float = 10.0,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 120.0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.initial_concurrency = min(max(1, initial_concurrency), self.max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.slow_seconds = slow_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._condition = threading.Condition()
+        self._hosts: dict[str, _HostState] = {}
+
+    def _acquire(self, host: str) -> _HostState:
+        with self._condition:
+            state = self._hosts.setdefault(host, _HostState(self.initial_concurrency))
+            while True:
+                wait = state.blocked_until - time.monotonic()
+                if wait <= 0 and state.in_flight < int(state.limit):
+                    state.in_flight += 1
+                    state.requests += 1
+                    return state
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def _release(self, state: _HostState, latency: Optional[float], congested: bool) -> None:
+        with self._condition:
+            # Only grow the window when it is actually used, so that an idle host does not accumulate slots:
+            saturated = state.in_flight >= int(state.limit)
+            state.in_flight -= 1
+            if latency is not None:
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            if congested:
+                state.limit = max(1.0, state.limit / 2)
+            elif saturated:
+                state.limit = min(float(self.max_concurrency), state.limit + 1 / state.limit)
+            self._condition.notify_all()
+
+    def _backoff(self, state: _HostState, attempt: int, retry_after: Optional[float]) -> None:
+        if retry_after is None:
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2**attempt)
+            delay = random.uniform(delay / 2, delay)
+        else:
+            delay = min(self.max_backoff_seconds, retry_after)
+        with self._condition:
+            state.retries += 1
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+        logging.info(f"Retrying request in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries}).")
+
+    def request(
+        self,
+        url: str,
+        send: Callable[[], requests.Response],
+        slow_seconds: Optional[float] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
+    ) -> requests.Response:
+        """Send a request through the controller, retrying throttled and transient failures.
+
+        Only the call to `send` is timed, so the time spent waiting for the rate limiter or for a request slot is not
+        mistaken for a slow response.
+
+        Args:
+            url (str): The requested URL (used to identify the host).
+            send (Callable[[], requests.Response]): A function sending the request. It is called once per attempt.
+            slow_seconds (float, optional): Responses slower than this are treated as congestion. Defaults to the
+                `slow_seconds` of the controller.
+            rate_limiter (HostRateLimiter, optional): A limiter each attempt waits for before taking a request slot.
+                Defaults to None.
+
+        Returns:
+            requests.Response: The response of the last attempt (which may still be an error response).
+
+        Raises:
+            requests.ConnectionError, requests.Timeout: If the last attempt failed with a transient error.
+        """
+        host = urlsplit(url).netloc.lower()
+        slow_seconds = slow_seconds if slow_seconds is not None else self.slow_seconds
+        attempt = 0
+        while True:
+            with rate_limiter.limit(url) if rate_limiter is not None else nullcontext():
+                state = self._acquire(host)
+                start = time.monotonic()
+                try:
+                    response = send()
+                except (requests.ConnectionError, requests.Timeout):
+                    self._release(state, None, congested=True)
+                    with self._condition:
+                        state.errors += 1
+                    if attempt >= self.max_retries:
+                        raise
+                    response = None
+                latency = time.monotonic() - start
+
+            if response is None:
+                self._backoff(state, attempt, None)
+                attempt += 1
+                continue
+
+            throttled = response.status_code in THROTTLE_STATUS_CODES
+            self._release(
+                state,
+                latency,
+                congested=response.status_code in RETRY_STATUS_CODES or latency > slow_seconds,
+            )
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            with self._condition:
+                if throttled:
+                    state.throttled += 1
+                else:
+                    state.errors += 1
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            response.close()
+            self._backoff(state, attempt, retry_after)
+            attempt += 1
+
+    def metrics(self) -> dict[str, dict]:
+        """Return a snapshot of the state of each host.
+
+        Returns:
+            dict[str, dict]: For each host, the current number of request slots (`concurrency`), the requests in
+                flight, the number of requests sent, throttled, failed and retried, and the moving average of the
+                response latency in seconds.
+        """
+        with self._condition:
+            return {
+                host: {
+                    "concurrency": int(state.limit),
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "throttled": state.throttled,
+                    "errors": state.errors,
+                    "retries": state.retries,
+                    "latency": round(state.latency, 3) if state.latency is not None else None,
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+_controller: Optional[AdaptiveController] = None
+_controller_lock = threading.Lock()
+
+
+def get_adaptive_controller() -> AdaptiveController:
+    """Return the adaptive controller shared by all the outbound requests of the process.
+
+    The controller is configured with the `CLIMAFACTSKG_HTTP_MAX_CONCURRENCY` (defaults to 16),
+    `CLIMAFACTSKG_HTTP_MAX_RETRIES` (defaults to 5) and `CLIMAFACTSKG_HTTP_SLOW_SECONDS` (defaults to 10)
+    environment variables.
+
+    Returns:
+        AdaptiveController: The shared controller.
+    """
+    global _controller
+
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdaptiveController(
+                max_concurrency=int(os.getenv("CLIMAFACTSKG_HTTP_MAX_CONCURRENCY", 16)),
+                max_retries=int(os.getenv("CLIMAFACTSKG_HTTP_MAX_RETRIES", 5)),
+                slow_seconds=float(os.getenv("CLIMAFACTSKG_HTTP_SLOW_SECONDS", 10)),
+            )
+        return _controller
@@ -1,38 +1,122 @@
 import hashlib
+import io
 import json
 import os
 import re
 import tempfile
+import threading
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, Optional
-from urllib.parse import urljoin
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+from urllib.parse import urlencode, urljoin, urlsplit, urlunsplit
 
 import bs4
 import pandas as pd
 import requests
-from SPARQLWrapper import JSON, SPARQLWrapper
+import requests.adapters
 
+from climafactskg.archives import get_recorder, get_replay_archive
+from climafactskg.throttling import get_adaptive_controller
 
-def query_sparqlendpoint(endpoint_url, query) -> pd.DataFrame:
+if TYPE_CHECKING:
+    from climafactskg.throttling import HostRateLimiter
+
+# Timeout in seconds for connecting to a server and for each read of a response:
+HTTP_TIMEOUT = float(os.getenv("CLIMAFACTSKG_HTTP_TIMEOUT", 60))
+# SPARQL queries are often slow without the endpoint being overloaded, so they are only treated as congestion by the
+# adaptive controller after this many seconds:
+SPARQL_SLOW_SECONDS = float(os.getenv("CLIMAFACTSKG_SPARQL_SLOW_SECONDS", 300))
+
+
+def query_sparqlendpoint(
+    endpoint_url,
+    query,
+    streaming: bool = False,
+    dtypes: Optional[dict[str, str]] = None,
+    cache_dir: str = os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()),
+    cache_expiry: timedelta = timedelta(
+        seconds=int(os.getenv("CLIMAFACTSKG_SPARQL_CACHE_EXPIRY", 3600))  # noqa: B008
+    ),  # noqa: B008
+) -> pd.DataFrame:
     """Executes a SPARQL query against a specified endpoint and returns the results as a pandas DataFrame.
 
+    Results are cached on disk as Parquet (see `QueryResultCache`) for `cache_expiry`, keyed by the endpoint URL, the
+    normalized query and the decoding options. The cache is bypassed while a WARC archive is recorded or replayed.
+
     Parameters:
         endpoint_url (str): The URL of the SPARQL endpoint to query.
         query (str): The SPARQL query string to execute.
+        streaming (bool, optional): Decode the results from CSV (see `iter_query_sparqlendpoint`) instead of loading
+            the full JSON response, which avoids a copy of the results as Python dictionaries. The results are still
+            returned as a single DataFrame: use `iter_query_sparqlendpoint` to keep the memory bounded. Defaults to
+            False.
+        dtypes (dict[str, str], optional): The types of some columns (e.g. `{"count": "Int64"}`). The other columns
+            are strings. Defaults to None.
+        cache_dir (str, optional): The cache directory (results are stored in its `sparql` subdirectory). Defaults
+            to the `CLIMAFACTSKG_CACHE_DIR` environment variable or the system temporary directory.
+        cache_expiry (timedelta, optional): How long results are cached. A zero duration disables the cache.
+            Defaults to the `CLIMAFACTSKG_SPARQL_CACHE_EXPIRY` environment variable (in seconds) or 1 hour.
 
     Returns:
         pandas.DataFrame: A DataFrame containing the query results, where each row corresponds to a result binding.
 
     Raises:
-        Any exceptions raised by SPARQLWrapper or pandas during query execution or DataFrame creation.
+        ValueError: If the endpoint does not return the results or the query is not in the replay archive.
+        requests.RequestException: If the request fails after all the retries of the adaptive controller.
 
     Example:
         df = query_sparqlendpoint("https://dbpedia.org/sparql", "SELECT ?s WHERE { ?s a dbo:Person } LIMIT 10")
     """
-    sparql = SPARQLWrapper(endpoint_url)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
+    from climafactskg.cache import get_query_cache
+
+    # Archives capture the actual responses, so the cache is only used outside of them:
+    cache = None
+    if cache_expiry > timedelta(0) and get_recorder() is None and get_replay_archive() is None:
+        cache = get_query_cache(cache_dir)
+        if (cached := cache.get(endpoint_url, query, cache_expiry, streaming=streaming, dtypes=dtypes)) is not None:
+            return cached
+
+    results = _query_sparqlendpoint(endpoint_url, query, streaming, dtypes)
+    if cache is not None:
+        cache.set(endpoint_url, query, results, streaming=streaming, dtypes=dtypes)
+    return results
+
+
+def _query_sparqlendpoint(
+    endpoint_url: str, query: str, streaming: bool, dtypes: Optional[dict[str, str]] = None
+) -> pd.DataFrame:
+    if streaming:
+        chunks = list(iter_query_sparqlendpoint(endpoint_url, query, dtypes=dtypes))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    # Queries are archived under their HTTP GET URL:
+    archive_url = f"{endpoint_url}?{urlencode({'query': query})}"
+
+    if (replay := get_replay_archive()) is not None:
+        archived = replay.get(archive_url)
+        if archived is None:
+            raise ValueError(f"SPARQL query to '{endpoint_url}' not found in the replay archive '{replay.path}'.")
+        results = json.loads(archived)
+    else:
+        response = get_adaptive_controller().request(
+            endpoint_url,
+            lambda: get_http_session().get(
+                endpoint_url,
+                params={"query": query},
+                headers={"Accept": "application/sparql-results+json"},
+                timeout=HTTP_TIMEOUT,
+            ),
+            slow_seconds=SPARQL_SLOW_SECONDS,
+        )
+        if response.status_code != 200:
+            raise ValueError(f"Failed to query SPARQL endpoint '{endpoint_url}'. Status code: {response.status_code}")
+        results = response.json()
+
+        if (recorder := get_recorder()) is not None:
+            recorder.record(
+                archive_url, json.dumps(results), headers={"Content-Type": "application/sparql-results+json"}
+            )
+
     rows = []
 
     if (
@@ -46,7 +130,84 @@ def query_sparqlendpoint(endpoint_url, query) -> pd.DataFrame:
         for result in results["results"]["bindings"]:
             row = {k: v["value"] for k, v in result.items()}
             rows.append(row)
-        return pd.DataFrame(rows)
+        df = pd.DataFrame(rows)
+        if dtypes:
+            df = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+        return df
+
+
+def iter_query_sparqlendpoint(
+    endpoint_url: str, query: str, chunksize: int = 10_000, dtypes: Optional[dict[str, str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Executes a SPARQL query and yields the results as DataFrames of at most `chunksize` rows.
+
+    The results are requested as SPARQL CSV and decoded straight from the HTTP response into typed columns (strings
+    unless `dtypes` says otherwise), one chunk at a time, so the memory used does not grow with the number of
+    results. Values are the lexical forms of the bindings, as with `query_sparqlendpoint`, and unbound variables are
+    missing values.
+
+    While a WARC archive is being recorded, the response is buffered to be archived. Queries are archived under
+    their HTTP GET URL with a `format=csv` parameter, so they do not collide with the JSON results of
+    `query_sparqlendpoint`.
+
+    Args:
+        endpoint_url (str): The URL of the SPARQL endpoint to query.
+        query (str): The SPARQL query string to execute.
+        chunksize (int, optional): The maximum number of rows per DataFrame. Defaults to 10000.
+        dtypes (dict[str, str], optional): The types of some columns, used by the CSV parser (e.g.
+            `{"count": "Int64"}`). The other columns are strings. Defaults to None.
+
+    Yields:
+        pd.DataFrame: The next chunk of results. A query without results yields a single empty DataFrame (or
+            nothing if the endpoint returned an empty body).
+
+    Raises:
+        ValueError: If the endpoint does not return the results or the query is not in the replay archive.
+    """
+    archive_url = f"{endpoint_url}?{urlencode({'query': query, 'format': 'csv'})}"
+    csv_options = {
+        "dtype": defaultdict(lambda: str, dtypes or {}),
+        "keep_default_na": False,
+        "na_values": [""],
+        "chunksize": chunksize,
+    }
+
+    if (replay := get_replay_archive()) is not None:
+        archived = replay.get(archive_url)
+        if archived is None:
+            raise ValueError(f"SPARQL query to '{endpoint_url}' not found in the replay archive '{replay.path}'.")
+        source = io.StringIO(archived)
+        response = None
+    else:
+        response = get_adaptive_controller().request(
+            endpoint_url,
+            lambda: get_http_session().get(
+                endpoint_url, params={"query": query}, headers={"Accept": "text/csv"}, stream=True, timeout=HTTP_TIMEOUT
+            ),
+            slow_seconds=SPARQL_SLOW_SECONDS,
+        )
+        if response.status_code != 200:
+            response.close()
+            raise ValueError(f"Failed to query SPARQL endpoint '{endpoint_url}'. Status code: {response.status_code}")
+
+        if (recorder := get_recorder()) is not None:
+            content = response.content.decode("utf-8")
+            recorder.record(archive_url, content, headers={"Content-Type": "text/csv; charset=utf-8"})
+            source = io.StringIO(content)
+        else:
+            # Keep the raw stream open until pandas has read the last chunk:
+            response.raw.decode_content = True
+            response.raw.auto_close = False
+            source = io.TextIOWrapper(response.raw, encoding="utf-8")
+
+    try:
+        with pd.read_csv(source, **csv_options) as reader:
+            yield from reader
+    except pd.errors.EmptyDataError:
+        return
+    finally:
+        if response is not None:
+            response.close()
 
 
 def remove_html_tags(text) -> str:
@@ -68,7 +229,9 @@ def remove_html_tags(text) -> str:
 
 
 def extract_hierarchy(ul_element: bs4.element.Tag, base_url: str = "") -> list[Dict]:
-    """Recursively extracts a hierarchical structure from a given <ul> HTML element.
+    """Extracts a hierarchical structure from a given <ul> HTML element.
+
+    The nested lists are walked iteratively, so deeply nested hierarchies do not hit the recursion limit.
 
     Args:
         ul_element (bs4.element.Tag): A BeautifulSoup Tag object representing a <ul> element.
@@ -76,74 +239,179 @@ def extract_hierarchy(ul_element: bs4.element.Tag, base_url: str = "") -> list[D
 
     Returns:
         list[Dict]: A list of dictionaries representing the hierarchy. Each dictionary contains:
-            - 'title' (str): The text of the link in the <li> element.
-            - 'url' (str): The absolute URL of the link.
+            - 'url' (str, optional): The absolute URL of the link in the <li> element.
             - 'subcategories' (list, optional): A list of subcategories if nested <ul> elements exist.
     """
-    hierarchy = []
-    for li in ul_element.find_all("li", recursive=False):
-        item = {}
-        # Extract the text and URL of the current <li>
-        if isinstance(li, bs4.element.Tag):
-            link = li.find("a")
-            if isinstance(link, bs4.element.Tag):
-                item["url"] = urljoin(base_url, str(link["href"]))
-            # Check if there is a nested <ul> and recursively extract it
-            nested_ul = li.find("ul")
-            if isinstance(nested_ul, bs4.element.Tag):
-                item["subcategories"] = extract_hierarchy(nested_ul, base_url)
-        hierarchy.append(item)
+    hierarchy: list[Dict] = []
+    # Lists still to walk, with the list of items their <li> elements are added to:
+    stack = [(ul_element, hierarchy)]
+    while stack:
+        ul, items = stack.pop()
+        for li in ul.find_all("li", recursive=False):
+            item: Dict = {}
+            # Extract the URL of the current <li>
+            if isinstance(li, bs4.element.Tag):
+                link = li.find("a")
+                if isinstance(link, bs4.element.Tag):
+                    item["url"] = urljoin(base_url, str(link["href"]))
+                # Check if there is a nested <ul> and walk it later
+                nested_ul = li.find("ul")
+                if isinstance(nested_ul, bs4.element.Tag):
+                    item["subcategories"] = []
+                    stack.append((nested_ul, item["subcategories"]))
+            items.append(item)
     return hierarchy
 
 
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Return the HTTP session shared by all the outbound requests of the process.
+
+    The session keeps connections alive between requests, so consecutive requests to the same host reuse the same
+    TCP/TLS connection. The connection pool size can be configured with the `CLIMAFACTSKG_HTTP_POOL_SIZE`
+    environment variable (defaults to 16 connections per host).
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _http_session
+
+    with _http_session_lock:
+        if _http_session is None:
+            pool_size = int(os.getenv("CLIMAFACTSKG_HTTP_POOL_SIZE", 16))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+
 def fetch_url_content(
     url: str,
     cache_dir: str = os.getenv("CLIMAFACTSKG_CACHE_DIR", tempfile.gettempdir()),
     cache_expiry: timedelta = timedelta(
         seconds=int(os.getenv("CLIMAFACTSKG_KG_CACHE_EXPIRY", 3600))  # noqa: B008
     ),  # noqa: B008
+    rate_limiter: Optional["HostRateLimiter"] = None,
 ) -> str:
     """Fetch the content of a URL using a disk cache. Cache expires after a given period.
 
+    The cache backend is selected with the `CLIMAFACTSKG_CACHE_BACKEND` environment variable (see `get_page_cache`).
+    When a WARC archive is being recorded, every returned page is added to it. When a WARC archive is being
+    replayed, pages are served from the archive only (see `climafactskg.archives`).
+
+    Expired cache entries are revalidated with a conditional request (`If-None-Match` / `If-Modified-Since`) when
+    the server provided an `ETag` or a `Last-Modified` header, so unchanged pages are not downloaded again.
+
+    Network requests go through the shared adaptive controller (see `get_adaptive_controller`), which adapts the
+    number of concurrent requests to each host and retries throttled (429, 503) and transient failures.
+
     Args:
         url (str): The URL to fetch.
         cache_dir (str, optional): The directory to store the cache. Defaults to an environment variable or the system temporary directory.
         cache_expiry (timedelta, optional): The cache expiry duration in seconds. Defaults to an environment variable or 1 hour.
+        rate_limiter (HostRateLimiter, optional): A limiter applied to network requests only (cache hits are not limited).
 
     Returns:
         str: The content of the URL.
 
     Raises:
-        requests.RequestException: If the request fails.
+        ValueError: If the server does not return the page after all the retries.
+        requests.RequestException: If the request fails after all the retries.
     """  # noqa: E501
-    # Ensure the cache directory exists
-    os.makedirs(cache_dir, exist_ok=True)
+    from climafactskg.cache import get_page_cache
+
+    # Serve the page strictly from the replay archive if one is active (no cache, no network):
+    if (replay := get_replay_archive()) is not None:
+        archived = replay.get(url)
+        if archived is None:
+            raise ValueError(f"Failed to fetch URL content for '{url}'. URL not found in the replay archive.")
+        return archived
 
-    # Create a unique cache key based on the URL
-    cache_key = hash_string(url)
-    cache_path = os.path.join(cache_dir, f"{cache_key}.json")
+    recorder = get_recorder()
+    cache = get_page_cache(cache_dir)
 
     # Check if the cache exists and is still valid
-    if os.path.exists(cache_path):
-        with open(cache_path, "r", encoding="utf-8") as cache_file:
-            cached_data = json.load(cache_file)
-            if datetime.fromisoformat(cached_data["timestamp"]) > datetime.now() - cache_expiry:
-                return cached_data["content"]
+    cached_data = cache.get(url)
+    if cached_data is not None and cached_data["timestamp"] > datetime.now() - cache_expiry:
+        if recorder is not None:
+            recorder.record(url, cached_data["content"])
+        return cached_data["content"]
+
+    # Revalidate the expired entry instead of downloading the page again:
+    headers = {}
+    if cached_data is not None:
+        if cached_data.get("etag"):
+            headers["If-None-Match"] = cached_data["etag"]
+        if cached_data.get("last_modified"):
+            headers["If-Modified-Since"] = cached_data["last_modified"]
 
     # Fetch the content from the URL
-    response = requests.get(url)
-    if response.status_code != 200:
+    session = get_http_session()
+
+    response = get_adaptive_controller().request(
+        url, lambda: session.get(url, headers=headers, timeout=HTTP_TIMEOUT), rate_limiter=rate_limiter
+    )
+
+    if response.status_code == 304 and cached_data is not None:
+        content = cached_data["content"]
+        etag = response.headers.get("ETag", cached_data.get("etag"))
+        last_modified = response.headers.get("Last-Modified", cached_data.get("last_modified"))
+    elif response.status_code == 200:
+        content = response.text
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+    else:
         raise ValueError(f"Failed to fetch URL content for '{url}'. Status code: {response.status_code}")
 
-    content = response.text
-
     # Store the content in the cache
-    with open(cache_path, "w", encoding="utf-8") as cache_file:
-        json.dump({"content": content, "timestamp": datetime.now().isoformat()}, cache_file)
+    cache.set(
+        url,
+        {
+            "content": content,
+            "timestamp": datetime.now(),
+            "etag": etag,
+            "last_modified": last_modified,
+        },
+    )
+
+    if recorder is not None:
+        recorder.record(
+            url,
+            content,
+            headers={name: value for name, value in (("ETag", etag), ("Last-Modified", last_modified)) if value},
+        )
 
     return content
 
 
+def normalize_url(url: str) -> str:
+    """Return the canonical form of a URL, used to detect URLs pointing to the same page.
+
+    The scheme and host are lowercased, default ports and fragments are removed and an empty path becomes "/".
+
+    Args:
+        url (str): The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+
+    Example:
+        >>> normalize_url("HTTPS://SkepticalScience.com:443/global-cooling.htm#comments")
+        'https://skepticalscience.com/global-cooling.htm'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80) and not (scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
 def hash_string(s: str) -> str:
     """Generate an MD5 hash for the given string.
 
@@ -0,0 +1,107 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import uvicorn
+from climafactskg.endpoints import rdf_to_sparql_enpoint
+from rdflib import RDF, XSD, Graph, Literal, Namespace, URIRef
+
+SCHEMA = Namespace("http://schema.org/")
+# Number of claims served by the `endpoint` fixture:
+CLAIMS = 25
+
+
+def _synthetic_cimplekg(path: str) -> None:
+    graph = Graph()
+    for i in range(CLAIMS):
+        review = URIRef(f"http://data.cimple.eu/claim-review/{i:04d}")
+        claim = URIRef(f"http://data.cimple.eu/claim/{i:04d}")
+        graph.add((review, RDF.type, SCHEMA.ClaimReview))
+        graph.add((review, SCHEMA.inLanguage, Literal("English")))
+        # Two reviews per day, so that pages end in the middle of a day:
+        graph.add((review, SCHEMA.datePublished, Literal(f"2024-01-{i // 2 + 1:02d}", datatype=XSD.date)))
+        graph.add((review, SCHEMA.itemReviewed, claim))
+        graph.add((claim, SCHEMA.text, Literal(f'Claim "{i}"')))
+    graph.serialize(path, format="ttl")
+
+
+@pytest.fixture(scope="session")
+def endpoint(tmp_path_factory):
+    """Serve a synthetic CimpleKG with `rdflib_endpoint` on a local port."""
+    path = str(tmp_path_factory.mktemp("cimplekg") / "cimplekg.ttl")
+    _synthetic_cimplekg(path)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(rdf_to_sparql_enpoint(path, format="ttl"), host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("The local SPARQL endpoint did not start.")
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}/"
+
+    server.should_exit = True
+    thread.join(timeout=10)
+
+
+class WebServer:
+    """A local web server serving `pages` (path to body and headers), with `ETag` and `Last-Modified` revalidation."""
+
+    def __init__(self):
+        self.pages: dict[str, tuple[str, dict]] = {}
+        # The path and the conditional headers of each request:
+        self.requests: list[tuple[str, dict]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                conditional = {name: self.headers[name] for name in ("If-None-Match", "If-Modified-Since")}
+                server.requests.append((self.path, {name: value for name, value in conditional.items() if value}))
+                if self.path not in server.pages:
+                    self.send_error(404)
+                    return
+
+                body, headers = server.pages[self.path]
+                not_modified = ("ETag" in headers and headers["ETag"] == conditional["If-None-Match"]) or (
+                    "Last-Modified" in headers and headers["Last-Modified"] == conditional["If-Modified-Since"]
+                )
+                status = 304 if not_modified else 200
+                data = body.encode("utf-8") if status == 200 else b""
+                self.send_response(status)
+                for name, value in {"Content-Type": "text/html; charset=utf-8", **headers}.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+
+@pytest.fixture
+def web_server():
+    """Serve pages from a local web server, which records the requests it receives."""
+    server = WebServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.httpd.shutdown()
+    server.httpd.server_close()
+    thread.join(timeout=10)
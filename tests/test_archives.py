@@ -0,0 +1,122 @@
+import zlib
+
+import pytest
+from climafactskg.archives import WARCArchive, WARCWriter, start_recording, start_replay, stop_archives
+from climafactskg.utils import fetch_url_content, query_sparqlendpoint
+
+QUERY = """
+PREFIX schema: <http://schema.org/>
+SELECT ?rev ?date_published
+WHERE { ?rev a schema:ClaimReview; schema:datePublished ?date_published }
+ORDER BY ?rev
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_archives(monkeypatch):
+    monkeypatch.delenv("CLIMAFACTSKG_WARC_RECORD", raising=False)
+    monkeypatch.delenv("CLIMAFACTSKG_WARC_REPLAY", raising=False)
+    stop_archives()
+    yield
+    stop_archives()
+
+
+@pytest.mark.parametrize("name", ["pages.warc", "pages.warc.gz"])
+def test_warc_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    writer = WARCWriter(path)
+    writer.record("https://example.org/a", "<p>Page A</p>", headers={"ETag": '"a"'})
+    writer.record("https://example.org/b", "<p>Page B</p>", status=404)
+    # Each URL is only recorded once per writer:
+    writer.record("https://example.org/a", "<p>Page A again</p>")
+    # A new writer appends to the archive, and the last record wins:
+    WARCWriter(path).record("https://example.org/b", "<p>Page B, updated</p>")
+
+    archive = WARCArchive(path)
+
+    assert sorted(archive.urls()) == ["https://example.org/a", "https://example.org/b"]
+    assert archive.get("https://example.org/a") == "<p>Page A</p>"
+    assert archive.get("https://example.org/b") == "<p>Page B, updated</p>"
+    assert archive.get("https://example.org/c") is None
+    assert "https://example.org/a" in archive and len(archive) == 2
+
+    if name.endswith(".gz"):
+        # One gzip member per record (warcinfo and 3 responses):
+        with open(path, "rb") as f:
+            data = f.read()
+        members = 0
+        while data:
+            decompressor = zlib.decompressobj(wbits=31)
+            assert decompressor.decompress(data).startswith(b"WARC/1.0\r\n")
+            data = decompressor.unused_data
+            members += 1
+        assert members == 4
+    else:
+        with open(path, "rb") as f:
+            assert f.read().count(b"\r\nWARC-Type: ") == 4
+
+
+def test_warc_non_ascii_uris_and_content(tmp_path):
+    path = str(tmp_path / "pages.warc.gz")
+    url = "https://example.org/réchauffement?q=température&lang=ελληνικά"
+    WARCWriter(path).record(url, "<p>L’été le plus chaud — 🌡️</p>")
+
+    archive = WARCArchive(path)
+
+    assert archive.urls() == [url]
+    assert archive.get(url) == "<p>L’été le plus chaud — 🌡️</p>"
+
+
+def test_warc_invalid_archive(tmp_path):
+    path = tmp_path / "pages.warc"
+    path.write_text("<html></html>")
+
+    with pytest.raises(ValueError):
+        WARCArchive(str(path))
+
+
+def test_fetch_url_content_replays_the_recorded_pages(tmp_path, web_server):
+    web_server.pages["/a"] = ("<p>Page A</p>", {"ETag": '"a"'})
+    # The non-ASCII path is percent-encoded on the wire, but archived as requested:
+    web_server.pages["/caf%C3%A9"] = ("<p>Café</p>", {})
+    urls = [web_server.url("/a"), web_server.url("/café")]
+    path = str(tmp_path / "pages.warc.gz")
+
+    start_recording(path)
+    assert [fetch_url_content(url, cache_dir=str(tmp_path / "cache")) for url in urls] == [
+        "<p>Page A</p>",
+        "<p>Café</p>",
+    ]
+    # Cache hits are recorded too:
+    assert fetch_url_content(urls[0], cache_dir=str(tmp_path / "cache")) == "<p>Page A</p>"
+    stop_archives()
+    assert len(web_server.requests) == 2
+
+    archive = start_replay(path)
+    assert sorted(archive.urls()) == sorted(urls)
+    # Pages are served from the archive only, without cache or network:
+    assert [fetch_url_content(url, cache_dir=str(tmp_path / "empty")) for url in urls] == [
+        "<p>Page A</p>",
+        "<p>Café</p>",
+    ]
+    assert len(web_server.requests) == 2
+    with pytest.raises(ValueError):
+        fetch_url_content(web_server.url("/missing"), cache_dir=str(tmp_path / "empty"))
+    assert len(web_server.requests) == 2
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_query_sparqlendpoint_replays_the_recorded_queries(tmp_path, endpoint, streaming):
+    path = str(tmp_path / "queries.warc")
+
+    start_recording(path)
+    recorded = query_sparqlendpoint(endpoint, QUERY, streaming=streaming, cache_dir=str(tmp_path))
+    stop_archives()
+
+    start_replay(path)
+    replayed = query_sparqlendpoint(endpoint, QUERY, streaming=streaming, cache_dir=str(tmp_path))
+    assert len(replayed) == 25
+    assert replayed.equals(recorded)
+    # The archive is the only source of the results:
+    with pytest.raises(ValueError):
+        query_sparqlendpoint(endpoint, QUERY + "LIMIT 10", streaming=streaming, cache_dir=str(tmp_path))
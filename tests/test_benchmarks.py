@@ -0,0 +1,22 @@
+import pytest
+from climafactskg import benchmarks
+from climafactskg.benchmarks import CORPUS_DIR, benchmark_parser, check_golden, load_corpus
+
+
+@pytest.mark.parametrize("scoped", [True, False])
+def test_corpus_matches_golden_output(scoped):
+    assert check_golden(CORPUS_DIR, parser="html.parser", scoped=scoped) == []
+
+
+def test_benchmark_reports_allocations():
+    result = benchmark_parser(load_corpus(), "html.parser", repeat=1)
+
+    assert result["pages"] == len(load_corpus())
+    assert result["retained_blocks"] > 0
+    assert 0 < len(result["top_allocations"]) <= 5
+
+
+def test_missing_parser_backends_are_skipped(monkeypatch):
+    monkeypatch.setattr(benchmarks, "DEFAULT_PARSERS", ("html.parser", "not-installed"))
+
+    assert [result["parser"] for result in benchmarks.run_benchmarks(repeat=1)] == ["html.parser"]
@@ -0,0 +1,84 @@
+import os
+
+import climafactskg.builders.climafactskg as climafactskg_builder
+import pytest
+import requests
+from climafactskg.benchmarks import CORPUS_DIR
+from climafactskg.builders.climafactskg import generate_climafactskg_base
+from climafactskg.parsers.skepticalscience import TaxonomyIndex, parse_taxonomy
+from climafactskg.utils import hash_string
+from rdflib import RDF, SDO, SKOS, Literal, Namespace
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+
+BASE_URL = "https://skepticalscience.com/argument.php?f=taxonomy"
+NS = Namespace("https://purl.net/climafactskg/ns#")
+
+
+def _category(code: str):
+    return NS[f"category_{hash_string(f'https://skepticalscience.com/argument.php?c={code}')}"]
+
+
+def test_articles_are_linked_to_their_taxonomy_category():
+    with open(os.path.join(CORPUS_DIR, "taxonomy.htm"), encoding="utf-8") as f:
+        taxonomy = TaxonomyIndex(parse_taxonomy(BASE_URL, f.read()), base_url=BASE_URL)
+
+    url = "https://skepticalscience.com/myth-1-0-1.htm"
+    db = TinyDB(storage=MemoryStorage)
+    db.insert(
+        {
+            "url": url,
+            "main_url": url,
+            "lang": "en",
+            "level": None,
+            "title": "Myth",
+            "what_the_science_says": "Science",
+            "content": "Content",
+            "languages": [],
+            "climate_myth": "Myth",
+        }
+    )
+
+    g = generate_climafactskg_base(db, taxonomy=taxonomy)
+
+    category = _category("1.0")
+    assert (NS[f"claimreview_{hash_string(url)}"], SDO.about, category) in g
+    assert (category, SDO.url, Literal("https://skepticalscience.com/argument.php?c=1.0", datatype=SDO.URL)) in g
+    # The 5 top-level categories and their 4 subcategories each are concepts:
+    codes = [f"{i}" for i in range(1, 6)] + [f"{i}.{j}" for i in range(1, 6) for j in range(4)]
+    assert set(g.subjects(RDF.type, SKOS.Concept)) == {_category(code) for code in codes}
+    # Each subcategory is narrower than its top-level category:
+    assert set(g.subject_objects(SKOS.broader)) == {
+        (_category(f"{i}.{j}"), _category(f"{i}")) for i in range(1, 6) for j in range(4)
+    }
+
+
+@pytest.mark.parametrize("error", [requests.ConnectionError("Offline"), ValueError("No taxonomy in the page")])
+def test_build_leaves_out_a_taxonomy_that_cannot_be_loaded(tmp_path, monkeypatch, caplog, error):
+    def load_taxonomy(url):
+        raise error
+
+    monkeypatch.setattr(climafactskg_builder, "load_taxonomy", load_taxonomy)
+    cards_ttl = tmp_path / "cards.ttl"
+    cards_ttl.write_text("")
+
+    g = climafactskg_builder.build_climafactskg(
+        climafactskg_db=str(tmp_path / "arguments.json"),
+        cards_ttl=str(cards_ttl),
+        cimplekg_db=str(tmp_path / "claims.json"),
+    )
+
+    assert not set(g.subjects(RDF.type, SKOS.Concept))
+    assert str(error) in caplog.text
+
+
+def test_build_fails_on_unexpected_taxonomy_errors(tmp_path, monkeypatch):
+    def load_taxonomy(url):
+        raise TypeError("Bug in the parser")
+
+    monkeypatch.setattr(climafactskg_builder, "load_taxonomy", load_taxonomy)
+
+    with pytest.raises(TypeError):
+        climafactskg_builder.build_climafactskg(
+            climafactskg_db=str(tmp_path / "arguments.json"), cimplekg_db=str(tmp_path / "claims.json")
+        )
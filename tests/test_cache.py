@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import climafactskg.cache as cache_module
+import pandas as pd
+import pytest
+from climafactskg.cache import (
+    SQLITE_CACHE_FILENAME,
+    DirectoryPageCache,
+    PageCache,
+    QueryResultCache,
+    SQLitePageCache,
+    get_page_cache,
+    migrate_page_cache,
+    normalize_query,
+)
+from climafactskg.utils import hash_string
+
+
+def _entry(content: str, **headers) -> dict:
+    return {"content": content, "timestamp": datetime(2024, 1, 1), **headers}
+
+
+@pytest.fixture(autouse=True)
+def cache_settings(monkeypatch):
+    monkeypatch.delenv("CLIMAFACTSKG_CACHE_BACKEND", raising=False)
+    monkeypatch.delenv("CLIMAFACTSKG_CACHE_MAX_BYTES", raising=False)
+    get_page_cache.cache_clear()
+    yield
+    get_page_cache.cache_clear()
+
+
+def test_page_cache_is_abstract():
+    with pytest.raises(TypeError):
+        PageCache()
+
+
+def test_default_sqlite_cache_migrates_the_directory_cache(tmp_path):
+    legacy = DirectoryPageCache(str(tmp_path))
+    legacy.set("https://example.org/a", _entry("Page A", etag='"a"'))
+    legacy.set("https://example.org/b", _entry("Page B", last_modified="Mon, 01 Jan 2024 00:00:00 GMT"))
+
+    cache = get_page_cache(str(tmp_path))
+
+    assert isinstance(cache, SQLitePageCache)
+    assert cache.get("https://example.org/a") == _entry("Page A", etag='"a"', last_modified=None)
+    assert cache.get("https://example.org/b")["last_modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    # The JSON files are kept:
+    assert sorted(legacy.keys()) == sorted(cache.keys())
+
+
+def test_existing_or_explicit_sqlite_cache_is_not_migrated(tmp_path):
+    SQLitePageCache(str(tmp_path / SQLITE_CACHE_FILENAME)).close()
+    DirectoryPageCache(str(tmp_path)).set("https://example.org/a", _entry("Page A"))
+    assert get_page_cache(str(tmp_path)).get("https://example.org/a") is None
+
+    other = tmp_path / "other"
+    DirectoryPageCache(str(other)).set("https://example.org/a", _entry("Page A"))
+    assert get_page_cache(str(other), backend="sqlite").get("https://example.org/a") is None
+
+
+def test_migrate_page_cache_skips_unreadable_entries(tmp_path):
+    source = DirectoryPageCache(str(tmp_path / "pages"))
+    source.set("https://example.org/a", _entry("Page A"))
+    source.set("https://example.org/b", _entry("Page B"))
+    # A truncated file:
+    with open(os.path.join(source.cache_dir, f"{hash_string('https://example.org/c')}.json"), "w") as f:
+        f.write('{"content": "Page')
+    target = SQLitePageCache(str(tmp_path / "pages.sqlite"))
+
+    assert migrate_page_cache(source, target, remove=True) == 2
+    assert target.get("https://example.org/a")["content"] == "Page A"
+    assert target.get("https://example.org/b")["content"] == "Page B"
+    # Only the migrated entries are removed:
+    assert list(source.keys()) == [hash_string("https://example.org/c")]
+
+
+def test_sqlite_cache_evicts_the_least_recently_used_pages(tmp_path):
+    # Without compression, each page takes about 1 kB:
+    pages = {f"https://example.org/{i}": os.urandom(512).hex() for i in range(5)}
+    cache = SQLitePageCache(str(tmp_path / "pages.sqlite"), compression_level=0, max_bytes=3500)
+    for url, content in pages.items():
+        cache.set(url, _entry(content))
+        if url != "https://example.org/0":
+            # Keep the first page in use:
+            assert cache.get("https://example.org/0") is not None
+
+    remaining = [url for url in pages if cache.get(url) is not None]
+    assert remaining == ["https://example.org/0", "https://example.org/3", "https://example.org/4"]
+    assert cache.stats()["size_bytes"] <= 3500 * 0.9
+    assert cache.stats()["size_bytes"] == sum(size for _, size, _, _ in cache.usage())
+
+
+def test_sqlite_cache_hits_are_written_in_batches_before_an_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "ACCESS_FLUSH_SIZE", 2)
+    path = str(tmp_path / "pages.sqlite")
+    cache = SQLitePageCache(path, compression_level=0, max_bytes=2500)
+    cache.set("https://example.org/0", _entry("0" * 1000))
+    cache.set("https://example.org/1", _entry("1" * 1000))
+
+    def last_access() -> dict[str, float]:
+        with sqlite3.connect(path) as conn:
+            return dict(conn.execute("SELECT url, last_access FROM pages"))
+
+    written = last_access()
+    assert cache.get("https://example.org/0") is not None
+    # A single hit is not written:
+    assert last_access() == written
+
+    # The pending hit is written before the least recently used page is chosen:
+    cache.set("https://example.org/2", _entry("2" * 1000))
+    assert last_access()["https://example.org/0"] > written["https://example.org/1"]
+    assert cache.get("https://example.org/1") is None
+
+    # The hits are written once a batch is full:
+    written = last_access()
+    assert cache.get("https://example.org/0") is not None
+    assert last_access() == written
+    assert cache.get("https://example.org/2") is not None
+    assert last_access()["https://example.org/0"] > written["https://example.org/0"]
+    assert last_access()["https://example.org/2"] > written["https://example.org/2"]
+
+
+def test_directory_cache_size_is_scanned_again_after_a_prune(tmp_path):
+    cache = DirectoryPageCache(str(tmp_path), max_bytes=10_000)
+    for i in range(3):
+        cache.set(f"https://example.org/{i}", _entry(str(i) * 1000))
+    assert cache._total_size == sum(size for _, size, _, _ in cache.usage())
+
+    assert cache.prune(max_bytes=2500) == 1
+    assert cache._total_size is None
+
+    # Another process adds a page to the shared directory:
+    DirectoryPageCache(str(tmp_path)).set("https://example.org/other", _entry("x" * 1000))
+    cache.set("https://example.org/3", _entry("3" * 1000))
+    assert cache._total_size == sum(size for _, size, _, _ in cache.usage())
+
+    cache.delete("https://example.org/3")
+    assert cache._total_size == sum(size for _, size, _, _ in cache.usage())
+
+
+def test_normalize_query_keeps_the_string_literals():
+    assert normalize_query('SELECT ?s\n  WHERE {\t?s ?p "a  b" }  ') == 'SELECT ?s WHERE { ?s ?p "a  b" }'
+    assert normalize_query("SELECT ?s WHERE { ?s ?p 'it\\'s  here' }") == "SELECT ?s WHERE { ?s ?p 'it\\'s  here' }"
+
+
+def test_query_cache_key(tmp_path):
+    cache = QueryResultCache(str(tmp_path))
+    results = pd.DataFrame({"s": ["a", "b"], "count": pd.array([1, None], dtype="Int64")})
+    cache.set("http://example.org/sparql", 'SELECT ?s WHERE { ?s ?p "x  y" }', results)
+
+    def get(endpoint="http://example.org/sparql", query='SELECT ?s WHERE { ?s ?p "x  y" }', **options):
+        return cache.get(endpoint, query, timedelta(hours=1), **options)
+
+    assert get().equals(results)
+    assert str(get()["count"].dtype) == "Int64"
+    # Queries differing only by their layout share an entry:
+    assert get(query='SELECT ?s\n  WHERE {\n    ?s ?p "x  y"\n  }\n').equals(results)
+    # But not by their literals, endpoint or decoding options:
+    assert get(query='SELECT ?s WHERE { ?s ?p "x y" }') is None
+    assert get(endpoint="http://example.org/other") is None
+    assert get(streaming=True) is None
+    assert get(dtypes={"count": "Int64"}) is None
+    # Options left to their default do not change the key:
+    assert get(streaming=False, dtypes=None).equals(results)
+
+
+def test_query_cache_expiry(tmp_path):
+    cache = QueryResultCache(str(tmp_path))
+    cache.set("http://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }", pd.DataFrame({"s": ["a"]}))
+    cache.set("http://example.org/sparql", "SELECT ?o WHERE { ?s ?p ?o }", pd.DataFrame({"o": ["b"]}))
+    # The first results were cached two hours ago:
+    path = cache._path("http://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }")
+    two_hours_ago = time.time() - 2 * 3600
+    os.utime(path, (two_hours_ago, two_hours_ago))
+
+    assert cache.get("http://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }", timedelta(hours=3)) is not None
+    assert cache.get("http://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }", timedelta(hours=1)) is None
+    assert cache.get("http://example.org/sparql", "SELECT ?o WHERE { ?s ?p ?o }", timedelta(hours=1)) is not None
+
+    assert cache.prune(timedelta(hours=1)) == 1
+    assert not os.path.exists(path)
+    assert cache.get("http://example.org/sparql", "SELECT ?o WHERE { ?s ?p ?o }", timedelta(hours=1)) is not None
+
+
+def test_query_cache_ignores_unreadable_entries(tmp_path):
+    cache = QueryResultCache(str(tmp_path))
+    with open(cache._path("http://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }"), "wb") as f:
+        f.write(b"PAR1 truncated")
+
+    assert cache.get("http://example.org/sparql", "SELECT ?s WHERE { ?s ?p ?o }", timedelta(hours=1)) is None
@@ -0,0 +1,99 @@
+import os
+from datetime import timedelta
+from functools import partial
+
+import climafactskg.collectors.cimplekg as cimplekg
+import pytest
+from climafactskg.storage import open_database
+from climafactskg.utils import query_sparqlendpoint
+from conftest import CLAIMS
+
+
+@pytest.fixture(autouse=True)
+def no_query_cache(monkeypatch):
+    # Every query goes to the endpoint, so the tests see the pagination:
+    monkeypatch.setattr(cimplekg, "query_sparqlendpoint", partial(query_sparqlendpoint, cache_expiry=timedelta(0)))
+
+
+def _reviews(pages) -> list[str]:
+    return [rev for page in pages for rev in page["rev"]]
+
+
+def test_iter_claims_pages(endpoint):
+    pages = list(cimplekg.iter_claims(endpoint, page_size=10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    reviews = _reviews(pages)
+    assert reviews == sorted(reviews)
+    assert len(set(reviews)) == CLAIMS
+
+
+def test_iter_claims_resumes_from_checkpoint(endpoint, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    first = _reviews(cimplekg.iter_claims(endpoint, page_size=10, checkpoint_file=checkpoint, max_pages=2))
+    assert len(first) == 20
+    assert cimplekg._load_state(checkpoint)["rev"] == first[-1]
+
+    rest = _reviews(cimplekg.iter_claims(endpoint, page_size=10, checkpoint_file=checkpoint))
+    assert len(rest) == CLAIMS - 20
+    assert not set(first) & set(rest)
+    assert not os.path.exists(checkpoint)
+
+
+def test_fetch_claims_returns_the_newest_claims(endpoint):
+    claims = cimplekg.fetch_claims(endpoint, page_size=10)
+    assert list(claims["rev"]) == [f"http://data.cimple.eu/claim-review/{i:04d}" for i in range(CLAIMS - 1, 14, -1)]
+
+    reviews = list(cimplekg.fetch_claims(endpoint, page_size=10, max_pages=None)["rev"])
+    assert reviews == sorted(reviews, reverse=True)
+    assert len(set(reviews)) == CLAIMS
+
+
+def test_iter_claims_newest_first_rejects_a_watermark(tmp_path):
+    with pytest.raises(ValueError):
+        next(cimplekg.iter_claims(watermark_file=str(tmp_path / "watermark.json"), newest_first=True))
+
+
+def test_iter_claims_incremental_sync(endpoint, tmp_path):
+    watermark = str(tmp_path / "watermark.json")
+
+    assert len(_reviews(cimplekg.iter_claims(endpoint, page_size=10, watermark_file=watermark))) == CLAIMS
+    assert cimplekg._load_state(watermark)["watermark"] == "2024-01-13"
+
+    # Only the reviews published since the watermark minus the overlap window are requested again:
+    reviews = _reviews(
+        cimplekg.iter_claims(endpoint, page_size=10, watermark_file=watermark, overlap=timedelta(days=1))
+    )
+    assert reviews == [f"http://data.cimple.eu/claim-review/{i:04d}" for i in range(22, CLAIMS)]
+
+
+def test_iter_claims_full_sync_updates_watermark(endpoint, tmp_path):
+    watermark = str(tmp_path / "watermark.json")
+    cimplekg._save_state(watermark, {"watermark": "2024-01-05"})
+
+    reviews = _reviews(cimplekg.iter_claims(endpoint, page_size=10, watermark_file=watermark, full_sync=True))
+    assert len(reviews) == CLAIMS
+    assert cimplekg._load_state(watermark)["watermark"] == "2024-01-13"
+
+
+def test_iter_claims_checkpoint_follows_batched_writes(endpoint, tmp_path):
+    path = str(tmp_path / "claims.json")
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    db = open_database(path, table="mappings", batch_size=1000, flush_seconds=float("inf"))
+    for i, page in enumerate(
+        cimplekg.iter_claims(endpoint, page_size=5, checkpoint_file=checkpoint, flush=db.storage.flush)
+    ):
+        cimplekg.process_claims(db, page)
+        if i == 2:
+            # Crash after storing the third page, before it is checkpointed (the database is not closed):
+            break
+    assert cimplekg._load_state(checkpoint)["rev"] == "http://data.cimple.eu/claim-review/0009"
+
+    with open_database(path, table="mappings", batch_size=1000) as db:
+        for page in cimplekg.iter_claims(endpoint, page_size=5, checkpoint_file=checkpoint, flush=db.storage.flush):
+            cimplekg.process_claims(db, page)
+
+    with open_database(path, table="mappings") as db:
+        assert len(db) == CLAIMS
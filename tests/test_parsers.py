@@ -0,0 +1,38 @@
+import os
+
+import climafactskg.parsers.skepticalscience as skepticalscience
+import pytest
+from climafactskg.benchmarks import CORPUS_DIR
+from climafactskg.parsers.skepticalscience import parse_main_article
+
+URL = "https://skepticalscience.com/solar-activity-sunspots-global-warming.htm"
+
+
+def test_scoped_parse_falls_back_to_the_whole_page():
+    with open(os.path.join(CORPUS_DIR, "basic-myth-with-source.htm"), encoding="utf-8") as f:
+        html = f.read()
+
+    # Move the "Last updated" box out of the content regions:
+    lines = html.splitlines(keepends=True)
+    box = next(line for line in lines if "Last updated on" in line)
+    html = "".join(line for line in lines if line is not box).replace("</body>", box + "</body>")
+
+    article = parse_main_article(URL, html, scoped=True)
+
+    assert article["author"] == "John Mason"
+    assert article == parse_main_article(URL, html, scoped=False)
+
+
+@pytest.mark.parametrize("name", ["basic-myth-with-source.htm", "rebuttal-not-found.htm", "no-levels-legacy.htm"])
+def test_scoped_parse_extracts_the_article_once(monkeypatch, name):
+    # Legacy pages (without a heading) would fall back to a full parse, so they skip the scoped parse:
+    with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+        html = f.read()
+    calls = []
+    extract = skepticalscience._extract_main_article
+    monkeypatch.setattr(skepticalscience, "_extract_main_article", lambda *args: calls.append(args) or extract(*args))
+
+    article = parse_main_article(URL, html, scoped=True)
+
+    assert len(calls) == 1
+    assert article == parse_main_article(URL, html, scoped=False)
@@ -0,0 +1,315 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import climafactskg.collectors.skepticalscience as skepticalscience
+import pytest
+from climafactskg.benchmarks import CORPUS_DIR
+from climafactskg.cache import ParseResultStore
+from climafactskg.parsers.skepticalscience import parse_main_article, parse_translated_article, parser_fingerprint
+from climafactskg.storage import open_database
+from tinydb import Query
+
+URL = "https://skepticalscience.com/solar-activity-sunspots-global-warming.htm"
+FRENCH_URL = "https://skepticalscience.com/solar-activity-sunspots-global-warming-fr.htm"
+
+
+def _page(name: str) -> str:
+    with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# The pages served by the `site` fixture, by URL path:
+SITE = {
+    "solar-activity-sunspots-global-warming.htm": "basic-myth-with-source.htm",
+    "solar-activity-sunspots-global-warming-basic.htm": "basic-myth-with-source.htm",
+    "solar-activity-sunspots-global-warming-intermediate.htm": "intermediate-at-a-glance.htm",
+    "solar-activity-sunspots-global-warming-intermediate-intermediate.htm": "intermediate-at-a-glance.htm",
+    "solar-activity-sunspots-global-warming-advanced.htm": "advanced-plain-comment.htm",
+    "solar-activity-sunspots-global-warming-fr.htm": "translation-french.htm",
+    "solar-activity-sunspots-global-warming-de.htm": "translation-german-footnote.htm",
+    "solar-activity-sunspots-global-warming-it.htm": "translation-french.htm",
+    "solar-activity-sunspots-global-warming-es.htm": "translation-french.htm",
+    "ice-age-predicted-in-70s.htm": "no-levels-legacy.htm",
+}
+LEGACY_URL = "https://skepticalscience.com/ice-age-predicted-in-70s.htm"
+
+
+@pytest.fixture
+def site(monkeypatch) -> list[str]:
+    """Serve the pages of the benchmark corpus to the collector, and record the fetched URLs."""
+    fetched = []
+
+    def fetch_url_content(url, rate_limiter=None):
+        fetched.append(url)
+        return _page(SITE[url.removeprefix("https://skepticalscience.com/")])
+
+    monkeypatch.setattr(skepticalscience, "fetch_url_content", fetch_url_content)
+    return fetched
+
+
+@pytest.fixture
+def parses(monkeypatch) -> list[str]:
+    """Record the URLs parsed by the collector (in the calling process)."""
+    parsed = []
+
+    def main(url, content):
+        parsed.append(url)
+        return parse_main_article(url, content)
+
+    def translated(url, content, language_code):
+        parsed.append(url)
+        return parse_translated_article(url, content, language_code=language_code)
+
+    monkeypatch.setattr(skepticalscience, "parse_main_article", main)
+    monkeypatch.setattr(skepticalscience, "parse_translated_article", translated)
+    return parsed
+
+
+def test_parse_page_in_a_process_pool():
+    html = _page("basic-myth-with-source.htm")
+    french = _page("translation-french.htm")
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        status, article = skepticalscience._parse_page(URL, html, {}, parse_pool=pool)
+        _, translation = skepticalscience._parse_page(FRENCH_URL, french, {}, language_code="fr", parse_pool=pool)
+
+    assert status == "new"
+    assert article == skepticalscience._parse_page(URL, html, {})[1]
+    assert translation == skepticalscience._parse_page(FRENCH_URL, french, {}, language_code="fr")[1]
+    assert article["parser_fingerprint"] == parser_fingerprint()
+
+
+def test_parse_page_statuses(parses):
+    html = _page("basic-myth-with-source.htm")
+
+    status, article = skepticalscience._parse_page(URL, html, {})
+    assert status == "new"
+
+    assert skepticalscience._parse_page(URL, html, {URL: article}) == ("unchanged", article)
+    assert parses == [URL]
+
+    assert skepticalscience._parse_page(URL, html.replace("John Mason", "Jane Mason"), {URL: article})[0] == "changed"
+    assert parses == [URL, URL]
+
+
+def test_parse_store_hit_and_miss(tmp_path, parses):
+    html = _page("basic-myth-with-source.htm")
+    french = _page("translation-french.htm")
+    store = ParseResultStore(str(tmp_path / "parses.sqlite"))
+
+    first = skepticalscience._parse_page(URL, html, {}, parse_store=store)
+    first_translation = skepticalscience._parse_page(FRENCH_URL, french, {}, language_code="fr", parse_store=store)
+    assert parses == [URL, FRENCH_URL]
+    assert len(store) == 2
+
+    # Identical pages are not parsed again, even when they are not in the database:
+    assert skepticalscience._parse_page(URL, html, {}, parse_store=store) == first
+    assert skepticalscience._parse_page(FRENCH_URL, french, {}, language_code="fr", parse_store=store) == (
+        first_translation
+    )
+    assert parses == [URL, FRENCH_URL]
+
+    # The language code is part of the key:
+    skepticalscience._parse_page(FRENCH_URL, french, {}, language_code="de", parse_store=store)
+    # So is the HTML:
+    skepticalscience._parse_page(URL, html.replace("John Mason", "Jane Mason"), {}, parse_store=store)
+    assert parses == [URL, FRENCH_URL, FRENCH_URL, URL]
+    assert len(store) == 4
+
+
+def test_parse_store_is_invalidated_by_the_parser_fingerprint(tmp_path, parses, monkeypatch):
+    html = _page("basic-myth-with-source.htm")
+    store = ParseResultStore(str(tmp_path / "parses.sqlite"))
+    _, article = skepticalscience._parse_page(URL, html, {}, parse_store=store)
+
+    monkeypatch.setattr(skepticalscience, "parser_fingerprint", lambda: "another-parser")
+    status, reparsed = skepticalscience._parse_page(URL, html, {URL: article}, parse_store=store)
+
+    assert status == "changed"
+    assert reparsed["parser_fingerprint"] == "another-parser"
+    assert parses == [URL, URL]
+    assert len(store) == 2
+    assert store.prune("another-parser") == 1
+    assert skepticalscience._parse_page(URL, html, {}, parse_store=store)[1] == reparsed
+    assert parses == [URL, URL]
+
+
+def test_parse_fingerprint_depends_on_the_parser_mode():
+    assert parser_fingerprint(scoped=True) != parser_fingerprint(scoped=False)
+    assert parser_fingerprint(parser="html.parser") != parser_fingerprint(parser="lxml")
+
+
+def _stored(path: str) -> list[dict]:
+    with open_database(path, table="arguments") as db:
+        return [dict(doc) for doc in db.all()]
+
+
+def test_concurrent_crawl_stores_the_articles_in_order(tmp_path, site):
+    sequential, concurrent = str(tmp_path / "sequential.json"), str(tmp_path / "concurrent.json")
+    with open_database(sequential, table="arguments") as db:
+        skepticalscience.process_urls(db, [URL, LEGACY_URL], parse_cache=False)
+    fetched = sorted(site)
+    site.clear()
+
+    with open_database(concurrent, table="arguments") as db:
+        summary = skepticalscience.process_urls(
+            db, [URL, LEGACY_URL], workers=4, max_per_host=2, requests_per_second=100, parse_cache=False
+        )
+
+    assert summary == {"new": 9, "changed": 0, "unchanged": 0, "duplicates": 1}
+    assert sorted(site) == fetched
+    assert _stored(concurrent) == _stored(sequential)
+    assert [doc["url"] for doc in _stored(concurrent)][:5] == [
+        URL,
+        "https://skepticalscience.com/solar-activity-sunspots-global-warming-basic.htm",
+        "https://skepticalscience.com/solar-activity-sunspots-global-warming-intermediate.htm",
+        "https://skepticalscience.com/solar-activity-sunspots-global-warming-advanced.htm",
+        "https://skepticalscience.com/solar-activity-sunspots-global-warming-it.htm",
+    ]
+    assert _stored(concurrent)[-1]["url"] == LEGACY_URL
+
+
+def test_crawl_frontier_normalizes_the_urls():
+    frontier = skepticalscience.CrawlFrontier()
+
+    assert frontier.claim("HTTPS://SkepticalScience.com:443/global-cooling.htm#comments")
+    assert not frontier.claim("https://skepticalscience.com/global-cooling.htm")
+    assert not frontier.claim(" https://skepticalscience.com/global-cooling.htm ")
+    # Other ports, paths and queries are other pages:
+    assert frontier.claim("https://skepticalscience.com:8443/global-cooling.htm")
+    assert frontier.claim("https://skepticalscience.com/global-cooling.htm?lang=fr")
+    assert frontier.claim("https://skepticalscience.com")
+    assert not frontier.claim("https://skepticalscience.com/")
+
+    assert len(frontier) == 4
+    assert frontier.duplicates == 3
+
+
+def test_crawl_frontier_is_thread_safe():
+    frontier = skepticalscience.CrawlFrontier()
+    urls = [f"https://skepticalscience.com/{i % 50}.htm" for i in range(1000)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        claimed = list(executor.map(frontier.claim, urls))
+
+    assert sum(claimed) == 50
+    assert frontier.duplicates == 950
+
+
+def test_crawl_deduplicates_main_level_and_translation_pages(tmp_path, site):
+    level_url = "https://skepticalscience.com/solar-activity-sunspots-global-warming-intermediate.htm"
+    with open_database(str(tmp_path / "db.json"), table="arguments") as db:
+        summary = skepticalscience.process_urls(
+            db,
+            [URL, "HTTPS://skepticalscience.com/solar-activity-sunspots-global-warming.htm#top", level_url],
+            parse_cache=False,
+        )
+        stored = [doc["url"] for doc in db.all()]
+
+    # The main URL is listed twice, and the intermediate level is listed as a main argument, so the levels and
+    # translations they share are only processed once:
+    assert summary["duplicates"] == 10
+    assert sorted(site) == sorted(set(site))
+    assert len(stored) == len(set(stored)) == 9
+    # An argument listed as another argument's level is processed as a main argument, after the first one:
+    assert stored[-2:] == [level_url, level_url.replace("intermediate", "intermediate-intermediate")]
+
+
+def test_crawl_reports_the_pages_already_stored(tmp_path, site):
+    path = str(tmp_path / "db.json")
+    with open_database(path, table="arguments") as db:
+        # Articles stored before the pages were hashed:
+        db.insert_multiple([{"url": URL, "title": "Old"}, {"url": LEGACY_URL, "title": "Old"}])
+
+        assert skepticalscience.process_urls(db, [URL, LEGACY_URL], parse_cache=False) == {
+            "new": 7,
+            "changed": 2,
+            "unchanged": 0,
+            "duplicates": 1,
+        }
+        assert len(db) == 9
+        assert db.get(Query().url == URL)["title"] != "Old"
+
+        assert skepticalscience.process_urls(db, [URL, LEGACY_URL], parse_cache=False) == {
+            "new": 0,
+            "changed": 0,
+            "unchanged": 9,
+            "duplicates": 1,
+        }
+
+
+def _index_page(region_id: str, hrefs: list[str]) -> str:
+    links = "".join(f'<tr><td><a href="{href}">{href}</a></td></tr>' for href in hrefs)
+    return (
+        f'<html><body><div id="menu"><table><tr><td><a href="/menu.htm">Menu</a></td></tr></table></div>'
+        f'<div id="{region_id}"><p><a href="/intro.htm">Intro</a></p><table>{links}</table></div></body></html>'
+    )
+
+
+@pytest.fixture
+def index_pages(monkeypatch) -> dict[str, str]:
+    """Serve the argument index pages to the collector."""
+    pages = {
+        "https://skepticalscience.com/argument.php": _index_page("mainbody", ["/a.htm", "b.htm"]),
+        "https://skepticalscience.com/shorturls.php": _index_page("centerColumn", ["/b.htm", "/c.htm"]),
+        "https://skepticalscience.com/fixednum.php": _index_page(
+            "centerColumn", ["https://skepticalscience.com/d.htm"]
+        ),
+        "https://skepticalscience.com/argument.php?f=taxonomy": _page("taxonomy.htm"),
+    }
+    monkeypatch.setattr(skepticalscience, "fetch_url_content", lambda url: pages[url])
+    return pages
+
+
+def test_extract_index_urls(index_pages):
+    assert skepticalscience._extract_index_urls(
+        "https://skepticalscience.com/argument.php", "mainbody", "#mainbody table a"
+    ) == ["https://skepticalscience.com/a.htm", "https://skepticalscience.com/b.htm"]
+
+    taxonomy = skepticalscience._extract_index_urls(*skepticalscience.ARGUMENTS_INDEX_PAGES[3])
+    assert taxonomy
+    assert all(url.startswith("https://skepticalscience.com/") for url in taxonomy)
+
+    # Links outside of the region are ignored, even when the region is missing:
+    index_pages["https://skepticalscience.com/argument.php"] = _index_page("content", ["/a.htm"])
+    assert (
+        skepticalscience._extract_index_urls(
+            "https://skepticalscience.com/argument.php", "mainbody", "#mainbody table a"
+        )
+        == []
+    )
+
+
+def test_fetch_arguments_urls_saves_the_changes(tmp_path, index_pages):
+    urls_file = str(tmp_path / "urls.json")
+    taxonomy = set(skepticalscience._extract_index_urls(*skepticalscience.ARGUMENTS_INDEX_PAGES[3]))
+    assert skepticalscience.load_arguments_urls(urls_file) == {"updated": None, "urls": [], "added": [], "removed": []}
+
+    urls = skepticalscience.fetch_arguments_urls(
+        ignore_urls=["https://skepticalscience.com/c.htm"], urls_file=urls_file
+    )
+
+    expected = {f"https://skepticalscience.com/{name}.htm" for name in "abd"} | taxonomy
+    assert urls == sorted(expected)
+    saved = skepticalscience.load_arguments_urls(urls_file)
+    assert saved["urls"] == saved["added"] == urls
+    assert saved["removed"] == []
+
+    index_pages["https://skepticalscience.com/fixednum.php"] = _index_page("centerColumn", ["/e.htm"])
+    urls = skepticalscience.fetch_arguments_urls(urls_file=urls_file)
+
+    saved = skepticalscience.load_arguments_urls(urls_file)
+    assert (
+        saved["urls"]
+        == urls
+        == sorted(
+            expected - {"https://skepticalscience.com/d.htm"}
+            | {
+                "https://skepticalscience.com/c.htm",
+                "https://skepticalscience.com/e.htm",
+            }
+        )
+    )
+    assert saved["added"] == ["https://skepticalscience.com/c.htm", "https://skepticalscience.com/e.htm"]
+    assert saved["removed"] == ["https://skepticalscience.com/d.htm"]
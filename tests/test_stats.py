@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from climafactskg.cli import app
+from climafactskg.stats import DEFAULT_STATS, collect_stats, compute_stats
+from climafactskg.storage import open_database
+from typer.testing import CliRunner
+
+DOCUMENTS = [
+    {"url": "u1", "lang": "en", "cards_category": "1_1", "level": "basic", "tags": ["a"]},
+    {"url": "u2", "lang": "en", "cards_category": "1_1", "level": None},
+    {"url": "u3", "lang": "fr", "cards_category": "2_1", "level": ""},
+    {"url": "u4", "lang": "en", "cards_category": "2_1", "tags": []},
+    {"url": "u5", "cards_category": "1_1"},
+]
+
+
+def test_compute_stats():
+    stats = compute_stats(
+        iter(DOCUMENTS), keys=["lang", "level", "cards_category"], crosstabs=[("lang", "cards_category")]
+    )
+
+    assert stats["documents"] == 5
+    assert stats["keys"]["lang"] == {"unique": 2, "missing": 1, "counts": {"en": 3, "fr": 1}}
+    # Null values are counted, and missing:
+    assert stats["keys"]["level"] == {"unique": 2, "missing": 3, "counts": {"basic": 1, "null": 1, "": 1}}
+    assert stats["keys"]["cards_category"]["counts"] == {"1_1": 3, "2_1": 2}
+    assert list(stats["keys"]["cards_category"]["counts"]) == ["1_1", "2_1"]
+    assert stats["crosstabs"] == {
+        "lang:cards_category": {"en": {"1_1": 2, "2_1": 1}, "fr": {"2_1": 1}, "null": {"1_1": 1}}
+    }
+    # Fields absent, null or empty:
+    assert stats["missing"] == {"cards_category": 0, "lang": 1, "level": 4, "tags": 4, "url": 0}
+
+
+def test_compute_stats_top():
+    stats = compute_stats(DOCUMENTS, keys=["lang", "cards_category"], top=1)
+
+    assert stats["keys"]["lang"] == {"unique": 2, "missing": 1, "counts": {"en": 3}}
+    assert stats["keys"]["cards_category"]["counts"] == {"1_1": 3}
+
+
+def test_compute_stats_of_no_documents():
+    assert compute_stats([], keys=["lang"], crosstabs=[("lang", "level")]) == {
+        "documents": 0,
+        "keys": {"lang": {"unique": 0, "missing": 0, "counts": {}}},
+        "crosstabs": {"lang:level": {}},
+        "missing": {"lang": 0},
+    }
+
+
+@pytest.fixture
+def databases(tmp_path) -> dict[str, str]:
+    paths = {"arguments": str(tmp_path / "arguments.json"), "mappings": str(tmp_path / "mappings.sqlite")}
+    for table, path in paths.items():
+        with open_database(path, table=table) as db:
+            db.insert_multiple(DOCUMENTS)
+    return paths
+
+
+def test_collect_stats(databases):
+    stats = collect_stats(databases)
+
+    assert set(stats) == {"generated", "arguments", "mappings"}
+    assert stats["arguments"]["database"] == databases["arguments"]
+    assert set(stats["arguments"]["keys"]) == {"lang", "level", "cards_category", "main_url"}
+    assert stats["arguments"]["crosstabs"]["lang:level"] == {
+        "en": {"basic": 1, "null": 2},
+        "fr": {"": 1},
+        "null": {"null": 1},
+    }
+    assert stats["mappings"] == {
+        "database": databases["mappings"],
+        **compute_stats(DOCUMENTS, **DEFAULT_STATS["mappings"]),
+    }
+
+    with pytest.raises(FileNotFoundError):
+        collect_stats({"arguments": databases["arguments"] + ".missing"})
+
+
+def test_stats_command(databases, tmp_path):
+    output = str(tmp_path / "stats.json")
+    result = CliRunner().invoke(
+        app,
+        [
+            "stats",
+            "--climafactskg-db",
+            databases["arguments"],
+            "--cimplekg-db",
+            databases["mappings"],
+            "--key",
+            "cards_category",
+            "--crosstab",
+            "cards_category:lang",
+            "--top",
+            "1",
+            "--output",
+            output,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    with open(output, encoding="utf-8") as f:
+        stats = json.load(f)
+    for table in ("arguments", "mappings"):
+        assert stats[table]["keys"] == {"cards_category": {"unique": 2, "missing": 0, "counts": {"1_1": 3}}}
+        assert stats[table]["crosstabs"] == {
+            "cards_category:lang": {"1_1": {"en": 2, "null": 1}, "2_1": {"en": 1, "fr": 1}}
+        }
+
+    result = CliRunner().invoke(app, ["stats", "--crosstab", "lang"])
+    assert result.exit_code == 1
@@ -0,0 +1,184 @@
+import json
+import random
+from datetime import datetime
+
+import pytest
+from climafactskg.cli import app
+from climafactskg.storage import JournalStorage, SQLiteStorage, migrate_database, open_database
+from tinydb import Query, TinyDB, where
+from tinydb.storages import MemoryStorage
+from typer.testing import CliRunner
+
+
+@pytest.mark.parametrize("extension", [".sqlite", ".jsonl"])
+def test_flush_only_compares_the_changed_documents(tmp_path, monkeypatch, extension):
+    path = str(tmp_path / f"db{extension}")
+    with open_database(path, table="arguments") as db:
+        db.insert_multiple({"url": f"u{i}", "last_update": datetime(2024, 1, 1 + i)} for i in range(20))
+
+    storage_cls = SQLiteStorage if extension == ".sqlite" else JournalStorage
+    diffs = []
+    diff = storage_cls._diff
+    monkeypatch.setattr(storage_cls, "_diff", lambda self, *args: diffs.append(args[1:]) or diff(self, *args))
+
+    with open_database(path, table="arguments") as db:
+        db.upsert({"url": "u3", "title": "Updated"}, Query().url == "u3")
+        db.remove(Query().url == "u5")
+
+    assert diffs == [({"arguments": {"4", "6"}},)]
+    with open_database(path, table="arguments") as db:
+        assert len(db) == 19
+        assert db.get(Query().url == "u3") == {"url": "u3", "last_update": datetime(2024, 1, 4), "title": "Updated"}
+
+
+def test_journal_stops_at_a_corrupt_record(tmp_path):
+    path = str(tmp_path / "db.jsonl")
+    with open_database(path, table="arguments", batch_size=1) as db:
+        db.insert({"url": "u0"})
+    with open_database(path, table="arguments", batch_size=1) as db:
+        # Keep the records in the journal, as a crash would:
+        db.storage.storage.close = lambda: None
+        db.insert({"url": "u1"})
+
+    # Blocks allocated to the file but never written before a crash:
+    with open(path, "ab") as f:
+        f.write(b"\0" * 16 + b"\n")
+
+    with open_database(path, table="arguments", batch_size=1) as db:
+        assert [doc["url"] for doc in db.all()] == ["u0", "u1"]
+        db.insert({"url": "u2"})
+    with open_database(path, table="arguments") as db:
+        assert [doc["url"] for doc in db.all()] == ["u0", "u1", "u2"]
+
+
+def test_journal_compacted_after_a_corrupt_record_keeps_the_next_writes(tmp_path):
+    path = str(tmp_path / "db.jsonl")
+    with open_database(path, table="arguments", batch_size=1) as db:
+        db.storage.storage.close = lambda: None
+        db.insert({"url": "u0"})
+    with open(path, "ab") as f:
+        f.write(b"\0" * 16 + b"\n")
+
+    with open_database(path, table="arguments", batch_size=1) as db:
+        assert len(db) == 1
+        db.storage.storage.compact()
+        db.insert({"url": "u1"})
+        # Keep the records in the journal, to read them back:
+        db.storage.storage.close = lambda: None
+
+    with open(path, "rb") as f:
+        assert b"\0" not in f.read()
+    with open_database(path, table="arguments") as db:
+        assert [doc["url"] for doc in db.all()] == ["u0", "u1"]
+
+
+def _table_contents(db, name: str) -> dict:
+    return {doc.doc_id: json.dumps(doc, default=str, sort_keys=True) for doc in db.table(name).all()}
+
+
+@pytest.mark.parametrize("extension", [".json", ".jsonl", ".sqlite"])
+@pytest.mark.parametrize("batch_size", [1, 7, 100])
+def test_url_indexed_table_matches_a_plain_table(tmp_path, extension, batch_size):
+    """Apply the same random writes to a database opened with `open_database` and to a plain in-memory TinyDB."""
+    rnd = random.Random(f"{extension}-{batch_size}")
+    path = str(tmp_path / f"db{extension}")
+    reference = TinyDB(storage=MemoryStorage)
+    db = open_database(path, table="arguments", batch_size=batch_size, flush_seconds=float("inf"))
+
+    for _ in range(300):
+        name = rnd.choice(["arguments", "other"])
+        table, ref = db.table(name), reference.table(name)
+        url = f"u{rnd.randrange(20)}"
+        doc = {"url": url, "value": rnd.randrange(1000), "last_update": datetime(2024, 1, 1 + rnd.randrange(28))}
+
+        operation = rnd.random()
+        if operation < 0.35:
+            for t in (table, ref):
+                t.upsert(dict(doc), Query().url == url)
+        elif operation < 0.5:
+            for t in (table, ref):
+                t.insert(dict(doc))
+        elif operation < 0.6:
+            for t in (table, ref):
+                t.remove(where("url") == url)
+        elif operation < 0.67:
+            for t in (table, ref):
+                t.update({"value": -1}, Query().value > 500)
+        elif operation < 0.72 and len(ref):
+            # Change the URL of a document:
+            doc_ids = [rnd.choice([doc.doc_id for doc in ref.all()])]
+            for t in (table, ref):
+                t.update({"url": url}, doc_ids=doc_ids)
+        elif operation < 0.75:
+            for t in (table, ref):
+                t.truncate()
+        elif operation < 0.78:
+            db.drop_table(name)
+            reference.drop_table(name)
+        elif operation < 0.85:
+            for t in (table, ref):
+                t.insert_multiple([dict(doc), dict(doc, url="other")])
+
+        # Queries on the URL are answered from the index:
+        assert table.contains(where("url") == url) == ref.contains(where("url") == url)
+        found, expected = table.get(Query().url == url), ref.get(Query().url == url)
+        assert (found, getattr(found, "doc_id", None)) == (expected, getattr(expected, "doc_id", None))
+
+        if rnd.random() < 0.05:
+            db.close()
+            db = open_database(path, table="arguments", batch_size=batch_size, flush_seconds=float("inf"))
+            # A reopened table numbers the next documents from its highest ID, like a new reference table:
+            reference._tables.clear()
+            for name in set(db.tables()) | set(reference.tables()):
+                assert _table_contents(db, name) == _table_contents(reference, name)
+
+    db.close()
+    with open_database(path, table="arguments") as db:
+        for name in set(db.tables()) | set(reference.tables()):
+            assert _table_contents(db, name) == _table_contents(reference, name)
+
+
+def _database_contents(path: str) -> dict:
+    with open_database(path) as db:
+        return {name: {doc.doc_id: dict(doc) for doc in db.table(name).all()} for name in db.tables()}
+
+
+def test_migrate_database_round_trip(tmp_path):
+    path = str(tmp_path / "db.json")
+    with open_database(path, table="arguments") as db:
+        db.insert_multiple(
+            {"url": f"u{i}", "last_update": datetime(2024, 1, 1 + i, 12, 30), "levels": [{"level": "basic"}]}
+            for i in range(5)
+        )
+        db.remove(doc_ids=[2])
+        db.table("mappings").insert({"url": "c1", "claim": "Ça chauffe", "lang": None})
+    contents = _database_contents(path)
+    assert contents["arguments"][1]["last_update"] == datetime(2024, 1, 1, 12, 30)
+
+    assert migrate_database(path, str(tmp_path / "db.sqlite")) == 5
+    assert _database_contents(str(tmp_path / "db.sqlite")) == contents
+
+    assert migrate_database(str(tmp_path / "db.sqlite"), str(tmp_path / "copy.json")) == 5
+    assert _database_contents(str(tmp_path / "copy.json")) == contents
+
+
+def test_db_migrate_command(tmp_path):
+    source, target = str(tmp_path / "db.json"), str(tmp_path / "db.sqlite")
+    runner = CliRunner()
+    assert runner.invoke(app, ["db", "migrate", source, target]).exit_code == 1
+
+    with open_database(source, table="arguments") as db:
+        db.insert({"url": "u1"})
+    result = runner.invoke(app, ["db", "migrate", source, target])
+    assert result.exit_code == 0, result.output
+
+    # A non-empty target is only replaced with --overwrite:
+    with open_database(source, table="arguments") as db:
+        db.insert({"url": "u2"})
+    result = runner.invoke(app, ["db", "migrate", source, target])
+    assert result.exit_code == 1
+    assert "not empty" in result.output
+    assert _database_contents(target) == {"arguments": {1: {"url": "u1"}}}
+
+    assert runner.invoke(app, ["db", "migrate", source, target, "--overwrite"]).exit_code == 0
+    assert _database_contents(target) == {"arguments": {1: {"url": "u1"}, 2: {"url": "u2"}}}
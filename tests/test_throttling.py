@@ -0,0 +1,157 @@
+import io
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+from climafactskg.throttling import AdaptiveController, HostRateLimiter, parse_retry_after
+
+URL = "https://example.org/page"
+
+
+def _response(status_code: int = 200, **headers) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    response.raw = io.BytesIO()
+    return response
+
+
+def _concurrency(controller: AdaptiveController) -> int:
+    return controller.metrics()["example.org"]["concurrency"]
+
+
+def test_fast_responses_add_about_one_slot_per_round_trip():
+    controller = AdaptiveController(initial_concurrency=1, max_concurrency=4)
+
+    controller.request(URL, _response)
+    assert _concurrency(controller) == 2
+
+    # The slots are only added while they are all in use:
+    controller.request(URL, _response)
+    assert _concurrency(controller) == 2
+
+    def fast():
+        time.sleep(0.01)
+        return _response()
+
+    threads = [threading.Thread(target=controller.request, args=(URL, fast)) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _concurrency(controller) == 4
+
+
+@pytest.mark.parametrize("status_code", [429, 503])
+def test_throttling_responses_halve_the_slots(status_code):
+    controller = AdaptiveController(initial_concurrency=4, max_concurrency=4, max_retries=0)
+
+    assert controller.request(URL, lambda: _response(status_code)).status_code == status_code
+    assert _concurrency(controller) == 2
+    assert controller.metrics()["example.org"]["throttled"] == 0
+
+
+def test_slow_responses_halve_the_slots():
+    controller = AdaptiveController(initial_concurrency=4, max_concurrency=4)
+
+    def slow():
+        time.sleep(0.05)
+        return _response()
+
+    controller.request(URL, slow, slow_seconds=0.01)
+    assert _concurrency(controller) == 2
+    controller.request(URL, slow, slow_seconds=1)
+    assert _concurrency(controller) == 2
+
+
+def test_retry_after_is_used_instead_of_the_backoff():
+    controller = AdaptiveController(backoff_seconds=60)
+    responses = iter([_response(429, **{"Retry-After": "0"}), _response(200)])
+
+    start = time.monotonic()
+    assert controller.request(URL, lambda: next(responses)).status_code == 200
+    assert time.monotonic() - start < 5
+    metrics = controller.metrics()["example.org"]
+    assert (metrics["requests"], metrics["throttled"], metrics["retries"]) == (2, 1, 1)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(minutes=1), usegmt=True)
+    assert 55 <= parse_retry_after(in_a_minute) <= 60
+
+
+def test_retries_are_exhausted():
+    controller = AdaptiveController(max_retries=2, backoff_seconds=0)
+    calls = []
+
+    def unavailable():
+        calls.append(1)
+        return _response(502)
+
+    assert controller.request(URL, unavailable).status_code == 502
+    assert len(calls) == 3
+
+    def unreachable():
+        calls.append(1)
+        raise requests.ConnectionError()
+
+    with pytest.raises(requests.ConnectionError):
+        controller.request(URL, unreachable)
+    assert len(calls) == 6
+    assert controller.metrics()["example.org"]["retries"] == 4
+
+
+def test_rate_limiter_waits_are_not_measured_as_latency():
+    controller = AdaptiveController(initial_concurrency=4, max_concurrency=4)
+    limiter = HostRateLimiter(max_concurrency=4, requests_per_second=20)
+
+    threads = [
+        threading.Thread(
+            target=controller.request, args=(URL, _response), kwargs={"slow_seconds": 0.04, "rate_limiter": limiter}
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _concurrency(controller) == 4
+    assert controller.metrics()["example.org"]["latency"] < 0.04
+
+
+def test_host_rate_limiter_limits_each_host():
+    limiter = HostRateLimiter(max_concurrency=2, requests_per_second=20)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fetch(url):
+        with limiter.limit(url):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=fetch, args=(URL,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+
+    # Another host has its own slots and schedule:
+    other = time.monotonic()
+    with limiter.limit("https://example.com/"):
+        assert time.monotonic() - other < 0.05
+
+    for thread in threads:
+        thread.join()
+    # Six requests started at most every 50 ms:
+    assert time.monotonic() - start >= 0.25
+    assert peak[0] == 2
@@ -0,0 +1,75 @@
+import os
+from datetime import timedelta
+
+from climafactskg.cache import get_page_cache
+from climafactskg.utils import fetch_url_content, iter_query_sparqlendpoint, query_sparqlendpoint
+
+QUERY = """
+PREFIX schema: <http://schema.org/>
+SELECT ?rev (STRLEN(STR(?rev)) AS ?length)
+WHERE { ?rev a schema:ClaimReview }
+ORDER BY ?rev
+"""
+
+
+def test_iter_query_sparqlendpoint_chunks(endpoint):
+    chunks = list(iter_query_sparqlendpoint(endpoint, QUERY, chunksize=10, dtypes={"length": "Int64"}))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    for chunk in chunks:
+        assert str(chunk["length"].dtype) == "Int64"
+        assert not chunk["rev"].isna().any()
+    assert chunks[0]["length"].iloc[0] == len("http://data.cimple.eu/claim-review/0000")
+
+
+def test_query_sparqlendpoint_dtypes(endpoint, tmp_path):
+    for streaming in (False, True):
+        results = query_sparqlendpoint(
+            endpoint, QUERY, streaming=streaming, dtypes={"length": "Int64"}, cache_dir=str(tmp_path)
+        )
+        assert len(results) == 25
+        assert str(results["length"].dtype) == "Int64"
+
+    # Both decoders are cached separately, as Parquet files:
+    assert sorted(os.path.splitext(name)[1] for name in os.listdir(tmp_path / "sparql")) == [".parquet", ".parquet"]
+
+
+def test_fetch_url_content_revalidates_expired_pages(tmp_path, web_server):
+    web_server.pages["/etag"] = ("<p>Version 1</p>", {"ETag": '"v1"'})
+    web_server.pages["/date"] = ("<p>Version 1</p>", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    web_server.pages["/plain"] = ("<p>Version 1</p>", {})
+    cache_dir = str(tmp_path)
+
+    for path in ("/etag", "/date", "/plain"):
+        assert fetch_url_content(web_server.url(path), cache_dir=cache_dir) == "<p>Version 1</p>"
+        # Fresh pages are served from the cache:
+        assert fetch_url_content(web_server.url(path), cache_dir=cache_dir) == "<p>Version 1</p>"
+    assert web_server.requests == [("/etag", {}), ("/date", {}), ("/plain", {})]
+
+    # The body changes, but the validators of the first two pages do not:
+    for path in ("/etag", "/date", "/plain"):
+        web_server.pages[path] = ("<p>Version 2</p>", web_server.pages[path][1])
+    timestamp = get_page_cache(cache_dir).get(web_server.url("/etag"))["timestamp"]
+
+    contents = [
+        fetch_url_content(web_server.url(path), cache_dir=cache_dir, cache_expiry=timedelta(0))
+        for path in ("/etag", "/date", "/plain")
+    ]
+
+    # Not modified pages are taken from the cache, the other ones are downloaded again:
+    assert contents == ["<p>Version 1</p>", "<p>Version 1</p>", "<p>Version 2</p>"]
+    assert web_server.requests[3:] == [
+        ("/etag", {"If-None-Match": '"v1"'}),
+        ("/date", {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        ("/plain", {}),
+    ]
+    entry = get_page_cache(cache_dir).get(web_server.url("/etag"))
+    assert entry["etag"] == '"v1"'
+    assert entry["timestamp"] > timestamp
+
+    # A new validator downloads the page:
+    web_server.pages["/etag"] = ("<p>Version 3</p>", {"ETag": '"v3"'})
+    assert (
+        fetch_url_content(web_server.url("/etag"), cache_dir=cache_dir, cache_expiry=timedelta(0)) == "<p>Version 3</p>"
+    )
+    assert get_page_cache(cache_dir).get(web_server.url("/etag"))["etag"] == '"v3"'